@@ -0,0 +1,3 @@
+"""
+trivia — the TriviaApp content tools; run `python3 -m trivia` for the commands.
+"""
@@ -0,0 +1,53 @@
+"""
+python3 -m trivia — One entry point for the content tools.
+
+    python3 -m trivia COMMAND [options]      (python3 -m trivia COMMAND --help)
+
+Each command is a module of this package with a main(), and only the module
+of the command being run is imported: the offline commands (list, validate,
+stats, bundle, dedup) never load the API client or the Anthropic SDK, and
+the API commands load the SDK only when they first call it. `python3 -m
+trivia bench startup` measures this and fails when it regresses.
+"""
+
+import importlib
+import sys
+
+# command: (module, summary)
+COMMANDS = {
+    "gen":      ("trivia.gen",        "Generate questions through the API"),
+    "audit":    ("trivia.audit",      "Shorten over-long questions through the API"),
+    "enrich":   ("trivia.enrich",     "Add absurd answers to generated questions"),
+    "list":     ("trivia.categories", "List the generator's categories and their files"),
+    "validate": ("trivia.validate",   "Check the question files"),
+    "stats":    ("trivia.stats",      "Corpus statistics: balance, lengths, answer bias"),
+    "bundle":   ("trivia.bundle",     "Build the compact question bundle"),
+    "dedup":    ("trivia.dedup",      "Report near-duplicate questions"),
+    "serve":    ("trivia.serve",      "Serve trivia rounds over HTTP"),
+    "metrics":  ("trivia.metrics",    "Summarize a metrics file"),
+    "bench":    ("trivia.bench",      "Offline benchmarks, including start-up time"),
+}
+
+
+def usage() -> str:
+    lines = ["usage: python3 -m trivia COMMAND [options]", "", "commands:"]
+    lines += [f"  {name:<10} {summary}" for name, (_, summary) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        raise SystemExit(2)
+    module = importlib.import_module(COMMANDS[command][0])
+    sys.argv = [f"trivia {command}", *rest]  # argparse shows this as the program name
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
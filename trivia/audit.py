@@ -0,0 +1,484 @@
+"""
+trivia/audit.py — Shorten genuinely bloated questions in all question JSON files.
+Target: under 20 words. Brief context clauses are fine and encouraged — don't over-trim.
+Logs every change made.
+
+Long questions are sent BATCH_SIZE to a request, as `q1 | question` lines
+whose replies are matched back by tag; a reply line that is missing, garbled
+or still over MAX_WORDS is asked for again on its own (RETRY_ROUNDS), and a
+question that never comes back short enough is left as it was. Requests run
+concurrently through the shared client in trivia/client.py (pooled
+connections, one rate limit across processes). Each file is
+rewritten atomically as soon as its last question is done, and every result
+is kept in a cache keyed by a hash of the question and instructions (content/trivia-audit-cache.json
++ .jsonl journal), so an interrupted or repeated run makes no API call for a
+question it has already seen.
+
+A manifest (content/trivia-audit-manifest.json) records each file's mtime,
+size and hash, and a hash of every question, as of the last audit. Only
+files and questions that changed since then are read and checked, so a run
+over an unchanged corpus costs one stat() per file.
+
+Usage:
+    python3 -m trivia audit                  # shorten concurrently (default 4 workers)
+    python3 -m trivia audit --concurrency 8  # more workers
+    python3 -m trivia audit --batch-size 50  # questions per request (default 25)
+    python3 -m trivia audit --batch          # submit every long question as one Message Batch
+    python3 -m trivia audit --since 2d       # only files edited in the last two days
+    python3 -m trivia audit --full           # ignore the manifest and check every question
+    python3 -m trivia audit --full --refresh # re-shorten without reusing earlier answers
+    python3 -m trivia audit --summary        # where the time went in the last run
+
+Set TRIVIA_FAKE_API=1 to run against the offline stub in trivia/fake.py.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from trivia import fake
+from trivia.batches import batch_request, run_batch
+from trivia.client import RATE_LIMIT_FILE, SharedClient
+from trivia.corpus import BASE_DIR
+from trivia.journal import Journal, atomic_write_text
+from trivia.manifest import FileChange, Manifest, parse_since
+from trivia.metrics import (Metrics, add_metrics_arguments, metrics_from_args,
+                            summarize, usage_fields)
+from trivia.ratelimit import FileRateLimiter
+from trivia.response_cache import RESPONSE_CACHE_FILE, ResponseCache
+
+QUESTIONS_DIR = BASE_DIR / "content" / "questions"
+CACHE_FILE    = BASE_DIR / "content" / "trivia-audit-cache.json"
+METRICS_FILE  = BASE_DIR / "content" / "trivia-audit-metrics.jsonl"
+MANIFEST_FILE = BASE_DIR / "content" / "trivia-audit-manifest.json"
+MAX_WORDS = 20
+
+SKIP = {"schema.json", "QUESTION_RULES.md"}
+
+MODEL = "claude-sonnet-4-6"
+BATCH_SIZE      = 25  # questions per request
+QUESTION_TOKENS = 60  # output budget per question
+RETRY_ROUNDS    = 2
+
+CONCURRENCY      = 4
+REQUESTS_PER_MIN = 50
+TOKENS_PER_MIN   = 40_000
+
+log = logging.getLogger("trivia-audit")
+
+_client: SharedClient | None = None
+metrics = Metrics()  # replaced in main() by one that writes METRICS_FILE
+manifest: Manifest | None = None  # loaded in main(); None audits without recording
+read_cache = True  # cleared by --refresh and --no-cache
+
+
+def get_client() -> SharedClient:
+    """The run's shared client, built on first use rather than at import."""
+    global _client
+    if _client is None:
+        _client = SharedClient(limiter=FileRateLimiter(RATE_LIMIT_FILE, REQUESTS_PER_MIN,
+                                                       TOKENS_PER_MIN))
+    return _client
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+SHORTEN_RULES = (
+    "Shorten each trivia question below to under 20 words. "
+    "Cut Wikipedia-style preambles and excessive scene-setting. "
+    "But keep a short context clause if it aids learning — don't over-trim. "
+    "A question like 'Which cat breed, named after the Isle of Man, is born without a tail?' is perfect.\n"
+    "Each line is [tag] | [question]. Reply with ONLY one line per question, in the same order "
+    "and with the same tags: [tag] | [shortened question]. No explanation."
+)
+
+REPLY_RE = re.compile(r"^q(?P<n>\d+)\s*\|\s*(?P<question>.+?)\s*$")
+
+def shorten_prompt(questions: list[str], attempt: int = 0) -> str:
+    lines = "\n".join(f"q{n} | {' '.join(q.split())}" for n, q in enumerate(questions, 1))
+    # A retry differs from the request it repeats, so no cache hands back the same reply
+    retry = (f"\n(Retry {attempt}: some answers were missing, mistagged or still too long.)"
+             if attempt else "")
+    return f"{SHORTEN_RULES}{retry}\n\n{lines}"
+
+def clean_reply(text: str) -> str:
+    return text.strip().strip('"')
+
+def parse_shortened(text: str, count: int) -> dict[int, str]:
+    """
+    The usable questions in a reply to shorten_prompt() for `count`
+    questions, by position: only tags that were asked for, the first line
+    for each, and only questions within MAX_WORDS.
+    """
+    shortened = {}
+    for line in text.splitlines():
+        m = REPLY_RE.match(line.strip())
+        if not m:
+            continue
+        i = int(m.group("n")) - 1
+        question = clean_reply(m.group("question"))
+        if not 0 <= i < count or i in shortened or not question:
+            continue
+        if word_count(question) > MAX_WORDS:
+            metrics.count("too_long")
+            continue
+        shortened[i] = question
+    return shortened
+
+def request_shortened(questions: list[str], attempt: int = 0, **span_attrs) -> dict[int, str]:
+    """One request for all of `questions`; returns the usable answers by position."""
+    prompt = shorten_prompt(questions, attempt)
+    max_tokens = QUESTION_TOKENS * len(questions)
+    with metrics.span("api", mode="call", questions=len(questions), attempt=attempt,
+                      **span_attrs) as span:
+        msg = get_client().create(
+            len(prompt) // 4 + max_tokens, log, on_event=metrics.backoff_observer(span),
+            model=MODEL,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        # A coalesced call shares another caller's response and its usage
+        if not span.get("coalesced"):
+            span.update(usage_fields(msg.usage))
+    return parse_shortened(msg.content[0].text, len(questions))
+
+def shorten_questions(questions: list[str], first_reply: dict[int, str] | None = None,
+                      **span_attrs) -> dict[int, str]:
+    """
+    Shorten `questions`, by position, asking again for only the ones a reply
+    left out, garbled or left too long. `first_reply` is an answer already
+    in hand (e.g. from a Message Batch) to start from.
+    """
+    done = dict(first_reply) if first_reply is not None else {}
+    todo = [i for i in range(len(questions)) if i not in done]
+    attempt = 0 if first_reply is None else 1
+    while todo and attempt <= RETRY_ROUNDS:
+        if attempt:
+            metrics.count("retried_questions", len(todo))
+        reply = request_shortened([questions[i] for i in todo], attempt, **span_attrs)
+        for n, question in reply.items():
+            done[todo[n]] = question
+        todo = [i for i in todo if i not in done]
+        attempt += 1
+    return done
+
+# ── Result cache ────────────────────────────────────────────────────────────
+
+def cache_key(question: str) -> str:
+    """Hash of everything that determines the answer: model, instructions and question."""
+    return hashlib.sha256(f"{MODEL}\0{SHORTEN_RULES}\0{question}".encode()).hexdigest()
+
+def _apply_cache_record(state: dict, rec: dict) -> None:
+    state["entries"][rec["key"]] = rec["shortened"]
+
+cache = Journal(CACHE_FILE, _apply_cache_record, lambda: {"entries": {}})
+_cache_entries: dict[str, str] | None = None
+_cache_lock = threading.Lock()
+
+def cache_entries() -> dict[str, str]:
+    global _cache_entries
+    with _cache_lock:
+        if _cache_entries is None:
+            _cache_entries = cache.load()["entries"]
+        return _cache_entries
+
+def cache_put(question: str, shortened: str) -> None:
+    key = cache_key(question)
+    cache.append({"key": key, "shortened": shortened})
+    cache_entries()[key] = shortened
+
+def cached_shortening(question: str) -> str | None:
+    hit = cache_entries().get(cache_key(question)) if read_cache else None
+    metrics.count("cache_hit" if hit is not None else "cache_miss")
+    return hit
+
+# ── File handling ───────────────────────────────────────────────────────────
+
+def record_change(path: Path, q: dict, original: str, shortened: str) -> dict:
+    return {
+        "id": q.get("id", "?"),
+        "file": path.name,
+        "before": original,
+        "after": shortened,
+        "words_before": word_count(original),
+        "words_after": word_count(shortened),
+    }
+
+def print_changes(changes: list[dict]) -> None:
+    for c in changes:
+        print(f"  [{c['id']}] {c['words_before']}w → {c['words_after']}w")
+        print(f"    BEFORE: {c['before']}")
+        print(f"    AFTER:  {c['after']}")
+
+def write_file(path: Path, data: dict) -> None:
+    with metrics.span("write", category=path.name):
+        atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+def record_audited(path: Path, data: dict | None = None, pending: set[str] = frozenset()) -> None:
+    """Note `path` as audited in its current state, except for questions in `pending`."""
+    if manifest is not None:
+        manifest.record(path, data, pending)
+
+def load_long_questions(changed: list[FileChange]) -> list[tuple[Path, dict, list[int]]]:
+    """Return (path, data, indexes of long questions) among the changed questions."""
+    loaded = []
+    for change in changed:
+        path, data = change.path, change.data
+        questions = data.get("questions", [])
+        long_idx = [i for i in change.indexes
+                    if word_count(questions[i].get("question", "")) > MAX_WORDS]
+        if not long_idx:
+            print(f"✓ {path.name}")
+            record_audited(path, data)
+            continue
+        print(f"→ {path.name} ({len(long_idx)} to shorten)")
+        loaded.append((path, data, long_idx))
+    return loaded
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class AuditRun:
+    """
+    Book-keeping shared by both modes: applies answers, and writes a file
+    (and notes it in the manifest) as soon as all its questions are settled.
+    """
+
+    def __init__(self, loaded: list[tuple[Path, dict, list[int]]]):
+        self.data = {path: data for path, data, _ in loaded}
+        self.remaining = {path: len(idx) for path, _, idx in loaded}
+        self.changes: dict[Path, list[dict]] = {path: [] for path, _, _ in loaded}
+        self.failed: dict[Path, set[str]] = {path: set() for path, _, _ in loaded}
+        self.started = time.monotonic()
+
+    def settle(self, path: Path, i: int, shortened: str | None, cached: bool = False) -> None:
+        q = self.data[path]["questions"][i]
+        if shortened is None:
+            self.failed[path].add(str(q.get("id", i)))
+        else:
+            original = q["question"]
+            if not cached:
+                cache_put(original, shortened)
+            q["question"] = shortened
+            self.changes[path].append(record_change(path, q, original, shortened))
+        self.remaining[path] -= 1
+        if self.remaining[path] == 0:
+            self.finish(path)
+
+    def finish(self, path: Path) -> None:
+        changes = self.changes[path]
+        if changes:
+            write_file(path, self.data[path])
+        record_audited(path, self.data[path], self.failed[path])
+        # Files share requests, so a file's time is until its last answer
+        metrics.record("category", time.monotonic() - self.started, category=path.name,
+                       accepted=len(changes))
+        note = f", {len(self.failed[path])} left as they were" if self.failed[path] else ""
+        print(f"\n✎ {path.name}: {len(changes)} shortened{note}")
+        print_changes(sorted(changes, key=lambda c: c["id"]))
+
+    def all_changes(self) -> list[dict]:
+        return [c for file_changes in self.changes.values() for c in file_changes]
+
+def settle_cached(run: AuditRun, loaded: list[tuple[Path, dict, list[int]]]) -> list[tuple[Path, int]]:
+    """Apply every answer the result cache holds; return the (path, index) still to ask for."""
+    todo, hits = [], 0
+    for path, data, idx in loaded:
+        for i in idx:
+            hit = cached_shortening(data["questions"][i]["question"])
+            if hit is None:
+                todo.append((path, i))
+            else:
+                hits += 1
+                run.settle(path, i, hit, cached=True)
+    print(f"\nCache: {hits} hits, {len(todo)} to shorten\n")
+    return todo
+
+def print_totals(done: int, failed: int, requests: int) -> None:
+    print(f"\n{done} questions shortened in {requests} requests (+ retries)")
+    if failed:
+        print(f"{failed} questions not shortened — still pending, retried on the next run")
+
+def audit_files(changed: list[FileChange], concurrency: int = CONCURRENCY,
+                batch_size: int = BATCH_SIZE) -> list[dict]:
+    """
+    Shorten every long question in `changed`, `batch_size` to a request, on
+    a worker pool. A file is written as soon as all of its questions are done.
+    """
+    loaded = load_long_questions(changed)
+    run = AuditRun(loaded)
+    groups = chunked(settle_cached(run, loaded), batch_size)
+    done = failed = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(shorten_questions,
+                        [run.data[path]["questions"][i]["question"] for path, i in group],
+                        category=group[0][0].name): group
+            for group in groups
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                shortened = future.result()
+            except Exception as e:
+                print(f"  !! {len(group)} questions: {e}")
+                shortened = {}
+            for n, (path, i) in enumerate(group):
+                if n in shortened:
+                    done += 1
+                else:
+                    failed += 1
+                    print(f"  !! [{run.data[path]['questions'][i].get('id', i)}] not shortened")
+                run.settle(path, i, shortened.get(n))
+
+    print_totals(done, failed, len(groups))
+    return run.all_changes()
+
+def audit_file(path: Path) -> list[dict]:
+    data = json.loads(path.read_text())
+    return audit_files([FileChange(path, data, list(range(len(data.get("questions", [])))))])
+
+def audit_batch(changed: list[FileChange], batch_size: int = BATCH_SIZE) -> list[dict]:
+    """
+    Shorten every long question in `changed` through one Message Batch of
+    `batch_size`-question requests; questions a reply leaves out are asked
+    for again directly.
+    """
+    loaded = load_long_questions(changed)
+    run = AuditRun(loaded)
+    groups = chunked(settle_cached(run, loaded), batch_size)
+    texts = [[run.data[path]["questions"][i]["question"] for path, i in group] for group in groups]
+    requests = [batch_request(f"b{n:05d}", MODEL, QUESTION_TOKENS * len(questions),
+                              shorten_prompt(questions))
+                for n, questions in enumerate(texts)]
+
+    print(f"{len(requests)} requests to submit\n")
+    done = failed = 0
+    with metrics.span("batch_api", requests=len(requests)):
+        results = run_batch(get_client(), requests, log)
+
+    for n, (group, questions) in enumerate(zip(groups, texts)):
+        message = results.get(f"b{n:05d}")
+        first = None
+        if message is not None:
+            metrics.record("batch_result", 0.0, category=group[0][0].name,
+                           **usage_fields(message.usage))
+            first = parse_shortened(message.content[0].text, len(questions))
+        try:
+            shortened = shorten_questions(questions, first, category=group[0][0].name)
+        except Exception as e:
+            print(f"  !! {len(group)} questions: {e}")
+            shortened = first or {}
+        for k, (path, i) in enumerate(group):
+            if k in shortened:
+                done += 1
+            else:
+                failed += 1
+                print(f"  !! [{run.data[path]['questions'][i].get('id', i)}] not shortened")
+            run.settle(path, i, shortened.get(k))
+
+    print_totals(done, failed, len(groups))
+    return run.all_changes()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shorten over-long trivia questions")
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Submit every long question through the Message Batches API"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=CONCURRENCY, metavar="N",
+        help=f"API requests in flight at once (default: {CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, metavar="N",
+        help=f"Questions per request (default: {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=REQUESTS_PER_MIN,
+        help=f"Requests-per-minute budget (default: {REQUESTS_PER_MIN})"
+    )
+    parser.add_argument(
+        "--since", metavar="WHEN",
+        help="Only files modified since WHEN: 30m, 12h, 3d, or a date like 2026-10-01"
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Ignore the manifest and check every question"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignore earlier answers and do not record API responses"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Call the API even for questions answered before, and record the new answers"
+    )
+    add_metrics_arguments(parser, METRICS_FILE)
+    args = parser.parse_args()
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError as e:
+        parser.error(f"--since: {e}")
+
+    if args.summary:
+        print(summarize(args.metrics))
+        return
+
+    if not os.environ.get("ANTHROPIC_API_KEY") and not fake.enabled():
+        print("ANTHROPIC_API_KEY is not set")
+        raise SystemExit(1)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    global metrics, manifest, read_cache
+    client = get_client()
+    client.limiter = FileRateLimiter(RATE_LIMIT_FILE, args.rpm, TOKENS_PER_MIN)
+    read_cache = not (args.refresh or args.no_cache)
+    if not args.no_cache:
+        client.cache = ResponseCache(RESPONSE_CACHE_FILE, refresh=args.refresh)
+    metrics = metrics_from_args(args, "trivia-audit")
+
+    files = sorted([
+        p for p in QUESTIONS_DIR.glob("*.json")
+        if p.name not in SKIP and not p.name.endswith("_raw.json")
+    ])
+
+    manifest = Manifest(MANIFEST_FILE)
+    if args.full:
+        manifest.reset()
+    manifest.forget_missing(files)
+    with metrics.span("scan", files=len(files)) as span:
+        changed = manifest.scan(files, since)
+        span["changed"] = len(changed)
+
+    questions = sum(len(c.indexes) for c in changed)
+    print(f"Auditing {questions} changed questions in {len(changed)} of {len(files)} files "
+          f"(target: <{MAX_WORDS} words)...\n")
+
+    try:
+        if args.batch:
+            all_changes = audit_batch(changed, max(1, args.batch_size))
+        else:
+            all_changes = audit_files(changed, args.concurrency, max(1, args.batch_size))
+    finally:
+        manifest.save()
+    cache.compact()
+    if client.cache:
+        print(f"\n{client.cache.summary()}")
+        client.cache.close()
+    metrics.close()
+
+    print(f"\n{'='*60}")
+    print(f"Done. {len(all_changes)} questions shortened across {len(set(c['file'] for c in all_changes))} files.")
+
+if __name__ == "__main__":
+    main()
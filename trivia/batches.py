@@ -0,0 +1,74 @@
+"""
+trivia/batches.py — Submit many prompts as one Message Batch and collect the results.
+
+Batches are processed asynchronously at a discount, so bulk generation and
+audit runs submit everything up front and poll instead of making one
+blocking call per prompt. Requests the client's response cache already
+holds (see trivia/client.py) are answered from it and left out of the batch.
+"""
+
+import time
+
+from trivia.client import request_key
+
+POLL_INITIAL = 10.0   # seconds before the first status check
+POLL_MAX     = 300.0  # cap on the poll interval
+POLL_FACTOR  = 1.5
+
+
+def batch_request(custom_id: str, model: str, max_tokens: int, prompt: str,
+                  system: list[dict] | None = None) -> dict:
+    params = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if system:
+        params["system"] = system
+    return {"custom_id": custom_id, "params": params}
+
+
+def run_batch(client, requests: list[dict], log, label: str = "") -> dict:
+    """
+    Submit `requests`, poll until the batch ends, and return
+    {custom_id: message} — None for requests that did not succeed.
+    """
+    cache = getattr(client, "cache", None)
+    messages = {}
+    if cache:
+        for req in requests:
+            hit = cache.get(request_key(req["params"]))
+            if hit is not None:
+                messages[req["custom_id"]] = hit
+        if messages:
+            log.info(f"{label}{len(messages)} of {len(requests)} requests answered from the response cache")
+        requests = [req for req in requests if req["custom_id"] not in messages]
+    if not requests:
+        return messages
+    params = {req["custom_id"]: req["params"] for req in requests}
+    batch = client.messages.batches.create(requests=requests)
+    log.info(f"{label}Submitted batch {batch.id} ({len(requests)} requests)")
+
+    delay = POLL_INITIAL
+    while batch.processing_status != "ended":
+        batch = client.messages.batches.retrieve(batch.id)
+        if batch.processing_status == "ended":
+            break
+        counts = batch.request_counts
+        log.info(f"{label}Batch {batch.id}: {counts.processing} processing, "
+                 f"{counts.succeeded} succeeded — next check in {delay:.0f}s")
+        time.sleep(delay)
+        delay = min(POLL_MAX, delay * POLL_FACTOR)
+
+    for entry in client.messages.batches.results(batch.id):
+        if entry.result.type == "succeeded":
+            messages[entry.custom_id] = entry.result.message
+            if cache:
+                cache.put(request_key(params[entry.custom_id]), params[entry.custom_id]["model"],
+                          entry.result.message)
+        else:
+            log.warning(f"{label}{entry.custom_id}: batch result {entry.result.type}")
+            messages[entry.custom_id] = None
+    for req in requests:
+        messages.setdefault(req["custom_id"], None)
+    return messages
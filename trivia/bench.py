@@ -0,0 +1,413 @@
+"""
+trivia/bench.py — Offline throughput benchmarks for trivia/gen.py and trivia/audit.py.
+
+Runs each script's real main() against trivia/fake.py in a temporary content
+directory, with a simulated backend (latency, output token rate, injected 429
+and 529 errors, malformed lines), and reports wall-clock time, calls/sec,
+tokens/sec, retries and the parse-failure rate. The `micro` suite times the
+generation parsing and output helpers on a synthetic 100k-line response.
+
+The `startup` suite runs each `python3 -m trivia` command in a fresh
+interpreter under -X importtime and fails (exit status 1) when an offline
+command's imports exceed STARTUP_BUDGET_MS or any command pulls in the API
+stack (API_MODULES) before its first request.
+
+Usage:
+    python3 -m trivia.bench                          # gen + audit + micro + startup
+    python3 -m trivia.bench gen --concurrency 8 --latency 1 --tokens-per-sec 60
+    python3 -m trivia.bench audit --rate-limit-rate 0.2
+    python3 -m trivia.bench micro --lines 100000 --json
+    python3 -m trivia.bench startup --startup-budget 40
+"""
+
+import argparse
+import compileall
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from trivia.corpus import BASE_DIR, QUESTIONS_DIR, question_files
+from trivia.client import SharedClient
+from trivia.fake import FakeAsyncAnthropic, Profile, fake_line, fake_words, garble
+from trivia.journal import Journal
+
+SUITES = ("gen", "audit", "micro", "startup")
+
+# Default backend: fast enough for a quick run, with enough faults to exercise retries
+LATENCY         = 0.2
+TOKENS_PER_SEC  = 1000
+RATE_LIMIT_RATE = 0.05
+ERROR_RATE      = 0.02
+MALFORMED_RATE  = 0.02
+
+# Budget handed to the scripts, high enough that the limiter is not what gets
+# measured unless --rpm/--tpm bring it down to the real account limits
+REQUESTS_PER_MIN = 1000
+TOKENS_PER_MIN   = 2_000_000
+
+GEN_CATEGORIES  = 6
+AUDIT_QUESTIONS = 200
+MICRO_LINES     = 100_000
+
+# Commands and the arguments they are timed with: real work where it is quick
+# and read-only, --help otherwise. Offline commands must import within
+# STARTUP_BUDGET_MS (interpreter start-up included); no command may import
+# API_MODULES before its first request.
+OFFLINE_COMMANDS = [["list"], ["validate"], ["stats"], ["bundle", "--help"], ["dedup", "--help"]]
+API_COMMANDS     = [["gen", "--help"], ["audit", "--help"], ["enrich", "--help"]]
+STARTUP_BUDGET_MS = 75
+API_MODULES = ("anthropic", "httpx", "asyncio")
+
+
+def load_script(name: str):
+    """
+    A fresh copy of a command module (e.g. "gen" for trivia/gen.py), so one
+    suite's patches to its globals do not leak into the next.
+    """
+    path = Path(__file__).parent / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(f"trivia.{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class RetryCounter(logging.Handler):
+    """Counts the warnings call_with_backoff logs before each retry."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.retries = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if "retry" in record.getMessage():
+            self.retries += 1
+
+
+@contextlib.contextmanager
+def quiet_run(logger_name: str, argv: list[str]):
+    """Silence a script's console output and count its retries while main() runs."""
+    logger = logging.getLogger(logger_name)
+    counter = RetryCounter()
+    logger.addHandler(counter)
+    saved_argv, saved_root = sys.argv, logging.root.handlers[:]
+    sys.argv = argv
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            yield counter
+    finally:
+        sys.argv = saved_argv
+        logging.root.handlers[:] = saved_root
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            if handler is not counter:
+                handler.close()
+
+
+def flow_report(name: str, wall: float, client: FakeAsyncAnthropic, retries: int,
+                lines: int = 0, parse_failures: int = 0, **extra) -> dict:
+    stats = client.stats.as_dict()
+    return {
+        "suite": name,
+        "wall_s": round(wall, 3),
+        "calls": stats["calls"],
+        "calls_per_s": round(stats["calls"] / wall, 2) if wall else 0.0,
+        "output_tokens_per_s": round(stats["output_tokens"] / wall, 1) if wall else 0.0,
+        "retries": retries,
+        "injected_429": stats["rate_limited"],
+        "injected_5xx": stats["errors"],
+        "parse_failure_rate": round(parse_failures / lines, 4) if lines else None,
+        **extra,
+    }
+
+
+# ── Full flows ─────────────────────────────────────────────────────────────
+
+def bench_gen(profile: Profile, categories: int, script_args: list[str]) -> dict:
+    tg = load_script("gen")
+    with tempfile.TemporaryDirectory(prefix="trivia-bench-") as tmp:
+        tmp = Path(tmp)
+        tg.OUTPUT_DIR = tmp / "questions"
+        tg.OUTPUT_DIR.mkdir()
+        tg.CHECKPOINT = tmp / "trivia-gen-checkpoint.json"
+        tg.LOG_FILE = tmp / "trivia-gen.log"
+        tg.METRICS_FILE = tmp / "trivia-gen-metrics.jsonl"
+        tg.RATE_LIMIT_FILE = tmp / "trivia-ratelimit.json"
+        tg.RESPONSE_CACHE_FILE = tmp / "trivia-responses.sqlite"
+        client = FakeAsyncAnthropic(profile=profile)
+        tg._client = SharedClient(client)
+
+        parsed = {"lines": 0, "failures": 0}
+        parse_line = tg.parse_line
+
+        def counting_parse_line(line: str) -> dict | None:
+            q = parse_line(line)
+            if line.strip():
+                parsed["lines"] += 1
+                parsed["failures"] += q is None
+            return q
+
+        tg.parse_line = counting_parse_line
+        slugs = [slug for slug, _, _ in tg.CATEGORIES[:categories]]
+        with quiet_run("trivia-gen", ["trivia-gen.py", "--categories", *slugs, *script_args]) as counter:
+            started = time.perf_counter()
+            try:
+                tg.main()
+            except SystemExit:
+                pass  # failed categories are reported below
+            wall = time.perf_counter() - started
+
+        written = sum(len(json.loads(p.read_text())["questions"])
+                      for p in tg.OUTPUT_DIR.glob("*_raw.json"))
+    return flow_report("gen", wall, client, counter.retries, parsed["lines"],
+                       parsed["failures"], categories=len(slugs), questions_written=written)
+
+
+def synthetic_long_questions(n: int) -> dict:
+    """A question file of `n` questions, all over the audit's word limit."""
+    questions = []
+    for i in range(n):
+        w = fake_words(f"bench-audit:{i}", 26)
+        questions.append({
+            "id": f"bench_{i + 1:03d}",
+            "question": "In " + " ".join(w[:24]) + ", which is the " + w[24] + "?",
+            "answers": [{"text": w[25].title(), "correct": True},
+                        {"text": "A", "correct": False},
+                        {"text": "B", "correct": False},
+                        {"text": "C", "correct": False}],
+            "difficulty": "medium",
+            "category": "Benchmark",
+        })
+    return {"category": "Benchmark", "metadata": {}, "questions": questions}
+
+
+def bench_audit(profile: Profile, synthetic: int, tpm: int, script_args: list[str]) -> dict:
+    ta = load_script("audit")
+    with tempfile.TemporaryDirectory(prefix="trivia-bench-") as tmp:
+        tmp = Path(tmp)
+        questions_dir = tmp / "questions"
+        questions_dir.mkdir()
+        for path in question_files(QUESTIONS_DIR, include_raw=False):
+            shutil.copy(path, questions_dir / path.name)
+        (questions_dir / "bench-synthetic.json").write_text(
+            json.dumps(synthetic_long_questions(synthetic), indent=2))
+
+        ta.QUESTIONS_DIR = questions_dir
+        ta.TOKENS_PER_MIN = tpm  # the audit has no --tpm flag
+        ta.METRICS_FILE = tmp / "trivia-audit-metrics.jsonl"
+        ta.MANIFEST_FILE = tmp / "trivia-audit-manifest.json"
+        ta.cache = Journal(tmp / "trivia-audit-cache.json", ta._apply_cache_record,
+                           lambda: {"entries": {}})
+        ta._cache_entries = None
+        ta.RATE_LIMIT_FILE = tmp / "trivia-ratelimit.json"
+        ta.RESPONSE_CACHE_FILE = tmp / "trivia-responses.sqlite"
+        client = FakeAsyncAnthropic(profile=profile)
+        ta._client = SharedClient(client)
+
+        with quiet_run("trivia-audit", ["trivia-audit.py", *script_args]) as counter:
+            started = time.perf_counter()
+            try:
+                ta.main()
+            except SystemExit:
+                pass
+            wall = time.perf_counter() - started
+    return flow_report("audit", wall, client, counter.retries, synthetic_questions=synthetic)
+
+
+# ── Microbenchmarks ────────────────────────────────────────────────────────
+
+def synthetic_response(n: int) -> str:
+    """`n` generation lines, one in a hundred garbled."""
+    lines = [fake_line(f"bench_{i + 1:06d}", "Benchmark") for i in range(n)]
+    for i in range(0, n, 100):
+        lines[i] = garble(lines[i])
+    return "\n".join(lines)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_micro(n: int, repeat: int) -> list[dict]:
+    tg = load_script("gen")
+    text = synthetic_response(n)
+    questions, _ = tg.parse_response(text)
+
+    def stream_parse() -> None:
+        parser = tg.LineParser()
+        for i in range(0, len(text), 40):
+            parser.feed(text[i:i + 40])
+        parser.close()
+
+    cases = [
+        ("parse_response", lambda: tg.parse_response(text), n),
+        ("LineParser (40-char deltas)", stream_parse, n),
+        ("validate_batch", lambda: tg.validate_batch(questions, expected=len(questions)), len(questions)),
+        ("questions_to_json", lambda: tg.questions_to_json(questions, "Benchmark"), len(questions)),
+    ]
+    results = []
+    for name, fn, items in cases:
+        seconds = best_of(fn, repeat)
+        results.append({"suite": "micro", "case": name, "items": items,
+                        "best_s": round(seconds, 4),
+                        "items_per_s": round(items / seconds) if seconds else 0})
+    return results
+
+
+# ── Start-up ───────────────────────────────────────────────────────────────
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Cumulative microseconds of every module in -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit():
+            modules[name[1:]] = int(cumulative)  # nesting is kept as leading spaces
+    return modules
+
+
+def bench_startup(repeat: int, budget_ms: float) -> list[dict]:
+    # Timed as installed: with bytecode compiled, whatever PYTHONDONTWRITEBYTECODE says
+    compileall.compile_dir(Path(__file__).parent, quiet=1)
+    results = []
+    for command in OFFLINE_COMMANDS + API_COMMANDS:
+        argv = [sys.executable, "-m", "trivia", *command]
+        best_wall = best_import = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run(argv, cwd=BASE_DIR, capture_output=True)
+            best_wall = min(best_wall, time.perf_counter() - started)
+            proc = subprocess.run([sys.executable, "-X", "importtime", *argv[1:]],
+                                  cwd=BASE_DIR, capture_output=True, text=True)
+            modules = parse_importtime(proc.stderr)
+            top = {name: us for name, us in modules.items() if not name.startswith(" ")}
+            best_import = min(best_import, sum(top.values()) / 1000)
+        heaviest = sorted(top, key=top.get, reverse=True)[:3]
+        api = sorted({name.strip().split(".")[0] for name in modules} & set(API_MODULES))
+        results.append({
+            "suite": "startup",
+            "command": " ".join(command),
+            "wall_ms": round(best_wall * 1000, 1),
+            "import_ms": round(best_import, 1),
+            "heaviest": {name: round(top[name] / 1000, 1) for name in heaviest},
+            "api_modules": api,
+            "ok": not api and (command in API_COMMANDS or best_import <= budget_ms),
+        })
+    return results
+
+
+# ── Report ─────────────────────────────────────────────────────────────────
+
+def print_report(results: list[dict]) -> None:
+    for r in results:
+        if r["suite"] == "startup":
+            heaviest = ", ".join(f"{name} {ms:g}ms" for name, ms in r["heaviest"].items())
+            api = f"  loads {', '.join(r['api_modules'])}" if r["api_modules"] else ""
+            print(f"  startup  {r['command']:<16} {r['wall_ms']:>7.1f}ms wall  "
+                  f"{r['import_ms']:>6.1f}ms imports  {'ok ' if r['ok'] else 'FAIL'}  "
+                  f"({heaviest}){api}")
+            continue
+        if r["suite"] == "micro":
+            print(f"  micro  {r['case']:<30} {r['items']:>7} items  {r['best_s']:>8.4f}s  "
+                  f"{r['items_per_s']:>10,}/s")
+            continue
+        failure = r["parse_failure_rate"]
+        extra = "  ".join(f"{k}={v}" for k, v in r.items()
+                          if k in {"categories", "questions_written", "synthetic_questions"})
+        print(f"  {r['suite']:<5}  {r['wall_s']:>7.2f}s  {r['calls']:>4} calls  "
+              f"{r['calls_per_s']:>6.2f} calls/s  {r['output_tokens_per_s']:>8.1f} tok/s  "
+              f"{r['retries']:>3} retries ({r['injected_429']}×429, {r['injected_5xx']}×529)  "
+              f"parse failures {'-' if failure is None else f'{failure:.1%}'}  {extra}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the trivia scripts against a fake backend")
+    parser.add_argument("suites", nargs="*", metavar="SUITE",
+                        help=f"Any of {', '.join(SUITES)} (default: all)")
+    backend = parser.add_argument_group("simulated backend")
+    backend.add_argument("--latency", type=float, default=LATENCY,
+                         help=f"Seconds to first token (default: {LATENCY})")
+    backend.add_argument("--tokens-per-sec", type=float, default=TOKENS_PER_SEC,
+                         help=f"Output token rate, 0 for instant (default: {TOKENS_PER_SEC})")
+    backend.add_argument("--rate-limit-rate", type=float, default=RATE_LIMIT_RATE,
+                         help=f"Share of calls answered 429 (default: {RATE_LIMIT_RATE})")
+    backend.add_argument("--error-rate", type=float, default=ERROR_RATE,
+                         help=f"Share of calls answered 529 (default: {ERROR_RATE})")
+    backend.add_argument("--malformed-rate", type=float, default=MALFORMED_RATE,
+                         help=f"Share of generated lines garbled (default: {MALFORMED_RATE})")
+    backend.add_argument("--seed", type=int, default=1)
+    flows = parser.add_argument_group("script options")
+    flows.add_argument("--categories", type=int, default=GEN_CATEGORIES,
+                       help=f"Categories for the gen run (default: {GEN_CATEGORIES})")
+    flows.add_argument("--audit-questions", type=int, default=AUDIT_QUESTIONS,
+                       help=f"Synthetic long questions added to the audit run (default: {AUDIT_QUESTIONS})")
+    flows.add_argument("--concurrency", type=int, help="Passed to both scripts")
+    flows.add_argument("--rpm", type=int, default=REQUESTS_PER_MIN,
+                       help=f"Requests-per-minute budget for both scripts (default: {REQUESTS_PER_MIN})")
+    flows.add_argument("--tpm", type=int, default=TOKENS_PER_MIN,
+                       help=f"Tokens-per-minute budget for both scripts (default: {TOKENS_PER_MIN})")
+    flows.add_argument("--batch", action="store_true", help="Run both scripts in --batch mode")
+    flows.add_argument("--no-stream", action="store_true", help="Pass --no-stream to trivia-gen.py")
+    micro = parser.add_argument_group("microbenchmarks")
+    micro.add_argument("--lines", type=int, default=MICRO_LINES,
+                       help=f"Synthetic response size (default: {MICRO_LINES})")
+    micro.add_argument("--repeat", type=int, default=3,
+                       help="Best of N runs, for micro and startup (default: 3)")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS, metavar="MS",
+                        help=f"Import time allowed per offline command (default: {STARTUP_BUDGET_MS})")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite: {', '.join(sorted(unknown))}")
+
+    os.environ["TRIVIA_FAKE_API"] = "1"
+    profile = Profile(latency=args.latency, tokens_per_sec=args.tokens_per_sec,
+                      rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+                      malformed_rate=args.malformed_rate, seed=args.seed)
+    shared = ["--rpm", str(args.rpm)]
+    if args.concurrency:
+        shared += ["--concurrency", str(args.concurrency)]
+    if args.batch:
+        shared.append("--batch")
+
+    results = []
+    for suite in dict.fromkeys(args.suites or SUITES):
+        if not args.json:
+            print(f"Running {suite}…", flush=True)
+        if suite == "gen":
+            gen_args = shared + ["--tpm", str(args.tpm)] + (["--no-stream"] if args.no_stream else [])
+            results.append(bench_gen(profile, args.categories, gen_args))
+        elif suite == "audit":
+            results.append(bench_audit(profile, args.audit_questions, args.tpm, shared))
+        elif suite == "micro":
+            results.extend(bench_micro(args.lines, args.repeat))
+        else:
+            results.extend(bench_startup(args.repeat, args.startup_budget))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print()
+        print_report(results)
+    if not all(r.get("ok", True) for r in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+trivia/bundle.py — Compile content/questions/*.json into a single compact bundle.
+
+The viewers used to fetch every category file separately (30+ requests of
+pretty-printed JSON that repeats "correct": false and "category" on every
+answer and question). The bundle is one minified JSON Lines file:
+
+  line 1      header — format/version, the interned difficulty table, and one
+              entry per category: name, file slug, metadata, question count,
+              difficulty counts, and the byte offset/length of its line
+  line 2..n   one line per category, columnar:
+                ids   question IDs
+                q     question text
+                d     difficulty, as an index into header.difficulties
+                a     answer texts, in file order
+                c     index of the correct answer in `a`
+                x     index of the absurd answer in `a`, or -1
+
+Category lines can be parsed lazily (or fetched alone with an HTTP Range
+request using the header offsets), so a client that only needs one category
+never parses the rest. Alongside the plain bundle, gzip and — when the
+optional `brotli` package is installed — brotli precompressed copies are
+written for servers that serve static .gz/.br files.
+
+Usage:
+    python3 -m trivia.bundle            # build content/questions.bundle.jsonl(.gz/.br)
+    python3 -m trivia.bundle --report   # also compare against per-file loading
+"""
+
+import argparse
+import gzip
+import json
+import time
+from pathlib import Path
+
+from trivia.corpus import QUESTIONS_DIR, load_file, question_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_FILE = QUESTIONS_DIR.parent / "questions.bundle.jsonl"
+
+FORMAT = "trivia-bundle"
+VERSION = 1
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+_COMPACT = {"ensure_ascii": False, "separators": (",", ":")}
+
+
+class BundleError(ValueError):
+    pass
+
+
+def compile_category(data: dict, name: str = "") -> dict:
+    """Columnar form of one category file; BundleError on a question it cannot encode."""
+    levels = {d: i for i, d in enumerate(DIFFICULTIES)}
+    ids, texts, diffs, answers, correct, absurd = [], [], [], [], [], []
+    for q in data.get("questions", []):
+        if q.get("difficulty") not in levels:
+            raise BundleError(f"{name}: {q.get('id', '?')}: difficulty {q.get('difficulty')!r} "
+                              f"is not one of {', '.join(DIFFICULTIES)}")
+        ids.append(q["id"])
+        texts.append(q["question"])
+        diffs.append(levels[q["difficulty"]])
+        answers.append([a["text"] for a in q["answers"]])
+        correct.append(next((i for i, a in enumerate(q["answers"]) if a.get("correct")), -1))
+        absurd.append(next((i for i, a in enumerate(q["answers"]) if a.get("absurd")), -1))
+    return {"ids": ids, "q": texts, "d": diffs, "a": answers, "c": correct, "x": absurd}
+
+
+def build_bundle(questions_dir: Path = QUESTIONS_DIR) -> bytes:
+    entries, lines = [], []
+    for path in question_files(questions_dir, include_raw=False):
+        data = load_file(path)
+        if not data.get("questions"):
+            continue
+        columns = compile_category(data, path.name)
+        lines.append(json.dumps(columns, **_COMPACT).encode() + b"\n")
+        entries.append({
+            "name": data.get("category", path.stem),
+            "file": path.stem,
+            "metadata": data.get("metadata", {}),
+            "count": len(columns["ids"]),
+            "difficulty": [columns["d"].count(i) for i in range(len(DIFFICULTIES))],
+        })
+
+    # Offsets depend on the header's own length, so lay it out until it is stable
+    header_len = 0
+    while True:
+        pos = header_len
+        for entry, line in zip(entries, lines):
+            entry["offset"], entry["length"] = pos, len(line)
+            pos += len(line)
+        header = json.dumps({
+            "format": FORMAT,
+            "version": VERSION,
+            "difficulties": DIFFICULTIES,
+            "total": sum(e["count"] for e in entries),
+            "categories": entries,
+        }, **_COMPACT).encode() + b"\n"
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+    return header + b"".join(lines)
+
+
+def write_bundle(out: Path = BUNDLE_FILE, compress: bool = True,
+                 questions_dir: Path = QUESTIONS_DIR) -> dict[str, int]:
+    """Write the bundle (and precompressed copies); return {path: size}."""
+    data = build_bundle(questions_dir)
+    outputs = {out: data}
+    if compress:
+        outputs[out.with_name(out.name + ".gz")] = gzip.compress(data, 9, mtime=0)
+        if brotli is not None:
+            outputs[out.with_name(out.name + ".br")] = brotli.compress(data, quality=11)
+    for path, blob in outputs.items():
+        path.write_bytes(blob)
+    return {str(path): len(blob) for path, blob in outputs.items()}
+
+
+def load_bundle(path: Path = BUNDLE_FILE, wanted: list[str] | None = None) -> list[dict]:
+    """
+    Expand a bundle back into the per-file JSON shape the viewers use. Like
+    the viewers, it reads the header and then only the lines of the `wanted`
+    category files (default: all), by their offsets.
+    """
+    with open(path, "rb") as f:
+        header = json.loads(f.readline())
+        levels = header["difficulties"]
+        files = []
+        for entry in header["categories"]:
+            if wanted is not None and entry["file"] not in wanted:
+                continue
+            f.seek(entry["offset"])
+            files.append(expand_category(entry, json.loads(f.read(entry["length"])), levels))
+    return files
+
+
+def expand_category(entry: dict, cols: dict, levels: list[str]) -> dict:
+    """One category line back in the per-file JSON shape."""
+    questions = []
+    for i, qid in enumerate(cols["ids"]):
+        answers = []
+        for j, text in enumerate(cols["a"][i]):
+            answer = {"text": text, "correct": j == cols["c"][i]}
+            if j == cols["x"][i]:
+                answer["absurd"] = True
+            answers.append(answer)
+        questions.append({"id": qid, "question": cols["q"][i], "answers": answers,
+                          "difficulty": levels[cols["d"][i]], "category": entry["name"]})
+    return {"category": entry["name"], "metadata": entry["metadata"], "questions": questions}
+
+
+def report(out: Path, sizes: dict[str, int], questions_dir: Path = QUESTIONS_DIR) -> None:
+    files = question_files(questions_dir, include_raw=False)
+    per_file = [p.read_bytes() for p in files]
+    per_file_raw = sum(map(len, per_file))
+    per_file_gz = sum(len(gzip.compress(b, 9, mtime=0)) for b in per_file)
+
+    start = time.perf_counter()
+    for blob in per_file:
+        json.loads(blob)
+    per_file_parse = time.perf_counter() - start
+
+    # Loaded as the viewers load it: header, then the wanted category lines
+    bundle = out.read_bytes()
+    start = time.perf_counter()
+    load_bundle(out)
+    bundle_parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    one = load_bundle(out, [files[0].stem]) if files else []
+    one_parse = time.perf_counter() - start
+
+    print(f"{'':<24}{'requests':>10}{'bytes':>12}{'gzip':>12}{'load':>12}")
+    print(f"{'per-file JSON':<24}{len(files):>10}{per_file_raw:>12,}{per_file_gz:>12,}"
+          f"{per_file_parse * 1000:>10.2f}ms")
+    gz = sizes.get(str(out.with_name(out.name + ".gz")), 0)
+    print(f"{'bundle':<24}{1:>10}{len(bundle):>12,}{gz:>12,}{bundle_parse * 1000:>10.2f}ms")
+    if one:
+        print(f"{'bundle, one category':<24}{2:>10}{'':>12}{'':>12}{one_parse * 1000:>10.2f}ms"
+              f"  ({one[0]['category']})")
+    br = sizes.get(str(out.with_name(out.name + ".br")))
+    if br:
+        print(f"brotli: {br:,} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile question files into one bundle")
+    parser.add_argument("--out", type=Path, default=BUNDLE_FILE,
+                        help=f"Output path (default: {BUNDLE_FILE.relative_to(QUESTIONS_DIR.parent.parent)})")
+    parser.add_argument("--no-compress", action="store_true",
+                        help="Skip the .gz/.br precompressed copies")
+    parser.add_argument("--report", action="store_true",
+                        help="Compare size and parse time against per-file loading")
+    args = parser.parse_args()
+
+    try:
+        sizes = write_bundle(args.out, compress=not args.no_compress)
+    except BundleError as e:
+        parser.exit(1, f"Bundle not built — {e}\n")
+    for path, size in sizes.items():
+        print(f"{size:>10,}  {path}")
+    if args.report:
+        print()
+        report(args.out, sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+trivia/categories.py — The categories trivia/gen.py generates.
+
+Kept apart from the generator so listing them (`python3 -m trivia list`)
+imports nothing else.
+"""
+
+import argparse
+
+from trivia.corpus import QUESTIONS_DIR
+
+# (slug, display_name, id_prefix)
+CATEGORIES = [
+    ("animals",       "Animals",        "ani"),
+    ("art",           "Art",            "art"),
+    ("biology",       "Biology",        "bio"),
+    ("chemistry",     "Chemistry",      "chem"),
+    ("food",          "Food",           "food"),
+    ("geography",     "Geography",      "geo"),
+    ("human-body",    "The Human Body", "hb"),
+    ("inventions",    "Inventions",     "inv"),
+    ("languages",     "Languages",      "lang"),
+    ("literature",    "Literature",     "lit"),
+    ("mathematics",   "Mathematics",    "math"),
+    ("movies",        "Movies",         "mov"),
+    ("music",         "Music",          "mus"),
+    ("mythology",     "Mythology",      "myth"),
+    ("physics",       "Physics",        "phys"),
+    ("space",         "Space",          "spc"),
+    ("sports",        "Sports",         "spt"),
+    ("technology",    "Technology",     "tech"),
+    ("world-records", "World Records",  "wr"),
+]
+
+CATEGORY_MAP = {slug: (slug, name, prefix) for slug, name, prefix in CATEGORIES}
+
+
+def category_files(slug: str) -> list[str]:
+    """Names of the files under content/questions that exist for `slug`."""
+    return [name for name in (f"{slug}.json", f"{slug}_raw.json")
+            if (QUESTIONS_DIR / name).exists()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List the categories the generator knows")
+    parser.parse_args()
+    for slug, name, prefix in CATEGORIES:
+        print(f"{slug:<16}  {name:<16}  {prefix + '_':<7}  {', '.join(category_files(slug)) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
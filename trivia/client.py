@@ -0,0 +1,308 @@
+"""
+trivia/client.py — One pooled API client shared by trivia/gen.py and trivia/audit.py.
+
+SharedClient drives an AsyncAnthropic on a background event loop, so all of a
+run's requests are multiplexed over one keep-alive connection pool, and
+exposes blocking methods for the scripts' worker threads:
+
+    create(...)   one message, under the rate limiter and the retry policy;
+                  a request identical to one already in flight waits for
+                  that one's answer instead of being sent again
+    stream(...)   a MessageStream-like context manager (text_stream,
+                  get_final_message()) fed from the loop
+    call_stream(fn, …)   run fn(stream) over a streamed response: a cached
+                  one is replayed outside the limiter; a live one runs under
+                  the limiter and retry policy and settles its reservation
+    call(fn, …)   run any attempt under the same limiter and retry policy
+    messages.batches.create/retrieve/results   for trivia/batches.py
+
+With a ResponseCache attached (trivia/response_cache.py), create() and
+stream() answer requests seen before from disk, and store every complete
+response they receive.
+
+Every call gets the same timeouts (TIMEOUT, CONNECT_TIMEOUT) and retry
+policy (MAX_ATTEMPTS, see trivia/ratelimit.py); the SDK's own retries are
+off so retries respect the shared budget. The scripts use a FileRateLimiter
+on RATE_LIMIT_FILE, so runs in separate processes share the account budget.
+
+With TRIVIA_FAKE_API=1 the loop drives trivia/fake.py's FakeAsyncAnthropic.
+"""
+
+import hashlib
+import json
+import queue
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import Callable, TypeVar
+
+from trivia import fake
+from trivia.corpus import BASE_DIR
+from trivia.ratelimit import FileRateLimiter, RateLimiter, call_with_backoff
+from trivia.response_cache import ResponseCache
+
+T = TypeVar("T")
+
+RATE_LIMIT_FILE = BASE_DIR / "content" / "trivia-ratelimit.json"
+
+MAX_CONNECTIONS   = 32    # open connections to the API
+KEEPALIVE_SECONDS = 30.0  # idle connections kept for reuse
+CONNECT_TIMEOUT   = 10.0
+TIMEOUT           = 120.0  # per read; a stream may run longer as long as tokens keep coming
+MAX_ATTEMPTS      = 6
+REPLAY_CHUNK      = 64     # characters per text delta when replaying a cached stream
+
+_END = object()
+
+
+def api_client():
+    """A pooled AsyncAnthropic (or the offline fake) with SDK retries off."""
+    if fake.enabled():
+        return fake.FakeAsyncAnthropic()
+    import anthropic
+    # The SDK's own httpx Limits class, so the pool settings match its transport
+    limits = type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_SECONDS,
+    )
+    return anthropic.AsyncAnthropic(
+        max_retries=0,
+        timeout=anthropic.Timeout(TIMEOUT, connect=CONNECT_TIMEOUT),
+        http_client=anthropic.DefaultAsyncHttpxClient(limits=limits),
+    )
+
+
+def request_key(params: dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def billed_tokens(usage) -> int:
+    """Tokens that count against the per-minute budget (cache reads do not)."""
+    return (usage.input_tokens + usage.output_tokens
+            + (getattr(usage, "cache_creation_input_tokens", 0) or 0))
+
+
+class _SyncStream:
+    """Blocking view of an AsyncMessageStream running on the client's loop."""
+
+    cached = False
+
+    def __init__(self, client: "SharedClient", params: dict):
+        self._client = client
+        self._params = params
+        self._queue: queue.Queue = queue.Queue()
+        self._future: Future | None = None
+
+    async def _pump(self):
+        try:
+            async with self._client.api.messages.stream(**self._params) as stream:
+                async for text in stream.text_stream:
+                    self._queue.put(text)
+                message = await stream.get_final_message()
+            self._client.store(self._params, message)
+            return message
+        finally:
+            self._queue.put(_END)
+
+    def __enter__(self):
+        self._future = self._client.submit(self._pump())
+        return self
+
+    def __exit__(self, *exc):
+        # Leaving early (e.g. a cancelled bad stream) closes the HTTP stream
+        if not self._future.done():
+            self._future.cancel()
+        return False
+
+    @property
+    def text_stream(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                self._future.result()  # re-raise a failed stream here
+                return
+            yield item
+
+    def get_final_message(self):
+        return self._future.result()
+
+    def received(self):
+        """The final message if the response arrived in full, else None."""
+        future = self._future
+        if future is None or not future.done() or future.cancelled() or future.exception():
+            return None
+        return future.result()
+
+
+class _CachedStream:
+    """A recorded response replayed through the same interface as _SyncStream."""
+
+    cached = True
+
+    def __init__(self, message):
+        self._message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        text = self._message.content[0].text
+        for i in range(0, len(text), REPLAY_CHUNK):
+            yield text[i:i + REPLAY_CHUNK]
+
+    def get_final_message(self):
+        return self._message
+
+
+class _SyncBatches:
+    def __init__(self, client: "SharedClient"):
+        self._client = client
+
+    def create(self, requests: list[dict]):
+        return self._client.run(self._client.api.messages.batches.create(requests=requests))
+
+    def retrieve(self, batch_id: str):
+        return self._client.run(self._client.api.messages.batches.retrieve(batch_id))
+
+    def results(self, batch_id: str) -> list:
+        async def collect():
+            return [entry async for entry in await self._client.api.messages.batches.results(batch_id)]
+        return self._client.run(collect())
+
+
+class SharedClient:
+    def __init__(self, api=None, limiter: RateLimiter | FileRateLimiter | None = None,
+                 max_attempts: int = MAX_ATTEMPTS, cache: ResponseCache | None = None):
+        self._api = api
+        self.limiter = limiter
+        self.cache = cache
+        self.max_attempts = max_attempts
+        self.coalesced = 0
+        self.messages = SimpleNamespace(batches=_SyncBatches(self))
+        self._loop: "asyncio.AbstractEventLoop | None" = None
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = api_client()
+        return self._api
+
+    def _get_loop(self) -> "asyncio.AbstractEventLoop":
+        with self._lock:
+            if self._loop is None:
+                # asyncio is imported with the first request, not with the
+                # module, so commands that never call the API start quickly
+                import asyncio
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="trivia-api-loop",
+                                 daemon=True).start()
+            return self._loop
+
+    def submit(self, coro) -> Future:
+        """Schedule `coro` on the client's loop."""
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def run(self, coro):
+        """Run `coro` on the client's loop and wait for its result."""
+        return self.submit(coro).result()
+
+    def call(self, fn: Callable[[], T], tokens: int, log, label: str = "",
+             on_event: Callable[[str, float], None] | None = None) -> T:
+        """Run `fn` under the limiter and the retry policy."""
+        return call_with_backoff(fn, self.limiter, tokens, log, label,
+                                 self.max_attempts, on_event)
+
+    def call_stream(self, fn: Callable[[_SyncStream | _CachedStream], T], tokens: int, log,
+                    label: str = "", on_event: Callable[[str, float], None] | None = None,
+                    **params) -> T:
+        """
+        `fn(stream)` over a streamed response to `params`. Whether it is a
+        cache hit is decided once, by the lookup that returns the response:
+        a hit is replayed without touching the budget; a miss is a live
+        request under the limiter and retry policy, and only a live response
+        settles the `tokens` reserved for it. A failed attempt is refunded by
+        the retry policy; if its response did arrive (fn rejected it), that
+        response's usage is still billed.
+        """
+        cached = self.cache.get(request_key(params)) if self.cache else None
+        if cached is not None:
+            with _CachedStream(cached) as stream:
+                return fn(stream)
+
+        def attempt() -> T:
+            with _SyncStream(self, params) as stream:
+                try:
+                    result = fn(stream)
+                except Exception:
+                    message = stream.received()
+                    if message is not None:
+                        self.settle(0, message.usage)
+                    raise
+                self.settle(tokens, stream.get_final_message().usage)
+            return result
+
+        return self.call(attempt, tokens, log, label, on_event)
+
+    def store(self, params: dict, message) -> None:
+        """Record a complete response in the cache, if there is one."""
+        if self.cache and getattr(message, "stop_reason", None):
+            self.cache.put(request_key(params), params.get("model", ""), message)
+
+    def settle(self, estimated: int, usage) -> None:
+        if self.limiter:
+            self.limiter.settle(estimated, billed_tokens(usage))
+
+    def create(self, tokens: int, log, label: str = "",
+               on_event: Callable[[str, float], None] | None = None, **params):
+        """
+        One message for `params`, reserving `tokens` of budget. A caller whose
+        request is already in flight shares its result (and is told through
+        on_event("coalesced", 0)) instead of spending budget on a copy.
+        """
+        key = request_key(params)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            if on_event:
+                on_event("cached", 0.0)
+            return cached
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = self._inflight[key] = Future()
+        if pending is not None:
+            self.coalesced += 1
+            if on_event:
+                on_event("coalesced", 0.0)
+            return pending.result()
+        try:
+            message = self.call(lambda: self.run(self.api.messages.create(**params)),
+                                tokens, log, label, on_event)
+            self.settle(tokens, message.usage)
+            self.store(params, message)
+            future.set_result(message)
+            return message
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stream(self, **params) -> _SyncStream | _CachedStream:
+        cached = self.cache.get(request_key(params)) if self.cache else None
+        if cached is not None:
+            return _CachedStream(cached)
+        return _SyncStream(self, params)
+
+    @property
+    def stats(self):
+        """Call counters of the offline fake (None against the real API)."""
+        return getattr(self._api, "stats", None)
@@ -0,0 +1,40 @@
+"""
+trivia/corpus.py — Locating and reading the question files under content/questions.
+"""
+
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+BASE_DIR      = Path(__file__).resolve().parent.parent
+QUESTIONS_DIR = BASE_DIR / "content" / "questions"
+
+NON_QUESTION_FILES = {"schema.json"}
+MAX_WORDS = 20  # "Target under 20 words" — QUESTION_RULES.md
+
+
+def question_files(questions_dir: Path = QUESTIONS_DIR,
+                   include_raw: bool = True) -> list[Path]:
+    """Every category file, sorted; `_raw.json` generator output optional."""
+    return sorted(
+        p for p in questions_dir.glob("*.json")
+        if p.name not in NON_QUESTION_FILES
+        and (include_raw or not p.name.endswith("_raw.json"))
+    )
+
+
+def load_file(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_questions(questions_dir: Path = QUESTIONS_DIR,
+                   include_raw: bool = True) -> Iterator[tuple[Path, dict]]:
+    """Yield (file, question) for every question in the corpus."""
+    for path in question_files(questions_dir, include_raw):
+        for q in load_file(path).get("questions", []):
+            yield path, q
+
+
+def correct_answer(q: dict) -> str:
+    return next((a["text"] for a in q.get("answers", []) if a.get("correct")), "")
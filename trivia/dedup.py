@@ -0,0 +1,381 @@
+"""
+trivia/dedup.py — Near-duplicate question index over content/questions.
+
+Each question is reduced to character 4-gram shingles of its normalized text
+(lowercase, punctuation and stop words removed) and summarized by a 64-value
+one-permutation MinHash signature (one hash per shingle, split into 64 bins,
+empty bins filled from a fixed pseudo-random donor bin sequence). Signatures are split into 16 bands of 4 for
+locality sensitive hashing, so finding candidates for a question is a handful of dict
+lookups rather than a scan of the corpus; candidates are then confirmed by
+their estimated Jaccard similarity.
+
+The index is persisted (content/trivia-dedup-index.pickle) keyed by a hash
+of each question's text, so a refresh only re-signs questions that changed.
+
+Two questions are reported as duplicates when either
+  • their question text is at least QUESTION_THRESHOLD similar, or
+  • they share a normalized correct answer and are at least
+    ANSWER_THRESHOLD similar (bare numbers such as years are too common
+    to count as a shared answer).
+
+Usage:
+    python3 -m trivia.dedup                  # print near-duplicate clusters
+    python3 -m trivia.dedup --threshold 0.5  # looser matching
+    python3 -m trivia.dedup --json           # machine-readable output
+"""
+
+import argparse
+import json
+import pickle
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import defaultdict
+from hashlib import blake2b
+from pathlib import Path
+
+from trivia.corpus import QUESTIONS_DIR, correct_answer, iter_questions
+
+INDEX_NAME = "trivia-dedup-index.pickle"  # saved next to the questions directory
+
+NUM_PERM = 64
+BANDS    = 16
+ROWS     = NUM_PERM // BANDS
+SHINGLE  = 4
+
+QUESTION_THRESHOLD = 0.7
+ANSWER_THRESHOLD   = 0.3
+
+INDEX_VERSION = 5
+
+STOP_WORDS = frozenset("""
+a an the of in on at to for by with from and or is are was were be been
+what which who whom whose when where why how this that these those it its
+as into than then does did do has have had
+""".split())
+
+_PUNCT     = re.compile(r"[^\w\s]")
+_BIN_BITS  = 64 - (NUM_PERM - 1).bit_length()
+_BIN_MASK  = (1 << _BIN_BITS) - 1
+_EMPTY     = (1 << 64) - 1
+# Donor bins tried, in order, to fill each empty bin ("optimal densification")
+_DONORS    = tuple(tuple(random.Random(i).sample(range(NUM_PERM), NUM_PERM))
+                   for i in range(NUM_PERM))
+
+
+def normalize(text: str) -> str:
+    words = _PUNCT.sub(" ", text.lower()).split()
+    return " ".join(w for w in words if w not in STOP_WORDS)
+
+
+def answer_key(answer: str) -> str:
+    norm = normalize(answer)
+    return "" if norm.replace(" ", "").isdigit() else norm
+
+
+def shingles(norm: str) -> set[str]:
+    return {norm[i:i + SHINGLE] for i in range(max(1, len(norm) - SHINGLE + 1))}
+
+
+def signature(norm: str) -> array:
+    """One-permutation MinHash: the top bits of each shingle hash pick a bin."""
+    bins = [_EMPTY] * NUM_PERM
+    for gram in shingles(norm):
+        h = int.from_bytes(blake2b(gram.encode(), digest_size=8).digest(), "little")
+        b, v = h >> _BIN_BITS, h & _BIN_MASK
+        if v < bins[b]:
+            bins[b] = v
+    sig = list(bins)
+    for i, v in enumerate(bins):
+        if v != _EMPTY:
+            continue
+        for donor in _DONORS[i]:
+            if bins[donor] != _EMPTY:
+                sig[i] = bins[donor]
+                break
+    return array("Q", sig)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _band_keys(sig: bytes) -> list[bytes]:
+    width = ROWS * 8
+    return [sig[b * width:(b + 1) * width] + bytes((b,)) for b in range(BANDS)]
+
+
+class DedupIndex:
+    """
+    MinHash/LSH index of questions, keyed by "<file>:<id>". Storage is
+    columnar — one flat signature array plus parallel lists indexed by slot —
+    so the whole index saves and loads as a few large buffers.
+    """
+
+    def __init__(self):
+        self.keys: list[str | None] = []
+        self.hashes = array("Q")
+        self.sigs = array("Q")
+        self.answers: list[str] = []
+        self.sources: list[str] = []
+        self._slots: dict[str, int] = {}
+        self._free: list[int] = []
+        self._buckets: dict[bytes, list[int]] = defaultdict(list)
+        self._by_answer: dict[str, list[int]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _sig(self, slot: int) -> array:
+        return self.sigs[slot * NUM_PERM:(slot + 1) * NUM_PERM]
+
+    def source(self, key: str) -> str:
+        return self.sources[self._slots[key]]
+
+    def answer(self, key: str) -> str:
+        return self.answers[self._slots[key]]
+
+    # ── maintenance ──
+
+    def add(self, key: str, question: str, answer: str = "", source: str = "") -> None:
+        norm = normalize(question)
+        text_hash = zlib.crc32(f"{norm}\0{answer}".encode())
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                if self.hashes[slot] == text_hash:
+                    return
+                self._remove(key)
+            sig = signature(norm)
+            if self._free:
+                slot = self._free.pop()
+                self.keys[slot] = key
+                self.hashes[slot] = text_hash
+                self.sigs[slot * NUM_PERM:(slot + 1) * NUM_PERM] = sig
+                self.answers[slot] = answer_key(answer)
+                self.sources[slot] = source
+            else:
+                slot = len(self.keys)
+                self.keys.append(key)
+                self.hashes.append(text_hash)
+                self.sigs.extend(sig)
+                self.answers.append(answer_key(answer))
+                self.sources.append(source)
+            self._slots[key] = slot
+            self._link(slot)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        for band in _band_keys(self._sig(slot).tobytes()):
+            self._buckets[band].remove(slot)
+        if self.answers[slot]:
+            self._by_answer[self.answers[slot]].remove(slot)
+        self.keys[slot] = None
+        self._free.append(slot)
+
+    def _link(self, slot: int) -> None:
+        for band in _band_keys(self._sig(slot).tobytes()):
+            self._buckets[band].append(slot)
+        if self.answers[slot]:
+            self._by_answer[self.answers[slot]].append(slot)
+
+    def refresh(self, questions_dir: Path = QUESTIONS_DIR) -> int:
+        """Sync the index with the files on disk; return the number of questions seen."""
+        seen = set()
+        for path, q in iter_questions(questions_dir):
+            key = f"{path.name}:{q['id']}"
+            seen.add(key)
+            self.add(key, q["question"], correct_answer(q), path.name)
+        for key in set(self._slots) - seen:
+            self.remove(key)
+        return len(seen)
+
+    # ── queries ──
+
+    def _is_dup(self, sig: array, answer: str, slot: int, threshold: float) -> float | None:
+        sim = similarity(sig, self._sig(slot))
+        if sim >= threshold or (answer and self.answers[slot] == answer
+                                and sim >= ANSWER_THRESHOLD):
+            return sim
+        return None
+
+    def matches(self, question: str, answer: str = "", exclude_source: str = "",
+                threshold: float = QUESTION_THRESHOLD,
+                exclude_key: str = "") -> list[tuple[str, float]]:
+        """Indexed questions that duplicate `question`, most similar first."""
+        sig = signature(normalize(question))
+        norm_answer = answer_key(answer)
+        with self._lock:
+            candidates = set()
+            for band in _band_keys(sig.tobytes()):
+                candidates.update(self._buckets.get(band, ()))
+            if norm_answer:
+                candidates.update(self._by_answer.get(norm_answer, ()))
+            found = []
+            for slot in candidates:
+                key = self.keys[slot]
+                if key == exclude_key or (exclude_source and self.sources[slot] == exclude_source):
+                    continue
+                sim = self._is_dup(sig, norm_answer, slot, threshold)
+                if sim is not None:
+                    found.append((key, sim))
+        return sorted(found, key=lambda m: -m[1])
+
+    def clusters(self, threshold: float = QUESTION_THRESHOLD) -> list[list[str]]:
+        """Groups of linked near-duplicates (union-find over LSH candidate pairs)."""
+        parent: dict[int, int] = {}
+
+        def find(x: int) -> int:
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while x != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        checked: set[tuple[int, int]] = set()
+
+        def check(group: list[int]) -> None:
+            for i, a in enumerate(group):
+                sig_a = self._sig(a)
+                for b in group[i + 1:]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    if self._is_dup(sig_a, self.answers[a], b, threshold) is not None:
+                        parent.setdefault(a, a)
+                        parent.setdefault(b, b)
+                        parent[find(a)] = find(b)
+
+        with self._lock:
+            for group in self._buckets.values():
+                if len(group) > 1:
+                    check(group)
+            for group in self._by_answer.values():
+                if len(group) > 1:
+                    check(group)
+            groups: dict[int, list[str]] = defaultdict(list)
+            for slot in parent:
+                groups[find(slot)].append(self.keys[slot])
+        return sorted((sorted(g) for g in groups.values() if len(g) > 1),
+                      key=lambda g: (-len(g), g))
+
+    # ── persistence ──
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            live = [slot for slot, key in enumerate(self.keys) if key is not None]
+            sigs = array("Q")
+            for slot in live:
+                sigs.extend(self._sig(slot))
+            payload = {
+                "version": INDEX_VERSION,
+                "num_perm": NUM_PERM,
+                "keys": [self.keys[s] for s in live],
+                "hashes": array("Q", (self.hashes[s] for s in live)).tobytes(),
+                "sigs": sigs.tobytes(),
+                "answers": [self.answers[s] for s in live],
+                "sources": [self.sources[s] for s in live],
+            }
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "DedupIndex":
+        index = cls()
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return index
+        if payload.get("version") != INDEX_VERSION or payload.get("num_perm") != NUM_PERM:
+            return index
+        index.keys = payload["keys"]
+        index.hashes.frombytes(payload["hashes"])
+        index.sigs.frombytes(payload["sigs"])
+        index.answers = payload["answers"]
+        index.sources = payload["sources"]
+        index._slots = {key: slot for slot, key in enumerate(index.keys)}
+
+        raw, stride, width = payload["sigs"], NUM_PERM * 8, ROWS * 8
+        buckets = index._buckets
+        for b in range(BANDS):
+            tag = bytes((b,))
+            for slot in range(len(index.keys)):
+                start = slot * stride + b * width
+                buckets[raw[start:start + width] + tag].append(slot)
+        for slot, answer in enumerate(index.answers):
+            if answer:
+                index._by_answer[answer].append(slot)
+        return index
+
+
+def index_path(questions_dir: Path = QUESTIONS_DIR) -> Path:
+    return questions_dir.parent / INDEX_NAME
+
+
+def load_index(questions_dir: Path = QUESTIONS_DIR) -> DedupIndex:
+    """Load the persisted index, bring it up to date with disk, and save it back."""
+    path = index_path(questions_dir)
+    index = DedupIndex.load(path)
+    index.refresh(questions_dir)
+    index.save(path)
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report near-duplicate trivia questions")
+    parser.add_argument("--threshold", type=float, default=QUESTION_THRESHOLD,
+                        help=f"Question similarity threshold (default: {QUESTION_THRESHOLD})")
+    parser.add_argument("--json", action="store_true", help="Print clusters as JSON")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the saved index and re-sign every question")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.rebuild and index_path().exists():
+        index_path().unlink()
+    index = load_index()
+    loaded = time.perf_counter()
+    clusters = index.clusters(args.threshold)
+    done = time.perf_counter()
+
+    if args.json:
+        json.dump({
+            "questions": len(index),
+            "clusters": [
+                [{"key": k, "answer": index.answer(k)} for k in c]
+                for c in clusters
+            ],
+        }, sys.stdout, indent=2)
+        print()
+        return
+
+    texts = {f"{p.name}:{q['id']}": (q["question"], correct_answer(q))
+             for p, q in iter_questions()}
+    for cluster in clusters:
+        print(f"── {len(cluster)} similar")
+        for key in cluster:
+            question, answer = texts.get(key, ("?", "?"))
+            print(f"  {key:<36} {question}  [{answer}]")
+    print(f"\n{len(clusters)} clusters across {len(index)} questions "
+          f"(index {loaded - started:.2f}s, clustering {done - loaded:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+trivia/enrich.py — Add the fifth, absurd answer to generated questions.
+
+Hand-curated files carry an `"absurd": true` answer on most questions (see
+content/absurd-answer-examples.md); the `_raw.json` files trivia/gen.py
+writes come out with four. This stage streams through those files one at a
+time, sends the questions still missing an absurd answer BATCH_SIZE to a
+prompt in the generator's compact pipe format, runs the batches on a worker
+pool through the shared client (trivia/client.py), and rewrites each file
+atomically as soon as its last batch is answered.
+
+Replies are one `[id] | absurd: [answer]` line per question. A line for an
+ID that was not asked for, or an answer repeating one of the question's own,
+is dropped, and the IDs still missing are asked for again (REPAIR_ROUNDS).
+Questions that already have an absurd answer are skipped, so an interrupted
+run picks up where it stopped; with the response cache (trivia/response_cache.py)
+a repeated run costs no API calls either.
+
+Usage:
+    python3 -m trivia enrich                          # every _raw.json file
+    python3 -m trivia enrich --categories animals art # specific slugs
+    python3 -m trivia enrich --batch-size 40 --concurrency 8
+    python3 -m trivia enrich --curated                # also fill gaps in curated files
+    python3 -m trivia enrich --summary                # where the time went in the last run
+
+Set TRIVIA_FAKE_API=1 to run against the offline stub in trivia/fake.py.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+
+from trivia import fake
+from trivia.client import RATE_LIMIT_FILE, SharedClient
+from trivia.corpus import BASE_DIR, QUESTIONS_DIR, correct_answer, load_file, question_files
+from trivia.journal import atomic_write_text
+from trivia.metrics import (Metrics, add_metrics_arguments, metrics_from_args,
+                            summarize, usage_fields)
+from trivia.ratelimit import FileRateLimiter
+from trivia.response_cache import RESPONSE_CACHE_FILE, ResponseCache
+
+EXAMPLES_FILE = BASE_DIR / "content" / "absurd-answer-examples.md"
+METRICS_FILE  = BASE_DIR / "content" / "trivia-enrich-metrics.jsonl"
+
+MODEL            = "claude-sonnet-4-6"
+BATCH_SIZE       = 25     # questions per prompt
+ANSWER_TOKENS    = 24     # output budget per question
+CONCURRENCY      = 4
+REQUESTS_PER_MIN = 50
+TOKENS_PER_MIN   = 80_000
+REPAIR_ROUNDS    = 2
+
+log = logging.getLogger("trivia-enrich")
+
+_client: SharedClient | None = None
+
+
+def get_client() -> SharedClient:
+    """The run's shared client, built on first use rather than at import."""
+    global _client
+    if _client is None:
+        _client = SharedClient(limiter=FileRateLimiter(RATE_LIMIT_FILE, REQUESTS_PER_MIN,
+                                                       TOKENS_PER_MIN))
+    return _client
+
+
+metrics = Metrics()  # replaced in main() by one that writes METRICS_FILE
+
+# ── Prompts ────────────────────────────────────────────────────────────────
+# As in trivia/gen.py: a static system prompt (format, rules and the quality
+# standard) marked for prompt caching, and a short user message per batch.
+
+def build_system_prompt(examples: str) -> str:
+    return f"""You write the absurd fifth answer for trivia questions in a party game.
+
+An absurd answer is deliberately wrong and funny, but close enough to the question
+to cause a one-or-two-second pause: a name that overlaps with the correct answer,
+shared lore, a real thing from the wrong category, or a format or unit confusion.
+
+INPUT — one question per line:
+[id] | [question] | correct: [answer] | wrong: [ans1] / [ans2] / [ans3]
+
+OUTPUT FORMAT — one line per question, in the same order:
+[id] | absurd: [answer]
+
+RULES:
+- Output ONLY the answer lines — no headers, no commentary, no blank lines
+- One line for every ID given, and no other IDs
+- Never the correct answer, and never one of the question's wrong answers
+- Short: an answer a player reads at a glance, like the others
+
+QUALITY STANDARD:
+{examples}"""
+
+
+_system_prompt: str | None = None
+
+def get_system_prompt() -> str:
+    global _system_prompt
+    if _system_prompt is None:
+        examples = EXAMPLES_FILE.read_text(encoding="utf-8") if EXAMPLES_FILE.exists() else ""
+        _system_prompt = build_system_prompt(examples.strip())
+    return _system_prompt
+
+
+def question_line(q: dict) -> str:
+    """A question in the compact format trivia/gen.py's LINE_RE parses."""
+    wrong = [a["text"] for a in q["answers"] if not a.get("correct") and not a.get("absurd")]
+    return (f"{q['id']} | {q['question']} | correct: {correct_answer(q)} | "
+            f"wrong: {' / '.join(wrong[:3])}")
+
+
+def build_prompt(category: str, questions: list[dict], attempt: int = 0) -> str:
+    """
+    The request for `questions`. A retry says so, which also keeps the
+    response cache from replaying the reply that left these questions out.
+    """
+    lines = "\n".join(question_line(q) for q in questions)
+    retry = (f"\n\n(Retry {attempt}: these questions were missing or unusable in the last reply.)"
+             if attempt else "")
+    return f"""Write an absurd answer for each of these {len(questions)} questions from the category: {category}
+
+{lines}{retry}"""
+
+
+# ── Reply parser ───────────────────────────────────────────────────────────
+
+ABSURD_RE = re.compile(r'^(?P<id>\w+)\s*\|\s*absurd:\s*(?P<absurd>.+?)\s*$', re.IGNORECASE)
+
+
+def parse_reply(text: str, questions: list[dict]) -> dict[str, str]:
+    """
+    The usable answers in `text`, by ID: only IDs that were asked for, the
+    first line for each, and never an answer the question already has.
+    """
+    by_id = {q["id"]: q for q in questions}
+    answers = {}
+    for line in text.splitlines():
+        m = ABSURD_RE.match(line.strip())
+        if not m or m.group("id") not in by_id or m.group("id") in answers:
+            continue
+        absurd = m.group("absurd").strip().strip('"')
+        taken = {a["text"].strip().casefold() for a in by_id[m.group("id")]["answers"]}
+        if absurd and absurd.casefold() not in taken:
+            answers[m.group("id")] = absurd
+    return answers
+
+
+def has_absurd(q: dict) -> bool:
+    return any(a.get("absurd") for a in q.get("answers", []))
+
+
+# ── Batches ────────────────────────────────────────────────────────────────
+
+class FileJob:
+    """One file being enriched: its data and how many of its batches are still out."""
+
+    def __init__(self, path: Path, data: dict):
+        self.path = path
+        self.data = data
+        self.pending = 0
+        self.added = 0
+        self.missing: list[str] = []
+        self.started = time.monotonic()
+
+
+def iter_batches(files: list[Path], size: int) -> Iterator[tuple[FileJob, list[dict]]]:
+    """
+    Yield (job, questions) for each batch of questions without an absurd
+    answer, loading a file only once the batches before it have been taken.
+    """
+    for path in files:
+        data = load_file(path)
+        todo = [q for q in data.get("questions", []) if not has_absurd(q)]
+        if not todo:
+            print(f"✓ {path.name}")
+            continue
+        print(f"→ {path.name} ({len(todo)} to enrich)")
+        job = FileJob(path, data)
+        batches = [todo[i:i + size] for i in range(0, len(todo), size)]
+        job.pending = len(batches)
+        for batch in batches:
+            yield job, batch
+
+
+def ask(category_name: str, questions: list[dict], attempt: int = 0,
+        **span_attrs) -> dict[str, str]:
+    prompt = build_prompt(category_name, questions, attempt)
+    max_tokens = ANSWER_TOKENS * len(questions) + 64
+    with metrics.span("api", mode="call", attempt=attempt, **span_attrs) as span:
+        message = get_client().create(
+            len(prompt) // 4 + max_tokens, log, span_attrs.get("category", ""),
+            on_event=metrics.backoff_observer(span),
+            model=MODEL,
+            max_tokens=max_tokens,
+            system=[{"type": "text", "text": get_system_prompt(),
+                     "cache_control": {"type": "ephemeral"}}],
+            messages=[{"role": "user", "content": prompt}],
+        )
+        # A coalesced call shares another caller's response and its usage
+        if not span.get("coalesced"):
+            span.update(usage_fields(message.usage))
+    return parse_reply(message.content[0].text, questions)
+
+
+def enrich_batch(job: FileJob, questions: list[dict]) -> tuple[int, list[str]]:
+    """
+    Add an absurd answer to each of `questions`, asking again for the ones a
+    reply left out. Returns (added, IDs still missing).
+    """
+    category = job.data.get("category", job.path.stem)
+    todo = questions
+    for attempt in range(REPAIR_ROUNDS + 1):
+        answers = ask(category, todo, attempt, category=job.path.name)
+        for q in todo:
+            if q["id"] in answers:
+                q["answers"].append({"text": answers[q["id"]], "correct": False, "absurd": True})
+        todo = [q for q in todo if q["id"] not in answers]
+        if not todo:
+            break
+        metrics.count("repaired_ids", len(todo))
+    return len(questions) - len(todo), [q["id"] for q in todo]
+
+
+def write_file(job: FileJob) -> None:
+    with metrics.span("write", category=job.path.name):
+        atomic_write_text(job.path, json.dumps(job.data, indent=2, ensure_ascii=False))
+
+
+def enrich_files(files: list[Path], batch_size: int = BATCH_SIZE,
+                 concurrency: int = CONCURRENCY) -> tuple[int, int]:
+    """
+    Enrich `files` on a worker pool, keeping at most two batches per worker
+    queued so only the files being worked on are held in memory. Each file
+    is written as soon as its last batch is done. Returns (added, missing).
+    """
+    added = missing = 0
+    batches = iter_batches(files, batch_size)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        inflight = {}
+        while True:
+            for job, questions in batches:
+                inflight[pool.submit(enrich_batch, job, questions)] = job
+                if len(inflight) >= 2 * concurrency:
+                    break
+            if not inflight:
+                break
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = inflight.pop(future)
+                try:
+                    n, left = future.result()
+                except Exception as e:
+                    print(f"  !! {job.path.name}: {e}")
+                else:
+                    job.added += n
+                    job.missing += left
+                job.pending -= 1
+                if job.pending == 0:
+                    if job.added:
+                        write_file(job)
+                    metrics.record("category", time.monotonic() - job.started,
+                                   category=job.path.name, accepted=job.added)
+                    note = f", {len(job.missing)} without one" if job.missing else ""
+                    print(f"✎ {job.path.name}: {job.added} absurd answers added{note}")
+                    added += job.added
+                    missing += len(job.missing)
+    return added, missing
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add absurd answers to generated questions")
+    parser.add_argument("--categories", nargs="+", metavar="SLUG",
+                        help="Only these categories (default: every _raw.json file)")
+    parser.add_argument("--curated", action="store_true",
+                        help="Also fill in questions without one in the curated files")
+    parser.add_argument("--questions-dir", type=Path, default=QUESTIONS_DIR, metavar="DIR",
+                        help=f"Where the question files are (default: {QUESTIONS_DIR})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, metavar="N",
+                        help=f"Questions per request (default: {BATCH_SIZE})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, metavar="N",
+                        help=f"Requests at once (default: {CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MIN,
+                        help=f"Requests-per-minute budget (default: {REQUESTS_PER_MIN})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not replay or record API responses")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Call the API even for requests answered before, and record the new answers")
+    add_metrics_arguments(parser, METRICS_FILE)
+    args = parser.parse_args()
+
+    if args.summary:
+        print(summarize(args.metrics))
+        return
+
+    if not os.environ.get("ANTHROPIC_API_KEY") and not fake.enabled():
+        print("ANTHROPIC_API_KEY is not set")
+        raise SystemExit(1)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    global metrics
+    client = get_client()
+    client.limiter = FileRateLimiter(RATE_LIMIT_FILE, args.rpm, TOKENS_PER_MIN)
+    if not args.no_cache:
+        client.cache = ResponseCache(RESPONSE_CACHE_FILE, refresh=args.refresh)
+    metrics = metrics_from_args(args, "trivia-enrich")
+
+    files = [p for p in question_files(args.questions_dir)
+             if args.curated or p.name.endswith("_raw.json")]
+    if args.categories:
+        slugs = set(args.categories)
+        files = [p for p in files if p.stem.removesuffix("_raw") in slugs]
+    if not files:
+        print("No question files to enrich")
+        return
+
+    print(f"Enriching {len(files)} files, {args.batch_size} questions per request...\n")
+    try:
+        added, missing = enrich_files(files, max(1, args.batch_size), args.concurrency)
+    finally:
+        if client.cache:
+            print(f"\n{client.cache.summary()}")
+            client.cache.close()
+        metrics.close()
+
+    print(f"\n{'='*60}")
+    print(f"Done. {added} absurd answers added"
+          + (f", {missing} questions still without one." if missing else "."))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+"""
+trivia/fake.py — Offline stand-in for the Anthropic client.
+
+Answers the prompts trivia/gen.py, trivia/audit.py and trivia/enrich.py send
+with canned but well-formed text, and implements the Message Batches
+endpoints, so every flow can be exercised without network access or an API
+key. FakeAnthropic mirrors anthropic.Anthropic and FakeAsyncAnthropic mirrors
+AsyncAnthropic (what trivia/client.py drives).
+
+A Profile adds the behaviour of a real backend for benchmarking (see
+trivia/bench.py): time to first token, an output token rate, injected 429 and
+5xx errors, and a share of malformed generation lines. Every knob defaults to
+off and can also be set from the environment:
+
+    TRIVIA_FAKE_LATENCY         seconds before the first token
+    TRIVIA_FAKE_TOKENS_PER_SEC  output token rate, 0 for instant
+    TRIVIA_FAKE_429_RATE        share of calls answered with 429
+    TRIVIA_FAKE_ERROR_RATE      share of calls answered with 529
+    TRIVIA_FAKE_MALFORMED_RATE  share of generated lines that are garbled
+    TRIVIA_FAKE_SEED            seed for the injected faults
+
+Enable with TRIVIA_FAKE_API=1.
+"""
+
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+IDS_RE      = re.compile(r"IDs to use \(in order\): (\w+?)_(\d+) through \w+?_(\d+)")
+REPAIR_RE   = re.compile(r"IDs to use \(exactly these, in order\): (.+)")
+CATEGORY_RE = re.compile(r"party game category: (.+)")
+SHORTEN_RE  = re.compile(r"^(q\d+) \| (.+)$", re.MULTILINE)
+ENRICH_RE   = re.compile(r"^Write an absurd answer for each of these")
+ENRICH_ID_RE = re.compile(r"^(\w+) \| .+ \| correct: ", re.MULTILINE)
+# What fake_line produces; anything else in a generation reply was garbled
+LINE_OK_RE  = re.compile(r"^\w+ \| .+ \| correct: .+ \| wrong: .+ / .+ / .+$")
+
+
+def enabled() -> bool:
+    return bool(os.environ.get("TRIVIA_FAKE_API"))
+
+
+class Profile:
+    """Simulated backend behaviour; the defaults answer instantly and never fail."""
+
+    def __init__(self, latency: float = 0.0, tokens_per_sec: float = 0.0,
+                 rate_limit_rate: float = 0.0, error_rate: float = 0.0,
+                 malformed_rate: float = 0.0, retry_after: float = 0.05,
+                 seed: int | None = None):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        # Injected errors carry a short retry-after so backoff does not
+        # dominate a benchmark run
+        self.retry_after = retry_after
+        self.seed = seed
+
+    @classmethod
+    def from_env(cls) -> "Profile":
+        env = os.environ.get
+        seed = env("TRIVIA_FAKE_SEED")
+        return cls(
+            latency=float(env("TRIVIA_FAKE_LATENCY", 0)),
+            tokens_per_sec=float(env("TRIVIA_FAKE_TOKENS_PER_SEC", 0)),
+            rate_limit_rate=float(env("TRIVIA_FAKE_429_RATE", 0)),
+            error_rate=float(env("TRIVIA_FAKE_ERROR_RATE", 0)),
+            malformed_rate=float(env("TRIVIA_FAKE_MALFORMED_RATE", 0)),
+            seed=int(seed) if seed else None,
+        )
+
+
+class FakeAPIError(Exception):
+    """Injected API error, shaped like anthropic.APIStatusError for is_retryable()."""
+
+    def __init__(self, status_code: int, retry_after: float):
+        super().__init__(f"Error code: {status_code} (injected)")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class Stats:
+    """Thread-safe counters of what the fake was asked to do."""
+
+    FIELDS = ("calls", "rate_limited", "errors", "lines", "malformed_lines",
+              "input_tokens", "output_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for field, n in counts.items():
+                setattr(self, field, getattr(self, field) + n)
+
+    def as_dict(self) -> dict[str, int]:
+        with self._lock:
+            return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def _prompt_text(messages: list[dict]) -> str:
+    content = messages[-1]["content"]
+    if isinstance(content, str):
+        return content
+    return "\n".join(block.get("text", "") for block in content)
+
+
+_SYLLABLES = ("ka", "lo", "mi", "zu", "ten", "bar", "vo", "rin", "sa", "del",
+              "qua", "fen", "tor", "ly", "nox", "pe", "gri", "um", "so", "zet")
+
+
+def fake_words(seed: str, n: int) -> list[str]:
+    """Deterministic nonsense words, distinct enough not to trip the dedup index."""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+            for _ in range(n)]
+
+
+def fake_line(qid: str, category: str, salt: str = "") -> str:
+    w = fake_words(f"{category}:{qid}{salt}", 7)
+    return (f"{qid} | Which {w[0]} of {category} is known for the {w[1]} {w[2]}? | "
+            f"correct: {w[3].title()} | wrong: {w[4].title()} / {w[5].title()} / {w[6].title()}")
+
+
+def garble(line: str) -> str:
+    """A line the generation parser cannot read: fields run together, one answer lost."""
+    return line.replace(" | ", " ", 2).rsplit(" / ", 1)[0]
+
+
+def fake_reply(prompt: str, malformed: float = 0.0, rng: random.Random | None = None) -> str:
+    """
+    Build a plausible model reply for a generation, enrichment or audit
+    prompt, garbling a `malformed` share of generated lines (enrichment and
+    audit replies leave that share out instead).
+    """
+    m = IDS_RE.search(prompt)
+    repair = REPAIR_RE.search(prompt)
+    if m or repair:
+        if m:
+            prefix, start, end = m.group(1), int(m.group(2)), int(m.group(3))
+            ids = [f"{prefix}_{n:03d}" for n in range(start, end + 1)]
+        else:
+            ids = [qid.strip() for qid in repair.group(1).split(",")]
+        cat = CATEGORY_RE.search(prompt)
+        category = cat.group(1).strip() if cat else "General"
+        # A repair asks again for the same IDs, so vary the wording by attempt
+        salt = "" if m else f"~{(rng or random).random()}"
+        lines = [fake_line(qid, category, salt) for qid in ids]
+        if malformed:
+            rng = rng or random
+            lines = [garble(line) if rng.random() < malformed else line for line in lines]
+        return "\n".join(lines)
+    if ENRICH_RE.search(prompt):
+        rng = rng or random
+        lines = []
+        for qid in ENRICH_ID_RE.findall(prompt):
+            if malformed and rng.random() < malformed:
+                continue
+            w = fake_words(f"absurd:{qid}", 2)
+            lines.append(f"{qid} | absurd: {w[0].title()} {w[1].title()}")
+        return "\n".join(lines)
+    shorten = SHORTEN_RE.findall(prompt)
+    if shorten:
+        rng = rng or random
+        return "\n".join(f"{tag} | " + " ".join(question.split()[:15]).rstrip("?,.") + "?"
+                         for tag, question in shorten
+                         if not (malformed and rng.random() < malformed))
+    return ""
+
+
+class _PromptCache:
+    """Emulates prompt caching: the first call with a system prompt writes, later ones read."""
+
+    def __init__(self):
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def usage(self, system, prompt: str, text: str) -> SimpleNamespace:
+        cached = "".join(block.get("text", "") for block in system or [])
+        write = read = 0
+        if cached:
+            with self._lock:
+                if cached in self._seen:
+                    read = len(cached) // 4
+                else:
+                    self._seen.add(cached)
+                    write = len(cached) // 4
+        return SimpleNamespace(
+            input_tokens=len(prompt) // 4,
+            output_tokens=len(text) // 4,
+            cache_creation_input_tokens=write,
+            cache_read_input_tokens=read,
+        )
+
+
+def _message(text: str, usage: SimpleNamespace) -> SimpleNamespace:
+    return SimpleNamespace(
+        type="message",
+        stop_reason="end_turn",
+        content=[SimpleNamespace(type="text", text=text)],
+        usage=usage,
+    )
+
+
+class _Backend:
+    """Shared by every endpoint of one client: profile, counters, cache and fault RNG."""
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        self.stats = Stats()
+        self.cache = _PromptCache()
+        self._rng = random.Random(profile.seed)
+        self._lock = threading.Lock()
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def reply(self, params: dict, inject: bool = True) -> SimpleNamespace:
+        """Answer one request, or raise an injected error before any output."""
+        p = self.profile
+        if inject and (p.rate_limit_rate or p.error_rate):
+            roll = self._roll()
+            if roll < p.rate_limit_rate:
+                self.stats.add(calls=1, rate_limited=1)
+                raise FakeAPIError(429, p.retry_after)
+            if roll < p.rate_limit_rate + p.error_rate:
+                self.stats.add(calls=1, errors=1)
+                raise FakeAPIError(529, p.retry_after)
+        prompt = _prompt_text(params["messages"])
+        with self._lock:
+            text = fake_reply(prompt, p.malformed_rate, self._rng)
+        usage = self.cache.usage(params.get("system"), prompt, text)
+        lines = text.splitlines() if IDS_RE.search(prompt) or REPAIR_RE.search(prompt) else []
+        self.stats.add(calls=1, lines=len(lines),
+                       malformed_lines=sum(not LINE_OK_RE.match(line) for line in lines),
+                       input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+        return _message(text, usage)
+
+    def delay(self, tokens: int, first: bool = False) -> float:
+        """Seconds the simulated backend takes to emit `tokens`."""
+        delay = self.profile.latency if first else 0.0
+        if self.profile.tokens_per_sec:
+            delay += tokens / self.profile.tokens_per_sec
+        return delay
+
+    def pace(self, tokens: int, first: bool = False) -> None:
+        delay = self.delay(tokens, first)
+        if delay:
+            time.sleep(delay)
+
+    async def apace(self, tokens: int, first: bool = False) -> None:
+        import asyncio  # only the async fake needs it; see trivia/client.py
+        delay = self.delay(tokens, first)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class _Stream:
+    """Context manager mimicking MessageStream: text_stream plus get_final_message()."""
+
+    CHUNK = 40  # characters per text delta
+
+    def __init__(self, message: SimpleNamespace, backend: _Backend):
+        self._message = message
+        self._backend = backend
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+
+    @property
+    def text_stream(self):
+        text = self._message.content[0].text
+        for i in range(0, len(text), self.CHUNK):
+            if self.closed:
+                return
+            self._backend.pace(self.CHUNK // 4, first=i == 0)
+            yield text[i:i + self.CHUNK]
+
+    def get_final_message(self) -> SimpleNamespace:
+        return self._message
+
+
+class _Batches:
+    def __init__(self, polls_until_ended: int, backend: _Backend):
+        self._polls_until_ended = polls_until_ended
+        self._backend = backend
+        self._store: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create(self, requests: list[dict]):
+        with self._lock:
+            batch_id = f"msgbatch_fake_{next(self._ids):04d}"
+            results = [
+                SimpleNamespace(
+                    custom_id=req["custom_id"],
+                    result=SimpleNamespace(type="succeeded",
+                                           message=self._backend.reply(req["params"], inject=False)),
+                )
+                for req in requests
+            ]
+            self._store[batch_id] = {"results": results, "polls": 0}
+        return self.retrieve(batch_id, _count=False)
+
+    def retrieve(self, batch_id: str, _count: bool = True):
+        with self._lock:
+            entry = self._store[batch_id]
+            if _count:
+                entry["polls"] += 1
+            ended = entry["polls"] >= self._polls_until_ended
+            n = len(entry["results"])
+        return SimpleNamespace(
+            id=batch_id,
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else n, succeeded=n if ended else 0,
+                errored=0, canceled=0, expired=0,
+            ),
+        )
+
+    def results(self, batch_id: str):
+        return iter(self._store[batch_id]["results"])
+
+
+class _Messages:
+    def __init__(self, polls_until_ended: int, backend: _Backend):
+        self._backend = backend
+        self.batches = _Batches(polls_until_ended, backend)
+
+    def _reply(self, model: str, max_tokens: int, messages: list[dict],
+               system: list[dict] | None = None) -> SimpleNamespace:
+        return self._backend.reply({"model": model, "max_tokens": max_tokens,
+                                    "messages": messages, "system": system})
+
+    def create(self, model: str, max_tokens: int, messages: list[dict],
+               system: list[dict] | None = None, **kwargs):
+        message = self._reply(model, max_tokens, messages, system)
+        self._backend.pace(message.usage.output_tokens, first=True)
+        return message
+
+    def stream(self, model: str, max_tokens: int, messages: list[dict],
+               system: list[dict] | None = None, **kwargs):
+        return _Stream(self._reply(model, max_tokens, messages, system), self._backend)
+
+
+class FakeAnthropic:
+    """Drop-in for anthropic.Anthropic covering the calls these scripts make."""
+
+    def __init__(self, polls_until_ended: int = 1, profile: Profile | None = None,
+                 **_ignored):
+        self._backend = _Backend(profile or Profile.from_env())
+        self.messages = _Messages(polls_until_ended, self._backend)
+
+    @property
+    def stats(self) -> Stats:
+        return self._backend.stats
+
+
+# ── Async client ───────────────────────────────────────────────────────────
+
+class _AsyncStream:
+    """Async context manager mimicking AsyncMessageStream."""
+
+    CHUNK = _Stream.CHUNK
+
+    def __init__(self, message: SimpleNamespace, backend: _Backend):
+        self._message = message
+        self._backend = backend
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        text = self._message.content[0].text
+        for i in range(0, len(text), self.CHUNK):
+            await self._backend.apace(self.CHUNK // 4, first=i == 0)
+            yield text[i:i + self.CHUNK]
+
+    async def get_final_message(self) -> SimpleNamespace:
+        return self._message
+
+
+class _AsyncResults:
+    def __init__(self, results: list):
+        self._results = results
+
+    async def __aiter__(self):
+        for entry in self._results:
+            yield entry
+
+
+class _AsyncBatches:
+    def __init__(self, batches: _Batches):
+        self._batches = batches
+
+    async def create(self, requests: list[dict]):
+        return self._batches.create(requests)
+
+    async def retrieve(self, batch_id: str):
+        return self._batches.retrieve(batch_id)
+
+    async def results(self, batch_id: str) -> _AsyncResults:
+        return _AsyncResults(list(self._batches.results(batch_id)))
+
+
+class _AsyncMessages:
+    def __init__(self, messages: _Messages, backend: _Backend):
+        self._messages = messages
+        self._backend = backend
+        self.batches = _AsyncBatches(messages.batches)
+
+    async def create(self, model: str, max_tokens: int, messages: list[dict],
+                     system: list[dict] | None = None, **kwargs):
+        message = self._messages._reply(model, max_tokens, messages, system)
+        await self._backend.apace(message.usage.output_tokens, first=True)
+        return message
+
+    def stream(self, model: str, max_tokens: int, messages: list[dict],
+               system: list[dict] | None = None, **kwargs):
+        return _AsyncStream(self._messages._reply(model, max_tokens, messages, system),
+                            self._backend)
+
+
+class FakeAsyncAnthropic:
+    """Drop-in for anthropic.AsyncAnthropic, sharing FakeAnthropic's backend behaviour."""
+
+    def __init__(self, polls_until_ended: int = 1, profile: Profile | None = None,
+                 **_ignored):
+        self._backend = _Backend(profile or Profile.from_env())
+        self.messages = _AsyncMessages(_Messages(polls_until_ended, self._backend), self._backend)
+
+    @property
+    def stats(self) -> Stats:
+        return self._backend.stats
@@ -0,0 +1,1110 @@
+"""
+trivia/gen.py — Generate trivia question batches using the Anthropic Python SDK.
+
+Requires ANTHROPIC_API_KEY environment variable.
+
+Usage:
+    python3 -m trivia gen                          # run all categories in CATEGORIES list
+    python3 -m trivia gen --categories animals art  # specific slugs only
+    python3 -m trivia gen --reset                   # clear checkpoint and start over
+    python3 -m trivia gen --list                    # show available slugs and exit
+    python3 -m trivia gen --concurrency 6 --rpm 40  # tune the scheduler budget
+    python3 -m trivia gen --target animals=500 --mix 50/30/20   # plan a larger category
+    python3 -m trivia gen --batch                   # submit via the Message Batches API
+    python3 -m trivia gen --no-stream               # wait for whole responses instead of streaming
+    python3 -m trivia gen --reset --refresh         # regenerate without replaying cached responses
+    python3 -m trivia gen --summary                 # where the time went in the last run
+
+Generated _raw.json files have four answers per question; run
+`python3 -m trivia enrich` afterwards to add the fifth, absurd one.
+
+Set TRIVIA_FAKE_API=1 to run against the offline stub in trivia/fake.py.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import re
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from datetime import datetime
+from math import ceil
+
+from trivia import fake
+from trivia.batches import batch_request, run_batch
+from trivia.categories import CATEGORIES, CATEGORY_MAP
+from trivia.client import RATE_LIMIT_FILE, SharedClient
+from trivia.dedup import DedupIndex, load_index
+from trivia.journal import Journal
+from trivia.corpus import BASE_DIR, correct_answer
+from trivia.metrics import (Metrics, add_metrics_arguments, metrics_from_args,
+                            summarize, usage_fields)
+from trivia.plan import BATCH_SIZE, MIX, TARGET, Batch, parse_mix, plan_category
+from trivia.ratelimit import FileRateLimiter
+from trivia.response_cache import RESPONSE_CACHE_FILE, ResponseCache
+from trivia.usage import UsageTotals
+
+# ── Paths ──────────────────────────────────────────────────────────────────
+
+OUTPUT_DIR  = BASE_DIR / "content" / "questions"
+CHECKPOINT  = BASE_DIR / "content" / "trivia-gen-checkpoint.json"
+METRICS_FILE = BASE_DIR / "content" / "trivia-gen-metrics.jsonl"
+LOG_FILE    = Path("/var/log/trivia-gen.log")
+REF_FILE    = OUTPUT_DIR / "true-crime.json"
+
+# ── Config ─────────────────────────────────────────────────────────────────
+
+CONCURRENCY     = 4       # batches generated at once, across all categories
+REQUESTS_PER_MIN = 50     # shared API budget across all workers
+TOKENS_PER_MIN  = 80_000  # input + output tokens
+MAX_TOKENS      = 4096
+MODEL       = "claude-sonnet-4-6"
+
+# The static system prompt is cached across calls; it only qualifies for
+# caching above the model's minimum prefix length (1024 tokens for Sonnet),
+# which is what sets the number of reference examples.
+REFERENCE_COUNT = 24
+MIN_CACHE_TOKENS = 1024
+
+# Streaming: cancel a response once this share of its lines fails to parse
+STREAM_ABORT_RATIO     = 0.3
+STREAM_ABORT_MIN_LINES = 5
+
+# Targeted re-prompts for missing, repeated or malformed IDs before a batch
+# is judged against MIN_BATCH_RATIO
+REPAIR_ROUNDS = 2
+MIN_BATCH_RATIO = 0.8  # a batch with fewer questions than this share fails its category
+
+# Correct answers listed as already covered in each prompt (see topic_summary)
+TOPIC_SUMMARY_LIMIT = 150
+
+# ── Reference examples (loaded once from true-crime.json) ──────────────────
+
+def load_reference_examples() -> str:
+    if not REF_FILE.exists():
+        return ""
+    with open(REF_FILE) as f:
+        data = json.load(f)
+    lines = []
+    for q in data["questions"][:REFERENCE_COUNT]:
+        correct = next(a["text"] for a in q["answers"] if a.get("correct"))
+        wrong   = [a["text"] for a in q["answers"] if not a.get("correct")]
+        lines.append(
+            f"{q['id']} | {q['question']} | "
+            f"correct: {correct} | "
+            f"wrong: {' / '.join(wrong[:3])}"
+        )
+    return "\n".join(lines)
+
+REFERENCE_EXAMPLES = None  # loaded lazily
+SYSTEM_PROMPT = None       # built lazily from REFERENCE_EXAMPLES
+
+# ── Prompt builder ─────────────────────────────────────────────────────────
+# The prompt is split in two: a static system prompt (format, rules and
+# reference examples) that is identical on every call and marked for prompt
+# caching, and a short per-call user message with the category, ID range and
+# exclusions.
+
+def build_system_prompt(reference: str) -> str:
+    return f"""You write trivia questions for a party game.
+
+OUTPUT FORMAT — one question per line, exactly this structure:
+[id] | [question] | correct: [answer] | wrong: [ans1] / [ans2] / [ans3]
+
+RULES:
+- Output ONLY the question lines — no headers, no commentary, no blank lines
+- Use exactly the IDs requested, in order, following the requested difficulty distribution
+- 4 answers per question: 1 correct, 3 plausible wrong answers
+- Wrong answers must be genuinely plausible — not obviously incorrect
+- Questions should be accurate and factual
+- Mix question styles: who/what/when/where/which
+- Do not repeat topics across the batch
+- Never repeat a topic or correct answer listed as already covered
+
+EXAMPLE OUTPUT (match this quality and format exactly):
+{reference}"""
+
+
+def get_system_prompt(log: logging.Logger | None = None) -> str:
+    global REFERENCE_EXAMPLES, SYSTEM_PROMPT
+    if SYSTEM_PROMPT is None:
+        if REFERENCE_EXAMPLES is None:
+            REFERENCE_EXAMPLES = load_reference_examples()
+        SYSTEM_PROMPT = build_system_prompt(REFERENCE_EXAMPLES)
+        if log and len(SYSTEM_PROMPT) // 4 < MIN_CACHE_TOKENS:
+            log.warning(f"System prompt is ~{len(SYSTEM_PROMPT) // 4} tokens — "
+                        f"below the {MIN_CACHE_TOKENS}-token caching minimum")
+    return SYSTEM_PROMPT
+
+
+def system_blocks(system: str) -> list[dict]:
+    return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+
+def topic_summary(answers: list[str], limit: int = TOPIC_SUMMARY_LIMIT) -> str:
+    """
+    Compact exclusion list: the distinct correct answers already covered
+    (latest `limit`), a few tokens each instead of whole prior questions.
+    """
+    seen, distinct = set(), []
+    for answer in reversed(answers):
+        key = answer.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            distinct.append(answer.strip())
+        if len(distinct) == limit:
+            break
+    return "; ".join(reversed(distinct))
+
+
+def covered_block(summary: str) -> str:
+    if not summary:
+        return ""
+    return ("\nALREADY COVERED — do not reuse these correct answers or their topics:\n"
+            f"  {summary}\n")
+
+
+def build_prompt(category_name: str, batch: Batch, covered: str = "") -> str:
+    distribution = "\n".join(
+        f"  • {first} – {last} : {difficulty.upper()} ({count} questions)"
+        for first, last, difficulty, count in batch.runs()
+    )
+    return f"""Generate exactly {len(batch)} trivia questions for the party game category: {category_name}
+
+DIFFICULTY DISTRIBUTION FOR THIS BATCH:
+{distribution}
+
+IDs to use (in order): {batch.ids[0]} through {batch.ids[-1]}
+{covered_block(covered)}
+Generate the {category_name} questions now:"""
+
+
+def build_repair_prompt(category_name: str, batch: Batch, ids: list[str],
+                        covered: str = "", round_num: int = 1) -> str:
+    """
+    Short prompt regenerating only `ids`, with everything accepted so far as
+    exclusions. Rounds after the first say so, which also keeps the response
+    cache from replaying a previous round's reply to the same IDs.
+    """
+    difficulties = "\n".join(f"  • {qid} : {batch.difficulty_of(qid).upper()}" for qid in ids)
+    retry = (f"\n(Retry {round_num - 1}: these IDs were missing, malformed or duplicates last time.)"
+             if round_num > 1 else "")
+    return f"""Generate exactly {len(ids)} trivia questions for the party game category: {category_name}
+
+IDs to use (exactly these, in order): {", ".join(ids)}
+{difficulties}
+{covered_block(covered)}{retry}
+Generate the {category_name} questions now:"""
+
+
+# ── Compact-format parser ──────────────────────────────────────────────────
+
+LINE_RE = re.compile(
+    r'^(?P<id>[\w_]+)\s*\|\s*'
+    r'(?P<question>.+?)\s*\|\s*'
+    r'correct:\s*(?P<correct>.+?)\s*\|\s*'
+    r'wrong:\s*(?P<wrong>.+?)\s*'
+    r'(?:\|\s*absurd:\s*(?P<absurd>.+?)\s*)?$',
+    re.IGNORECASE
+)
+
+
+def parse_line(line: str) -> dict | None:
+    line = line.strip()
+    if not line:
+        return None
+    m = LINE_RE.match(line)
+    if not m:
+        return None
+    wrong_parts = [w.strip() for w in m.group("wrong").split("/") if w.strip()]
+    if len(wrong_parts) != 3:
+        return None
+    q = {
+        "id":       m.group("id").strip(),
+        "question": m.group("question").strip(),
+        "correct":  m.group("correct").strip(),
+        "wrong":    wrong_parts,
+    }
+    if m.group("absurd"):
+        q["absurd"] = m.group("absurd").strip()
+    return q
+
+
+def parse_response(text: str) -> tuple[list[dict], list[str]]:
+    questions, errors = [], []
+    for line in text.strip().splitlines():
+        result = parse_line(line)
+        if result:
+            questions.append(result)
+        elif line.strip():
+            errors.append(line[:120])
+    return questions, errors
+
+
+class LineParser:
+    """
+    Incremental parser for a streamed response. Text deltas go in through
+    feed(); each complete line is parsed and validated as soon as its newline
+    arrives, and the accepted questions are returned. `reject(q)` may return
+    a reason to drop an otherwise valid question (e.g. a duplicate); rejected
+    lines are not counted as parse errors.
+    """
+
+    def __init__(self, reject=None):
+        self._buffer = ""
+        self._seen_ids: set[str] = set()
+        self.reject = reject
+        self.questions: list[dict] = []
+        self.errors: list[str] = []
+        self.rejected: list[str] = []
+
+    def _accept(self, line: str) -> dict | None:
+        if not line.strip():
+            return None
+        q = parse_line(line)
+        if q is None or question_issues(q) or q["id"] in self._seen_ids:
+            self.errors.append(line.strip()[:120])
+            return None
+        reason = self.reject(q) if self.reject else None
+        if reason:
+            self.rejected.append(f"{q['id']}: {reason}")
+            return None
+        self._seen_ids.add(q["id"])
+        self.questions.append(q)
+        return q
+
+    def feed(self, delta: str) -> list[dict]:
+        self._buffer += delta
+        *lines, self._buffer = self._buffer.split("\n")
+        return [q for q in map(self._accept, lines) if q]
+
+    def close(self) -> list[dict]:
+        line, self._buffer = self._buffer, ""
+        q = self._accept(line)
+        return [q] if q else []
+
+    def error_ratio(self) -> float:
+        total = len(self.questions) + len(self.errors)
+        return len(self.errors) / total if total else 0.0
+
+    def should_abort(self) -> bool:
+        total = len(self.questions) + len(self.errors)
+        return total >= STREAM_ABORT_MIN_LINES and self.error_ratio() > STREAM_ABORT_RATIO
+
+
+# ── Validator ──────────────────────────────────────────────────────────────
+
+def question_issues(q: dict) -> list[str]:
+    issues = []
+    for field in ("question", "correct"):
+        if not q.get(field, "").strip():
+            issues.append(f"{q['id']}: empty {field}")
+    if len(q.get("wrong", [])) != 3:
+        issues.append(f"{q['id']}: expected 3 wrong answers")
+    return issues
+
+
+def validate_batch(questions: list[dict], expected: int = 25) -> list[str]:
+    issues = []
+    if len(questions) != expected:
+        issues.append(f"Expected {expected} questions, got {len(questions)}")
+    seen_ids = set()
+    for q in questions:
+        if q["id"] in seen_ids:
+            issues.append(f"Duplicate ID: {q['id']}")
+        seen_ids.add(q["id"])
+        issues.extend(question_issues(q))
+    return issues
+
+
+def reconcile(questions: list[dict], batch: Batch) -> tuple[list[dict], list[str]]:
+    """
+    Keep the first valid question for each ID of `batch`, in ID order, tagged
+    with its planned difficulty, and return (kept, IDs still missing).
+    Unexpected IDs, repeats and questions with field problems are dropped so
+    their IDs get regenerated.
+    """
+    by_id: dict[str, dict] = {}
+    for q in questions:
+        difficulty = batch.difficulty_of(q["id"])
+        if difficulty and q["id"] not in by_id and not question_issues(q):
+            q["difficulty"] = difficulty
+            by_id[q["id"]] = q
+    return ([by_id[i] for i in batch.ids if i in by_id],
+            [i for i in batch.ids if i not in by_id])
+
+
+# ── Cross-category duplicate check ─────────────────────────────────────────
+# Every accepted question is checked against the near-duplicate index of the
+# whole corpus (trivia/dedup.py) and then added to it under a "pending:<slug>"
+# source, so categories generating in parallel also dedup against each other.
+# The category's own previous _raw.json output is ignored, since it is being
+# replaced.
+
+_dedup_index: DedupIndex | None = None
+_dedup_lock = threading.Lock()
+
+def get_dedup_index() -> DedupIndex:
+    global _dedup_index
+    with _dedup_lock:
+        if _dedup_index is None:
+            _dedup_index = load_index(OUTPUT_DIR)
+        return _dedup_index
+
+
+def duplicate_of(q: dict, slug: str) -> str | None:
+    """Key of an existing question `q` duplicates, else None (and index `q`)."""
+    index = get_dedup_index()
+    key = f"pending:{slug}:{q['id']}"
+    with _dedup_lock:
+        matches = index.matches(q["question"], q["correct"],
+                                exclude_source=f"{slug}_raw.json", exclude_key=key)
+        if matches:
+            return matches[0][0]
+        index.add(key, q["question"], q["correct"], f"pending:{slug}")
+    return None
+
+
+def drop_duplicates(questions: list[dict], slug: str, name: str,
+                    log: logging.Logger) -> list[dict]:
+    kept = []
+    for q in questions:
+        dup = duplicate_of(q, slug)
+        if dup:
+            log.warning(f"[{name}] {q['id']} rejected — duplicates {dup}")
+        else:
+            kept.append(q)
+    return kept
+
+
+# ── JSON builder ───────────────────────────────────────────────────────────
+
+def infer_difficulty(q_id: str) -> str:
+    """Difficulty of the original fixed 2×25 layout, for questions saved without one."""
+    m = re.search(r'(\d+)$', q_id)
+    if not m:
+        return "medium"
+    n = int(m.group(1))
+    if n <= 10 or 26 <= n <= 35:
+        return "easy"
+    if n <= 20 or 36 <= n <= 45:
+        return "medium"
+    return "hard"
+
+
+def questions_to_json(questions: list[dict], category_name: str) -> dict:
+    qs = []
+    for q in questions:
+        answers = [
+            {"text": q["correct"],   "correct": True},
+            {"text": q["wrong"][0],  "correct": False},
+            {"text": q["wrong"][1],  "correct": False},
+            {"text": q["wrong"][2],  "correct": False},
+        ]
+        # Generated lines have none; trivia/enrich.py adds them afterwards
+        if q.get("absurd"):
+            answers.append({"text": q["absurd"], "correct": False, "absurd": True})
+        qs.append({
+            "id": q["id"],
+            "question": q["question"],
+            "answers": answers,
+            "difficulty": q.get("difficulty") or infer_difficulty(q["id"]),
+            "category": category_name,
+        })
+    counts = {"easy": 0, "medium": 0, "hard": 0}
+    for q in qs:
+        counts[q["difficulty"]] += 1
+    return {
+        "category": category_name,
+        "metadata": {
+            "totalQuestions": len(qs),
+            "difficulty": counts,
+            "version": "1.0",
+            "created": datetime.now().strftime("%Y-%m-%d"),
+            "updated": datetime.now().strftime("%Y-%m-%d"),
+        },
+        "questions": qs,
+    }
+
+
+# ── Claude CLI call ────────────────────────────────────────────────────────
+
+_client: SharedClient | None = None
+_limiter: FileRateLimiter | None = None
+usage_totals = UsageTotals()
+metrics = Metrics()  # replaced in main() by one that writes METRICS_FILE
+use_streaming = True  # cleared by --no-stream
+
+def get_client() -> SharedClient:
+    global _client
+    if _client is None:
+        _client = SharedClient(limiter=get_limiter())
+    return _client
+
+def get_limiter() -> FileRateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = FileRateLimiter(RATE_LIMIT_FILE, REQUESTS_PER_MIN, TOKENS_PER_MIN)
+    return _limiter
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough upper bound used to reserve TPM budget before a call."""
+    return len(prompt) // 4 + MAX_TOKENS
+
+def call_claude(prompt: str, log: logging.Logger, label: str = "",
+                system: str | None = None, **span_attrs) -> str:
+    """Call the Anthropic API and return the text result."""
+    log.debug(f"{label}Calling API ({MODEL})…")
+    extra = {"system": system_blocks(system)} if system else {}
+    with metrics.span("api", mode="call", **span_attrs) as span:
+        message = get_client().create(
+            estimate_tokens(prompt), log, label, on_event=metrics.backoff_observer(span),
+            model=MODEL,
+            max_tokens=MAX_TOKENS,
+            messages=[{"role": "user", "content": prompt}],
+            **extra,
+        )
+        # A coalesced call shares another caller's response and its usage
+        if not span.get("coalesced"):
+            span.update(usage_fields(message.usage))
+            record_usage(message.usage, log, label)
+    return message.content[0].text
+
+
+def record_usage(usage, log: logging.Logger, label: str = "") -> None:
+    usage_totals.add(usage)
+    log.debug(f"{label}Usage: in={usage.input_tokens} out={usage.output_tokens} "
+              f"cache_read={getattr(usage, 'cache_read_input_tokens', 0)} "
+              f"cache_write={getattr(usage, 'cache_creation_input_tokens', 0)}")
+
+
+class StreamAborted(ValueError):
+    """Raised when a streamed response is cancelled for being malformed."""
+
+
+def stream_claude(prompt: str, log: logging.Logger, label: str = "",
+                  system: str | None = None, on_question=None,
+                  reject=None, **span_attrs) -> tuple[list[dict], list[str]]:
+    """
+    Stream a response through LineParser. `on_question(q)` is called with
+    each question as soon as it is accepted; `reject` is passed to the
+    parser. Raises
+    StreamAborted (closing the stream) once too many lines fail to parse.
+    """
+    log.debug(f"{label}Streaming API ({MODEL})…")
+    estimate = estimate_tokens(prompt)
+    params = {
+        "model": MODEL,
+        "max_tokens": MAX_TOKENS,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if system:
+        params["system"] = system_blocks(system)
+
+    def attempt(stream) -> tuple[list[dict], list[str]]:
+        # Runs inside the client's stream, which settles the budget for live
+        # responses only: a cached replay never reserved any
+        parser = LineParser(reject)
+        started = time.perf_counter()
+        parse_time = 0.0
+        span.pop("ttft", None)  # measured afresh on a retry
+        if stream.cached:
+            span["cached"] = True
+        for delta in stream.text_stream:
+            if "ttft" not in span:
+                span["ttft"] = round(time.perf_counter() - started, 4)
+            parse_started = time.perf_counter()
+            accepted = parser.feed(delta)
+            parse_time += time.perf_counter() - parse_started
+            span["parse_seconds"] = round(parse_time, 4)
+            for q in accepted:
+                if on_question:
+                    on_question(q)
+            if parser.should_abort():
+                raise StreamAborted(
+                    f"{label}Cancelled stream after {len(parser.questions)} good / "
+                    f"{len(parser.errors)} unparseable lines"
+                )
+        for q in parser.close():
+            if on_question:
+                on_question(q)
+        message = stream.get_final_message()
+        span.update(usage_fields(message.usage))
+        record_usage(message.usage, log, label)
+        for rejected in parser.rejected:
+            log.warning(f"{label}{rejected}")
+        return parser.questions, parser.errors
+
+    with metrics.span("api", mode="stream", **span_attrs) as span:
+        return get_client().call_stream(attempt, estimate, log, label,
+                                        on_event=metrics.backoff_observer(span), **params)
+
+
+# ── Checkpoint helpers ─────────────────────────────────────────────────────
+
+# The checkpoint is a snapshot (CHECKPOINT) plus an append-only journal of
+# records since then (trivia-gen-checkpoint.jsonl); see trivia/journal.py.
+# Each mark_* helper applies its record to the in-memory dict and appends it.
+
+def apply_checkpoint_record(cp: dict, rec: dict) -> None:
+    slug = rec["slug"]
+    if rec["op"] == "plan":
+        cp.setdefault("plans", {})[slug] = {k: rec[k] for k in ("target", "mix", "batch_size")}
+    elif rec["op"] == "question":
+        streamed = cp.setdefault("streaming", {}).setdefault(slug, {}) \
+                     .setdefault(str(rec["batch"]), [])
+        if all(q["id"] != rec["question"]["id"] for q in streamed):
+            streamed.append(rec["question"])
+    elif rec["op"] == "batch":
+        cp.setdefault("partial", {}).setdefault(slug, {})[str(rec["batch"])] = rec["questions"]
+        cp.get("streaming", {}).get(slug, {}).pop(str(rec["batch"]), None)
+    elif rec["op"] == "done":
+        if slug not in cp["completed"]:
+            cp["completed"].append(slug)
+        cp.get("partial", {}).pop(slug, None)
+        cp.get("streaming", {}).pop(slug, None)
+        cp.get("plans", {}).pop(slug, None)
+
+
+_journal: Journal | None = None
+_cp_lock = threading.Lock()
+
+def get_journal() -> Journal:
+    global _journal
+    if _journal is None:
+        _journal = Journal(CHECKPOINT, apply_checkpoint_record,
+                           lambda: {"completed": [], "partial": {}})
+    return _journal
+
+
+def load_checkpoint() -> dict:
+    return get_journal().load()
+
+
+def clear_checkpoint() -> None:
+    get_journal().reset()
+
+
+def record_checkpoint(cp: dict, rec: dict) -> None:
+    with metrics.span("checkpoint", op=rec["op"], slug=rec["slug"]):
+        with _cp_lock:
+            apply_checkpoint_record(cp, rec)
+        get_journal().append(rec)
+
+
+def mark_batch_progress(cp: dict, slug: str, batch_num: int, question: dict) -> None:
+    """Record one question received from a batch that is still streaming."""
+    record_checkpoint(cp, {"op": "question", "slug": slug, "batch": batch_num,
+                           "question": question})
+
+
+def mark_batch_done(cp: dict, slug: str, batch_num: int,
+                    questions: list[dict]) -> None:
+    record_checkpoint(cp, {"op": "batch", "slug": slug, "batch": batch_num,
+                           "questions": questions})
+
+
+def mark_plan(cp: dict, slug: str, target: int, mix: dict[str, int], batch_size: int) -> None:
+    record_checkpoint(cp, {"op": "plan", "slug": slug, "target": target, "mix": mix,
+                           "batch_size": batch_size})
+
+
+def mark_category_done(cp: dict, slug: str) -> None:
+    record_checkpoint(cp, {"op": "done", "slug": slug})
+
+
+# ── Logging setup ──────────────────────────────────────────────────────────
+
+def setup_logging() -> logging.Logger:
+    log = logging.getLogger("trivia-gen")
+    log.setLevel(logging.DEBUG)
+    fmt = logging.Formatter(
+        "%(asctime)s  %(levelname)-8s  %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    ch = logging.StreamHandler()
+    ch.setFormatter(fmt)
+    log.addHandler(ch)
+    try:
+        fh = logging.FileHandler(LOG_FILE)
+        fh.setFormatter(fmt)
+        log.addHandler(fh)
+    except PermissionError:
+        log.warning(f"Cannot write to {LOG_FILE} — logging to console only")
+    return log
+
+
+# ── Category generation ────────────────────────────────────────────────────
+
+class CategoryJob:
+    """A category being generated: its batch plan and the batches finished so far."""
+
+    def __init__(self, slug: str, name: str, batches: list[Batch], cp: dict):
+        self.slug = slug
+        self.name = name
+        self.batches = batches
+        self.existing = existing_answers(slug)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._done: dict[int, list[dict]] = {
+            int(num): questions
+            for num, questions in cp.get("partial", {}).get(slug, {}).items()
+        }
+
+    def pending(self) -> list[Batch]:
+        with self._lock:
+            return [b for b in self.batches if b.num not in self._done]
+
+    def finish(self, batch: Batch, questions: list[dict]) -> bool:
+        """Record a finished batch; True once every batch is in."""
+        with self._lock:
+            self._done[batch.num] = questions
+            return len(self._done) >= len(self.batches)
+
+    def complete(self) -> bool:
+        with self._lock:
+            return all(b.num in self._done for b in self.batches)
+
+    def questions(self) -> list[dict]:
+        with self._lock:
+            return [q for b in self.batches for q in self._done.get(b.num, [])]
+
+    def covered(self, extra: list[dict] = ()) -> str:
+        """Topic summary of the curated file plus everything accepted in this run."""
+        answers = self.existing + [q["correct"] for q in self.questions()]
+        return topic_summary(answers + [q["correct"] for q in extra])
+
+
+def existing_answers(slug: str) -> list[str]:
+    """Correct answers of the category's curated file, which new questions must avoid."""
+    path = OUTPUT_DIR / f"{slug}.json"
+    if not path.exists():
+        return []
+    try:
+        with open(path) as f:
+            return [correct_answer(q) for q in json.load(f).get("questions", [])]
+    except (OSError, ValueError, StopIteration):
+        return []
+
+
+def plan_job(slug: str, name: str, prefix: str, cp: dict, target: int,
+             mix: dict[str, int], batch_size: int, log: logging.Logger) -> CategoryJob:
+    """Plan a category, or restore the plan a checkpointed run started with."""
+    saved = cp.get("plans", {}).get(slug)
+    if saved:
+        if (saved["target"], saved["mix"], saved["batch_size"]) != (target, mix, batch_size):
+            log.warning(f"[{name}] Resuming with the checkpointed plan "
+                        f"({saved['target']} questions) — use --reset to replan")
+        target, mix, batch_size = saved["target"], saved["mix"], saved["batch_size"]
+    elif cp.get("partial", {}).get(slug) or cp.get("streaming", {}).get(slug):
+        # Checkpoint from before plans were recorded: the fixed 2×25 layout
+        log.info(f"[{name}] Resuming an unplanned checkpoint as {TARGET} questions")
+        target, mix, batch_size = TARGET, MIX, BATCH_SIZE
+    else:
+        mark_plan(cp, slug, target, mix, batch_size)
+    return CategoryJob(slug, name, plan_category(prefix, target, mix, batch_size), cp)
+
+
+def accept_batch(job: CategoryJob, batch: Batch, raw_text: str, system: str,
+                 log: logging.Logger) -> list[dict]:
+    """Parse, dedup, repair and validate one batch response; raise if it is unusable."""
+    name = job.name
+    with metrics.span("parse", category=name, batch=batch.num):
+        questions, parse_errors = parse_response(raw_text)
+    with metrics.span("dedup", category=name, batch=batch.num):
+        questions = drop_duplicates(questions, job.slug, name, log)
+    questions = repair_batch(job, batch, questions, system, log)
+    return check_batch(name, batch, questions, parse_errors, log)
+
+
+def repair_batch(job: CategoryJob, batch: Batch, questions: list[dict], system: str,
+                 log: logging.Logger, on_question=None) -> list[dict]:
+    """
+    Fill the IDs of `batch` that `questions` is missing (never returned,
+    repeated, malformed, rejected as duplicates) by re-prompting for just
+    those IDs, up to REPAIR_ROUNDS times. Returns the merged batch in ID
+    order; `on_question(q)` is called for each repaired question.
+    """
+    name = job.name
+    kept, missing = reconcile(questions, batch)
+    for round_num in range(1, REPAIR_ROUNDS + 1):
+        if not missing:
+            break
+        log.info(f"[{name}] Batch {batch.num}: repairing {len(missing)} ID(s) "
+                 f"(round {round_num}/{REPAIR_ROUNDS}): {', '.join(missing)}")
+        with metrics.span("repair", category=name, batch=batch.num, ids=len(missing)):
+            with metrics.span("prompt", category=name, batch=batch.num):
+                prompt = build_repair_prompt(name, batch, missing, job.covered(kept), round_num)
+            try:
+                text = call_claude(prompt, log, f"[{name}] ", system,
+                                   category=name, batch=batch.num, repair=round_num)
+            except Exception as e:
+                log.warning(f"[{name}] Batch {batch.num} repair failed: {e}")
+                break
+            with metrics.span("parse", category=name, batch=batch.num):
+                fresh, _ = parse_response(text)
+            wanted = set(missing)
+            with metrics.span("dedup", category=name, batch=batch.num):
+                fresh = drop_duplicates([q for q in fresh if q["id"] in wanted],
+                                        job.slug, name, log)
+        kept, missing = reconcile(kept + fresh, batch)
+        if on_question:
+            for q in kept:
+                if q["id"] in wanted:
+                    on_question(q)
+    if missing:
+        log.warning(f"[{name}] Batch {batch.num}: still missing {', '.join(missing)}")
+    return kept
+
+
+def check_batch(name: str, batch: Batch, questions: list[dict],
+                parse_errors: list[str], log: logging.Logger) -> list[dict]:
+    metrics.count("parse_errors", len(parse_errors), category=name, batch=batch.num)
+    if parse_errors:
+        log.warning(f"[{name}] Batch {batch.num}: "
+                    f"{len(parse_errors)} unparseable line(s):")
+        for err in parse_errors[:5]:
+            log.warning(f"    !! {err}")
+
+    with metrics.span("validate", category=name, batch=batch.num):
+        issues = validate_batch(questions, expected=len(batch))
+    if issues:
+        log.warning(f"[{name}] Batch {batch.num} validation issues:")
+        for issue in issues:
+            log.warning(f"    !! {issue}")
+        if len(questions) < ceil(MIN_BATCH_RATIO * len(batch)):
+            raise ValueError(
+                f"[{name}] Batch {batch.num} only produced {len(questions)} "
+                f"questions — aborting category"
+            )
+
+    log.info(f"[{name}] Batch {batch.num}: {len(questions)} questions OK")
+    return questions
+
+
+def write_category(slug: str, name: str, questions: list[dict],
+                   cp: dict, log: logging.Logger) -> None:
+    out_path = OUTPUT_DIR / f"{slug}_raw.json"
+    with metrics.span("write", category=name):
+        output = questions_to_json(questions, name)
+        out_path.write_text(json.dumps(output, indent=2, ensure_ascii=False))
+    log.info(f"[{name}] Written {len(questions)} questions → {out_path}")
+    mark_category_done(cp, slug)
+
+
+def finish_category(job: CategoryJob, cp: dict, log: logging.Logger) -> None:
+    questions = job.questions()
+    write_category(job.slug, job.name, questions, cp, log)
+    # Batches of a category overlap, so its time runs from the first to the last
+    metrics.record("category", time.monotonic() - job.started, category=job.name,
+                   accepted=len(questions))
+
+
+def generate_batch(job: CategoryJob, batch: Batch, system: str, cp: dict,
+                   log: logging.Logger) -> list[dict]:
+    """Generate, repair and validate one batch; return its questions."""
+    slug, name = job.slug, job.name
+
+    def on_question(q: dict) -> None:
+        if batch.difficulty_of(q["id"]):
+            q["difficulty"] = batch.difficulty_of(q["id"])
+            mark_batch_progress(cp, slug, batch.num, q)
+
+    streamed = cp.get("streaming", {}).get(slug, {}).get(str(batch.num))
+    if streamed:
+        log.info(f"[{name}] Batch {batch.num}: {len(streamed)} streamed questions "
+                 f"recovered from checkpoint")
+        questions, parse_errors = list(streamed), []
+    else:
+        log.info(f"[{name}] Generating batch {batch.num}/{len(job.batches)} "
+                 f"({batch.ids[0]}–{batch.ids[-1]})…")
+        with metrics.span("prompt", category=name, batch=batch.num):
+            prompt = build_prompt(name, batch, job.covered())
+
+        try:
+            if use_streaming:
+                questions, parse_errors = stream_claude(
+                    prompt, log, f"[{name}] ", system, on_question,
+                    lambda q: (dup := duplicate_of(q, slug)) and f"rejected — duplicates {dup}",
+                    category=name, batch=batch.num,
+                )
+            else:
+                text = call_claude(prompt, log, f"[{name}] ", system,
+                                   category=name, batch=batch.num)
+                with metrics.span("parse", category=name, batch=batch.num):
+                    questions, parse_errors = parse_response(text)
+                with metrics.span("dedup", category=name, batch=batch.num):
+                    questions = drop_duplicates(questions, slug, name, log)
+        except StreamAborted as e:
+            # Everything accepted before the abort is in the checkpoint;
+            # the repair pass regenerates the rest
+            log.warning(f"{e} — repairing the remaining IDs")
+            questions = list(cp.get("streaming", {}).get(slug, {}).get(str(batch.num), []))
+            parse_errors = []
+        except Exception as e:
+            log.error(f"[{name}] Batch {batch.num} API error: {e}")
+            raise
+
+    questions = repair_batch(job, batch, questions, system, log, on_question)
+    questions = check_batch(name, batch, questions, parse_errors, log)
+    mark_batch_done(cp, slug, batch.num, questions)
+    return questions
+
+
+def generate_categories(jobs: list[CategoryJob], cp: dict, log: logging.Logger,
+                        concurrency: int) -> list[str]:
+    """
+    Run every pending batch of every category on one worker pool — batches
+    do not depend on each other, so a large category takes about as long as
+    a small one. A category is written as soon as its last batch is in.
+    Returns the slugs that failed.
+    """
+    system = get_system_prompt(log)
+    failed: list[str] = []
+    for job in jobs:
+        if job.complete():
+            finish_category(job, cp, log)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(generate_batch, job, batch, system, cp, log): (job, batch)
+            for job in jobs for batch in job.pending()
+        }
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            job, batch = futures[future]
+            try:
+                questions = future.result()
+            except Exception as e:
+                log.error(f"[{job.name}] Failed: {e}")
+                if job.slug not in failed:
+                    failed.append(job.slug)
+                    metrics.record("category", time.monotonic() - job.started,
+                                   category=job.name, error=type(e).__name__)
+                    # The category will not be written: stop its queued batches
+                    # from spending calls and budget
+                    skipped = sum(other.cancel() for other, (other_job, _) in futures.items()
+                                  if other_job is job)
+                    if skipped:
+                        log.warning(f"[{job.name}] Skipped {skipped} queued batches")
+                continue
+            if job.finish(batch, questions) and job.slug not in failed:
+                finish_category(job, cp, log)
+    return failed
+
+
+def generate_batch_mode(jobs: list[CategoryJob], cp: dict,
+                        log: logging.Logger) -> list[str]:
+    """
+    Generate every pending batch of `jobs` as one Message Batch — batches do
+    not depend on each other, so a single round covers them all. Missing or
+    malformed IDs are repaired with short direct calls. Returns the slugs
+    that failed.
+    """
+    system_text = get_system_prompt(log)
+    system = system_blocks(system_text)
+
+    requests, owners = [], {}
+    for job in jobs:
+        for batch in job.pending():
+            with metrics.span("prompt", category=job.name, batch=batch.num):
+                prompt = build_prompt(job.name, batch, job.covered())
+            custom_id = f"{job.slug}-b{batch.num}"
+            requests.append(batch_request(custom_id, MODEL, MAX_TOKENS, prompt, system))
+            owners[custom_id] = (job, batch)
+
+    log.info(f"Submitting {len(requests)} batches across {len(jobs)} categories")
+    with metrics.span("batch_api", requests=len(requests)):
+        results = run_batch(get_client(), requests, log)
+
+    failed: list[str] = []
+    for custom_id, message in results.items():
+        job, batch = owners[custom_id]
+        if job.slug in failed:
+            continue
+        try:
+            if message is None:
+                raise ValueError(f"[{job.name}] Batch {batch.num} request did not succeed")
+            usage_totals.add(message.usage)
+            metrics.record("batch_result", 0.0, category=job.name, batch=batch.num,
+                           **usage_fields(message.usage))
+            questions = accept_batch(job, batch, message.content[0].text, system_text, log)
+        except ValueError as e:
+            log.error(f"[{job.name}] Failed: {e}")
+            failed.append(job.slug)
+            continue
+        mark_batch_done(cp, job.slug, batch.num, questions)
+        job.finish(batch, questions)
+
+    for job in jobs:
+        if job.slug not in failed and job.complete():
+            finish_category(job, cp, log)
+    return failed
+
+
+# ── CLI ────────────────────────────────────────────────────────────────────
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate trivia questions via the Claude CLI (Max subscription)"
+    )
+    parser.add_argument(
+        "--categories", nargs="+", metavar="SLUG",
+        help="Only generate these slugs (default: all not yet completed)"
+    )
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="Clear checkpoint and regenerate everything"
+    )
+    parser.add_argument(
+        "--list", action="store_true",
+        help="Print available category slugs and exit"
+    )
+    parser.add_argument(
+        "--batch", action="store_true",
+        help="Submit all prompts through the Message Batches API and poll for results"
+    )
+    parser.add_argument(
+        "--no-stream", action="store_true",
+        help="Wait for each full response instead of parsing it as it streams"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=CONCURRENCY, metavar="N",
+        help=f"Batches to generate at once, across categories (default: {CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--target", action="append", default=[], metavar="[SLUG=]N",
+        help=f"Questions per category, or for one slug; repeatable (default: {TARGET})"
+    )
+    parser.add_argument(
+        "--mix", type=parse_mix, default=MIX, metavar="E/M/H",
+        help="Difficulty mix as easy/medium/hard shares (default: "
+             f"{'/'.join(str(v) for v in MIX.values())})"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, metavar="N",
+        help=f"Most questions per prompt (default: {BATCH_SIZE})"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=REQUESTS_PER_MIN,
+        help=f"Requests-per-minute budget (default: {REQUESTS_PER_MIN})"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=TOKENS_PER_MIN,
+        help=f"Tokens-per-minute budget (default: {TOKENS_PER_MIN})"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Neither replay nor record API responses"
+    )
+    parser.add_argument(
+        "--refresh", action="store_true",
+        help="Call the API even for prompts with a recorded response, and record the new one"
+    )
+    add_metrics_arguments(parser, METRICS_FILE)
+    args = parser.parse_args()
+
+    if args.list:
+        for slug, name, prefix in CATEGORIES:
+            print(f"{slug:<20}  {name}")
+        return
+
+    default_target, slug_targets = TARGET, {}
+    for spec in args.target:
+        slug, _, count = spec.rpartition("=")
+        if not count.isdigit() or int(count) < 1 or (slug and slug not in CATEGORY_MAP):
+            parser.error(f"--target expects N or SLUG=N with a known slug, got '{spec}'")
+        if slug:
+            slug_targets[slug] = int(count)
+        else:
+            default_target = int(count)
+    if args.batch_size < 1:
+        parser.error(f"--batch-size must be at least 1, got {args.batch_size}")
+
+    if args.summary:
+        print(summarize(args.metrics))
+        return
+
+    log = setup_logging()
+
+    if not os.environ.get("ANTHROPIC_API_KEY") and not fake.enabled():
+        log.error("ANTHROPIC_API_KEY is not set")
+        sys.exit(1)
+
+    if args.reset:
+        clear_checkpoint()
+        log.info("Checkpoint cleared")
+
+    cp = load_checkpoint()
+    already_done = cp.get("completed", [])
+
+    if args.categories:
+        targets = []
+        for slug in args.categories:
+            if slug not in CATEGORY_MAP:
+                log.warning(f"Unknown slug '{slug}' — skipping")
+                continue
+            targets.append(CATEGORY_MAP[slug])
+    else:
+        targets = [(s, n, p) for s, n, p in CATEGORIES if s not in already_done]
+
+    if not targets:
+        log.info("Nothing to do — all categories complete. Use --reset to regenerate.")
+        return
+
+    global _limiter, use_streaming, metrics
+    _limiter = FileRateLimiter(RATE_LIMIT_FILE, args.rpm, args.tpm)
+    get_client().limiter = _limiter  # also for a client set up before main()
+    if not args.no_cache:
+        get_client().cache = ResponseCache(RESPONSE_CACHE_FILE, refresh=args.refresh)
+    use_streaming = not args.no_stream
+    metrics = metrics_from_args(args, "trivia-gen")
+
+    pending = []
+    for slug, name, prefix in targets:
+        if slug in cp.get("completed", []):
+            log.info(f"[{name}] Already complete, skipping")
+            continue
+        pending.append((slug, name, prefix))
+
+    jobs = [plan_job(slug, name, prefix, cp, slug_targets.get(slug, default_target),
+                     args.mix, args.batch_size, log)
+            for slug, name, prefix in pending]
+    log.info(f"Categories to generate ({len(jobs)}): "
+             + ", ".join(f"{job.name} ({sum(map(len, job.batches))} in "
+                         f"{len(job.batches)} batches)" for job in jobs))
+
+    failed = []
+    started = time.monotonic()
+    if args.batch:
+        log.info("Mode: Message Batches API")
+        failed = generate_batch_mode(jobs, cp, log)
+    else:
+        log.info(f"Scheduler: {args.concurrency} concurrent batches, "
+                 f"{args.rpm} req/min, {args.tpm} tokens/min")
+        failed = generate_categories(jobs, cp, log, args.concurrency)
+
+    get_journal().compact()
+    log.info(f"Run finished in {time.monotonic() - started:.0f}s")
+    log.info(f"Token usage: {usage_totals.summary()}")
+    if get_client().cache:
+        log.info(get_client().cache.summary())
+        get_client().cache.close()
+    metrics.close()
+    if metrics.path:
+        log.info(f"Metrics for run {metrics.run} → {metrics.path} (--summary to report)")
+
+    if failed:
+        log.warning(f"Failed categories: {failed}")
+        sys.exit(1)
+    else:
+        log.info("All categories completed successfully.")
+
+
+if __name__ == "__main__":
+    main()
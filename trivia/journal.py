@@ -0,0 +1,122 @@
+"""
+trivia/journal.py — Append-only JSON Lines journal with snapshot compaction.
+
+State lives in two files: a JSON snapshot and a `.jsonl` journal of records
+applied since that snapshot. Every change is one appended, fsynced line, so a
+write costs the same however large the state gets, and a crash can at worst
+lose a half-written final line, which replay skips. Every so often the
+journal is folded into a new snapshot (written to a temp file, then renamed
+into place) and truncated.
+
+Appends and compaction hold an exclusive flock on a sidecar `.lock` file, so
+several processes can share one journal.
+"""
+
+import fcntl
+import json
+import os
+import threading
+from collections.abc import Callable
+from contextlib import contextmanager
+from pathlib import Path
+
+COMPACT_EVERY = 500  # appended records between snapshots
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write `text` to `path` so readers see either the old or the new file, never a partial one."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class Journal:
+    """
+    `apply(state, record)` folds one record into the state dict; it is used
+    both for replay and by callers updating their in-memory copy, and must
+    tolerate seeing a record twice (a crash between snapshot and truncate).
+    """
+
+    def __init__(self, snapshot: Path, apply: Callable[[dict, dict], None],
+                 initial: Callable[[], dict], compact_every: int = COMPACT_EVERY):
+        self.snapshot = snapshot
+        self.path = snapshot.with_suffix(".jsonl")
+        self.lock_path = snapshot.with_suffix(".lock")
+        self.apply = apply
+        self.initial = initial
+        self.compact_every = compact_every
+        self._appended = 0
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _replay(self) -> dict:
+        state = self.initial()
+        if self.snapshot.exists():
+            state.update(json.loads(self.snapshot.read_text()))
+        if self.path.exists():
+            with open(self.path, "rb") as f:
+                for raw in f:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue  # torn write from a crash
+                    self.apply(state, record)
+        return state
+
+    def load(self) -> dict:
+        with self._locked():
+            return self._replay()
+
+    def append(self, record: dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+        with self._locked():
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                if size and os.pread(fd, 1, size - 1) != b"\n":
+                    line = b"\n" + line  # terminate a torn line left by a crash
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._appended += 1
+            if self._appended >= self.compact_every:
+                self._compact()
+
+    def compact(self) -> None:
+        with self._locked():
+            self._compact()
+
+    def _compact(self) -> None:
+        # Rebuild from disk rather than memory so records from other processes survive
+        state = self._replay()
+        atomic_write_text(self.snapshot, json.dumps(state, ensure_ascii=False))
+        with open(self.path, "w") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._appended = 0
+
+    def reset(self) -> None:
+        with self._locked():
+            for path in (self.snapshot, self.path):
+                if path.exists():
+                    path.unlink()
+            self._appended = 0
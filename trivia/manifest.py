@@ -0,0 +1,157 @@
+"""
+trivia/manifest.py — What each pass over the question files has already seen.
+
+A manifest records, per file, the mtime, size and content hash as of the
+last run of one pass (the audit, the validator…), plus a short hash of every
+question. scan() then hands back only what changed since: a file whose
+mtime and size match is not even opened, a file whose bytes hash the same is
+not parsed, and in a changed file only the questions whose hash differs are
+returned.
+
+Question hashes are stored as one string per file and only split when that
+file has changed, so loading the manifest of a large corpus stays cheap.
+
+A manifest saved under a different `key` (e.g. a hash of the rules a pass
+checks against) is discarded on load, so changing the rules re-checks all.
+"""
+
+import hashlib
+import json
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+from trivia.journal import atomic_write_text
+
+VERSION = 1
+
+
+def question_hash(q: dict) -> str:
+    canonical = json.dumps(q, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+def parse_since(text: str) -> float:
+    """'3d', '12h', '30m' ago, or an ISO date/time → Unix timestamp."""
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smhdw])", text.strip())
+    if m:
+        seconds = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}[m.group(2)]
+        return time.time() - float(m.group(1)) * seconds
+    try:
+        return datetime.fromisoformat(text.strip()).timestamp()
+    except ValueError:
+        raise ValueError(f"expected e.g. 3d, 12h or 2026-10-01, got '{text}'") from None
+
+
+class FileChange:
+    """A file with work to do: its parsed data and the indexes of changed questions."""
+
+    def __init__(self, path: Path, data: dict, indexes: list[int]):
+        self.path = path
+        self.data = data
+        self.indexes = indexes
+
+
+class Manifest:
+    def __init__(self, path: Path, key: str = ""):
+        self.path = path
+        self.key = key
+        self._files: dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") == VERSION and saved.get("key", "") == key:
+                self._files = saved["files"]
+        except (OSError, ValueError):
+            pass
+
+    def _hashes(self, name: str) -> dict[str, str]:
+        packed = self._files.get(name, {}).get("questions", "")
+        return dict(item.split("=", 1) for item in packed.split(" ") if item)
+
+    def ids(self, name: str) -> list[str]:
+        """Question IDs of file `name` as last recorded, in file order."""
+        packed = self._files.get(name, {}).get("questions", "")
+        return [item.split("=", 1)[0] for item in packed.split(" ") if item]
+
+    def _changed_bytes(self, path: Path, since: float | None) -> bytes | None:
+        """The bytes of `path` if it changed since it was recorded, else None."""
+        stat = path.stat()
+        entry = self._files.get(path.name)
+        if since is not None and stat.st_mtime < since:
+            return None
+        # A file with pending questions (no sha256) is re-read even if untouched
+        if (entry and entry.get("sha256")
+                and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size)):
+            return None
+        raw = path.read_bytes()
+        if entry and entry.get("sha256") == hashlib.sha256(raw).hexdigest():
+            # Touched but identical: remember the new mtime so it is not re-read
+            entry["mtime_ns"], entry["size"] = stat.st_mtime_ns, stat.st_size
+            self._dirty = True
+            return None
+        return raw
+
+    def changed(self, path: Path, since: float | None = None) -> bool:
+        """Whether `path` needs another look, by the same rules as scan()."""
+        return self._changed_bytes(path, since) is not None
+
+    def scan(self, files: list[Path], since: float | None = None) -> list[FileChange]:
+        """
+        Files among `files` with questions changed since they were last
+        recorded. With `since`, files not modified after that time are left
+        out even if they are unrecorded.
+        """
+        changes = []
+        for path in files:
+            raw = self._changed_bytes(path, since)
+            if raw is None:
+                continue
+            data = json.loads(raw)
+            known = self._hashes(path.name)
+            indexes = [i for i, q in enumerate(data.get("questions", []))
+                       if known.get(str(q.get("id", i))) != question_hash(q)]
+            changes.append(FileChange(path, data, indexes))
+        return changes
+
+    def record(self, path: Path, data: dict | None = None, pending: set[str] = frozenset()) -> None:
+        """
+        Mark `path` as processed in its current state. Question IDs in
+        `pending` (e.g. failed API calls) stay unrecorded so the next scan
+        returns them again.
+        """
+        raw = path.read_bytes()
+        stat = path.stat()
+        if data is None:
+            data = json.loads(raw)
+        hashes = []
+        for i, q in enumerate(data.get("questions", [])):
+            qid = str(q.get("id", i))
+            if qid not in pending:
+                hashes.append(f"{qid}={question_hash(q)}")
+        self._files[path.name] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            # A file with pending questions must be re-read next time
+            "sha256": None if pending else hashlib.sha256(raw).hexdigest(),
+            "questions": " ".join(hashes),
+        }
+        self._dirty = True
+
+    def forget_missing(self, files: list[Path]) -> None:
+        present = {p.name for p in files}
+        for name in [n for n in self._files if n not in present]:
+            del self._files[name]
+            self._dirty = True
+
+    def save(self) -> None:
+        if self._dirty:
+            saved = {"version": VERSION, "key": self.key, "files": self._files}
+            atomic_write_text(self.path, json.dumps(saved, separators=(",", ":")))
+            self._dirty = False
+
+    def reset(self) -> None:
+        self._files = {}
+        self._dirty = True
@@ -0,0 +1,312 @@
+"""
+trivia/metrics.py — Per-request spans for trivia/gen.py and trivia/audit.py.
+
+Every timed step of a run (prompt build, API call, parse, validate, checkpoint
+write, …) is appended as one JSON line to a metrics file, tagged with the run
+ID and the attributes the caller attaches: category, batch, token usage, time
+to first token, retries. Aggregates are kept in memory so a long run can also
+be watched as Prometheus text — a node_exporter textfile rewritten every few
+seconds, or a small HTTP endpoint — and summarize() turns a metrics file back
+into a report of where the time and tokens went.
+
+Usage:
+    python3 -m trivia.metrics content/trivia-gen-metrics.jsonl             # last run
+    python3 -m trivia.metrics content/trivia-gen-metrics.jsonl --run all
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from trivia.journal import atomic_write_text
+
+# Usage attributes summed into token counters, whatever span carries them
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+# USD per million tokens (list prices for the models these scripts use)
+PRICES = {"input_tokens": 3.00, "output_tokens": 15.00,
+          "cache_write_tokens": 3.75, "cache_read_tokens": 0.30}
+
+EXPORT_INTERVAL = 15.0  # seconds between Prometheus textfile rewrites
+
+
+def usage_fields(usage) -> dict[str, int]:
+    """Token counts from an API `usage` block, keyed by TOKEN_FIELDS."""
+    return {
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+class Metrics:
+    """
+    Thread-safe span recorder. With no path it only aggregates in memory, so
+    instrumented code can call it unconditionally.
+    """
+
+    def __init__(self, path: Path | None = None, script: str = ""):
+        self.path = path
+        self.script = script
+        self.run = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._spans: dict[str, list[float]] = {}     # name → [count, total, max]
+        self._counters: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._textfile: Path | None = None
+        self._server: "ThreadingHTTPServer | None" = None
+
+    def _write(self, line: dict) -> None:
+        if self._file:
+            self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def record(self, span: str, seconds: float, **attrs) -> None:
+        """Record a span that has already been timed."""
+        with self._lock:
+            agg = self._spans.setdefault(span, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] = max(agg[2], seconds)
+            for field in TOKEN_FIELDS:
+                if attrs.get(field):
+                    self._counters[field] = self._counters.get(field, 0) + attrs[field]
+            self._write({"ts": round(time.time(), 3), "run": self.run, "script": self.script,
+                         "span": span, "seconds": round(seconds, 4), **attrs})
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the block; the yielded dict collects attributes set inside it."""
+        fields = dict(attrs)
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - started, **fields)
+
+    def backoff_observer(self, span: dict):
+        """on_event callback that tallies limiter waits, retries, coalesced and cached calls into `span`."""
+        def on_event(kind: str, seconds: float) -> None:
+            if kind == "retry":
+                span["retries"] = span.get("retries", 0) + 1
+                self.count("retry")
+            elif kind in ("coalesced", "cached"):
+                span[kind] = True
+                self.count(kind)
+            else:
+                span["limiter_wait"] = round(span.get("limiter_wait", 0) + seconds, 4)
+        return on_event
+
+    def count(self, name: str, n: float = 1, **attrs) -> None:
+        """Bump a counter (retries, parse errors, cache hits…)."""
+        if not n:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+            self._write({"ts": round(time.time(), 3), "run": self.run, "script": self.script,
+                         "counter": name, "value": n, **attrs})
+
+    # ── Prometheus export ──────────────────────────────────────────────────
+
+    def prometheus(self) -> str:
+        script = self.script or "trivia"
+        with self._lock:
+            spans = {name: list(agg) for name, agg in self._spans.items()}
+            counters = dict(self._counters)
+        lines = ["# TYPE trivia_span_seconds summary"]
+        for name, (n, total, _) in sorted(spans.items()):
+            labels = f'script="{script}",span="{name}"'
+            lines.append(f"trivia_span_seconds_sum{{{labels}}} {total:.4f}")
+            lines.append(f"trivia_span_seconds_count{{{labels}}} {n}")
+        lines.append("# TYPE trivia_span_seconds_max gauge")
+        for name, (_, _, peak) in sorted(spans.items()):
+            lines.append(f'trivia_span_seconds_max{{script="{script}",span="{name}"}} {peak:.4f}')
+        lines.append("# TYPE trivia_tokens_total counter")
+        for field in TOKEN_FIELDS:
+            kind = field.removesuffix("_tokens")
+            lines.append(f'trivia_tokens_total{{script="{script}",kind="{kind}"}} '
+                         f'{counters.get(field, 0):g}')
+        lines.append("# TYPE trivia_events_total counter")
+        for name, value in sorted(counters.items()):
+            if name not in TOKEN_FIELDS:
+                lines.append(f'trivia_events_total{{script="{script}",event="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, textfile: Path | None = None, port: int | None = None,
+               interval: float = EXPORT_INTERVAL) -> None:
+        """Keep `textfile` up to date and/or serve /metrics on `port` until close()."""
+        if textfile:
+            self._textfile = textfile
+
+            def rewrite() -> None:
+                while not self._stop.wait(interval):
+                    atomic_write_text(textfile, self.prometheus())
+
+            threading.Thread(target=rewrite, daemon=True).start()
+        if port:
+            # Only --prom-port needs an HTTP server, so only it pays for the import
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    body = metrics.prometheus().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer(("", port), Handler)
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._textfile:
+            atomic_write_text(self._textfile, self.prometheus())
+        if self._server:
+            self._server.shutdown()
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+# ── Command-line wiring shared by both scripts ─────────────────────────────
+
+def add_metrics_arguments(parser: argparse.ArgumentParser, default_path: Path) -> None:
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics", type=Path, default=default_path, metavar="FILE",
+                       help=f"Append per-request spans here as JSON Lines (default: {default_path})")
+    group.add_argument("--no-metrics", action="store_true", help="Do not write the metrics file")
+    group.add_argument("--prom-textfile", type=Path, metavar="FILE",
+                       help="Keep a Prometheus textfile-collector file up to date")
+    group.add_argument("--prom-port", type=int, metavar="PORT",
+                       help="Serve Prometheus metrics on this port while running")
+    group.add_argument("--summary", action="store_true",
+                       help="Report where the time and tokens of the last run went, then exit")
+
+
+def metrics_from_args(args: argparse.Namespace, script: str) -> Metrics:
+    metrics = Metrics(None if args.no_metrics else args.metrics, script)
+    metrics.export(args.prom_textfile, args.prom_port)
+    return metrics
+
+
+# ── Summary report ─────────────────────────────────────────────────────────
+
+def load_records(path: Path, run: str | None = None) -> list[dict]:
+    """Records of one run (default: the last one in the file), or every run if run='all'."""
+    records = []
+    if not path.exists():
+        return records  # a fresh checkout: nothing recorded yet
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue  # torn last line of a killed run
+    if run == "all" or not records:
+        return records
+    run = run or records[-1]["run"]
+    return [r for r in records if r["run"] == run]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def summarize(path: Path, run: str | None = None, top: int = 10) -> str:
+    records = load_records(path, run)
+    if not records:
+        return f"No metrics recorded in {path}"
+    spans = [r for r in records if "span" in r]
+    counters: dict[str, float] = {}
+    for r in records:
+        if "counter" in r:
+            counters[r["counter"]] = counters.get(r["counter"], 0) + r["value"]
+
+    wall = max(r["ts"] for r in records) - min(r["ts"] - r.get("seconds", 0) for r in records)
+    runs = sorted({r["run"] for r in records})
+    out = [f"Run {runs[0] if len(runs) == 1 else f'{len(runs)} runs'} "
+           f"({records[0].get('script') or 'trivia'}): {wall:.0f}s wall", ""]
+
+    # Time by span. Spans nest (api inside category) and overlap across
+    # workers, so totals add up to more than the wall time.
+    by_name: dict[str, list[float]] = {}
+    for r in spans:
+        by_name.setdefault(r["span"], []).append(r["seconds"])
+    out.append(f"  {'span':<14} {'count':>6} {'total s':>9} {'mean s':>8} {'p95 s':>8} {'max s':>8}")
+    for name, values in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        out.append(f"  {name:<14} {len(values):>6} {sum(values):>9.1f} "
+                   f"{sum(values) / len(values):>8.2f} {_percentile(values, 0.95):>8.2f} "
+                   f"{max(values):>8.2f}")
+
+    ttft = [r["ttft"] for r in spans if r.get("ttft") is not None]
+    if ttft:
+        out.append(f"\n  time to first token: p50 {_percentile(ttft, 0.5):.2f}s, "
+                   f"p95 {_percentile(ttft, 0.95):.2f}s")
+
+    # Per-category time and tokens
+    categories: dict[str, dict] = {}
+    for r in spans:
+        cat = r.get("category")
+        if not cat:
+            continue
+        c = categories.setdefault(cat, {"seconds": 0.0, "accepted": 0, "error": None,
+                                        **{f: 0 for f in TOKEN_FIELDS}})
+        if r["span"] == "category":
+            c["seconds"] += r["seconds"]
+            c["accepted"] += r.get("accepted", 0)
+            c["error"] = r.get("error")
+        for f in TOKEN_FIELDS:
+            c[f] += r.get(f, 0)
+
+    def cost(entry: dict) -> float:
+        return sum(entry.get(f, 0) * PRICES[f] for f in TOKEN_FIELDS) / 1_000_000
+
+    if categories:
+        out.append("\n  Slowest categories:")
+        out.append(f"  {'category':<28} {'seconds':>8} {'accepted':>9} {'tokens out':>11} {'cost $':>8}")
+        for cat, c in sorted(categories.items(), key=lambda kv: -kv[1]["seconds"])[:top]:
+            flag = f"  ({c['error']})" if c["error"] else ""
+            out.append(f"  {cat:<28} {c['seconds']:>8.1f} {c['accepted']:>9} "
+                       f"{c['output_tokens']:>11} {cost(c):>8.3f}{flag}")
+
+    totals = {f: sum(r.get(f, 0) for r in spans) for f in TOKEN_FIELDS}
+    accepted = sum(c["accepted"] for c in categories.values())
+    out.append("\n  Tokens: " + ", ".join(f"{f.removesuffix('_tokens')} {totals[f]}"
+                                           for f in TOKEN_FIELDS))
+    out.append(f"  Cost: ${cost(totals):.3f} at list prices"
+               + (f", ${cost(totals) / accepted:.5f} per accepted question ({accepted})"
+                  if accepted else ""))
+    if counters:
+        out.append("  Events: " + ", ".join(f"{k} {v:g}" for k, v in sorted(counters.items())))
+    return "\n".join(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize a trivia metrics file")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--run", help="Run ID to report, or 'all' (default: the last run)")
+    parser.add_argument("--top", type=int, default=10, help="Categories to list (default: 10)")
+    args = parser.parse_args()
+    print(summarize(args.path, args.run, args.top))
+
+
+if __name__ == "__main__":
+    main()
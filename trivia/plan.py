@@ -0,0 +1,102 @@
+"""
+trivia/plan.py — Split a category's target question count into independent batches.
+
+A plan turns "N questions at this difficulty mix" into batches of at most
+BATCH_SIZE contiguous IDs, each with an explicit difficulty per ID (easy
+first, then medium, then hard, as the prompts have always listed them). No
+batch depends on another, so they can all be generated at once.
+
+With the defaults — 50 questions at 40/40/20 in batches of 25 — the plan
+reproduces the original fixed layout: 001–010 easy, 011–020 medium,
+021–025 hard, then 026–035 easy and so on.
+"""
+
+from math import ceil
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+TARGET     = 50
+BATCH_SIZE = 25
+MIX        = {"easy": 40, "medium": 40, "hard": 20}
+
+
+def apportion(total: int, weights: dict[str, float]) -> dict[str, int]:
+    """Split `total` in proportion to `weights` (largest remainder, ties by order)."""
+    weight_sum = sum(weights.values())
+    if not weight_sum:
+        return {key: 0 for key in weights}
+    exact = {key: total * w / weight_sum for key, w in weights.items()}
+    counts = {key: int(x) for key, x in exact.items()}
+    by_remainder = sorted(weights, key=lambda key: counts[key] - exact[key])
+    for key in by_remainder[:total - sum(counts.values())]:
+        counts[key] += 1
+    return counts
+
+
+def parse_mix(text: str) -> dict[str, int]:
+    """'40/40/20' or 'easy=40,medium=40,hard=20' → {"easy": 40, …}."""
+    if "=" in text:
+        mix = {d: 0 for d in DIFFICULTIES}
+        for part in text.split(","):
+            key, _, value = part.partition("=")
+            key = key.strip().lower()
+            if key not in mix:
+                raise ValueError(f"unknown difficulty '{key}'")
+            mix[key] = int(value)
+    else:
+        parts = [int(p) for p in text.split("/")]
+        if len(parts) != len(DIFFICULTIES):
+            raise ValueError("expected easy/medium/hard")
+        mix = dict(zip(DIFFICULTIES, parts))
+    if sum(mix.values()) <= 0 or min(mix.values()) < 0:
+        raise ValueError("difficulty shares must be non-negative and not all zero")
+    return mix
+
+
+class Batch:
+    """One independently runnable prompt: a contiguous ID range with a difficulty per ID."""
+
+    def __init__(self, num: int, prefix: str, start: int, difficulties: list[str]):
+        self.num = num
+        self.prefix = prefix
+        self.start = start
+        self.difficulties = difficulties
+        self.ids = [f"{prefix}_{n:03d}" for n in range(start, start + len(difficulties))]
+        self._by_id = dict(zip(self.ids, difficulties))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def difficulty_of(self, qid: str) -> str | None:
+        return self._by_id.get(qid)
+
+    def runs(self) -> list[tuple[str, str, str, int]]:
+        """Consecutive IDs sharing a difficulty: (first_id, last_id, difficulty, count)."""
+        runs = []
+        for qid, difficulty in zip(self.ids, self.difficulties):
+            if runs and runs[-1][2] == difficulty:
+                first, _, _, count = runs[-1]
+                runs[-1] = (first, qid, difficulty, count + 1)
+            else:
+                runs.append((qid, qid, difficulty, 1))
+        return runs
+
+
+def plan_category(prefix: str, target: int = TARGET, mix: dict[str, int] | None = None,
+                  batch_size: int = BATCH_SIZE) -> list[Batch]:
+    """
+    Batches covering IDs 1..`target`. Each batch takes its share of every
+    difficulty, so the mix holds within a batch as well as overall.
+    """
+    remaining = apportion(target, mix or MIX)
+    n_batches = max(1, ceil(target / batch_size))
+    sizes = [target // n_batches + (i < target % n_batches) for i in range(n_batches)]
+    batches, start = [], 1
+    for num, size in enumerate(sizes, 1):
+        counts = apportion(size, remaining)
+        difficulties = [d for d in DIFFICULTIES for _ in range(counts[d])]
+        for d in DIFFICULTIES:
+            remaining[d] -= counts[d]
+        batches.append(Batch(num, prefix, start, difficulties))
+        start += size
+    return batches
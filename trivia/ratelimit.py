@@ -0,0 +1,198 @@
+"""
+trivia/ratelimit.py — Requests/tokens-per-minute budget and 429/529 backoff for API calls.
+
+One RateLimiter is shared by every worker thread in a run, so concurrent
+categories draw from the same account budget instead of sleeping on fixed timers.
+FileRateLimiter keeps the same bucket in a small flock'd file instead, so
+trivia/gen.py and trivia/audit.py running side by side share one budget.
+"""
+
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# Status codes worth retrying: rate limited, overloaded, transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+
+
+class RateLimiter:
+    """Token-bucket limiter over requests-per-minute and tokens-per-minute."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._stamp
+        self._stamp = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until one request and `tokens` tokens fit in the budget; return seconds waited."""
+        tokens = min(tokens, self.tpm)
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    self._cond.wait(self._paused_until - now)
+                    continue
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return now - started
+                wait_req = (1 - self._requests) * 60 / self.rpm
+                wait_tok = (tokens - self._tokens) * 60 / self.tpm
+                self._cond.wait(max(wait_req, wait_tok, 0.01))
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        with self._cond:
+            self._tokens = min(self.tpm, self._tokens + estimated - actual)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds` (server asked us to back off)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+
+class FileRateLimiter:
+    """
+    RateLimiter whose bucket lives in `path`, read and updated under an
+    exclusive flock, so every process using the same file shares it. Waiting
+    callers poll the file rather than being woken. Wall-clock time is used,
+    since monotonic clocks are not comparable across processes.
+    """
+
+    POLL_MAX = 1.0  # longest sleep between looks at the shared bucket
+
+    def __init__(self, path: Path, rpm: int, tpm: int):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+
+    @contextmanager
+    def _bucket(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as f:
+                now = time.time()
+                try:
+                    state = json.loads(f.read())
+                except ValueError:  # new (or torn) file: start full
+                    state = {"requests": self.rpm, "tokens": self.tpm, "stamp": now, "paused_until": 0.0}
+                elapsed = max(0.0, now - state["stamp"])
+                state["stamp"] = now
+                state["requests"] = min(self.rpm, state["requests"] + elapsed * self.rpm / 60)
+                state["tokens"] = min(self.tpm, state["tokens"] + elapsed * self.tpm / 60)
+                yield state
+                f.seek(0)
+                f.write(json.dumps(state))
+                f.truncate()
+        finally:
+            os.close(fd)  # releases the lock
+
+    def acquire(self, tokens: int) -> float:
+        """Block until one request and `tokens` tokens fit in the budget; return seconds waited."""
+        tokens = min(tokens, self.tpm)
+        started = time.monotonic()
+        while True:
+            with self._bucket() as state:
+                now = state["stamp"]
+                if now < state["paused_until"]:
+                    wait = state["paused_until"] - now
+                elif state["requests"] >= 1 and state["tokens"] >= tokens:
+                    state["requests"] -= 1
+                    state["tokens"] -= tokens
+                    return time.monotonic() - started
+                else:
+                    wait = max((1 - state["requests"]) * 60 / self.rpm,
+                               (tokens - state["tokens"]) * 60 / self.tpm)
+            time.sleep(min(max(wait, 0.01), self.POLL_MAX))
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token budget once the real usage of a call is known."""
+        with self._bucket() as state:
+            state["tokens"] = min(self.tpm, state["tokens"] + estimated - actual)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller, in every process, for `seconds`."""
+        with self._bucket() as state:
+            state["paused_until"] = max(state["paused_until"], state["stamp"] + seconds)
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait, from a `retry-after` header."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUSES
+    # Connection errors and timeouts carry no status code
+    return type(exc).__name__ in {"APIConnectionError", "APITimeoutError"}
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 120.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def call_with_backoff(fn: Callable[[], T], limiter: RateLimiter | FileRateLimiter | None, tokens: int,
+                      log, label: str = "", max_attempts: int = 6,
+                      on_event: Callable[[str, float], None] | None = None) -> T:
+    """
+    Run `fn` under the limiter (if any), retrying retryable API errors with backoff.
+    `on_event(kind, seconds)` is told about every wait for the limiter
+    ("wait") and every backoff before a retry ("retry"). A failed attempt
+    gives its reservation back, so retries and errors do not drain the budget.
+    """
+    for attempt in range(max_attempts):
+        waited = limiter.acquire(tokens) if limiter else 0.0
+        if on_event and waited:
+            on_event("wait", waited)
+        try:
+            return fn()
+        except Exception as e:
+            if limiter:
+                limiter.settle(tokens, 0)
+            if not is_retryable(e) or attempt == max_attempts - 1:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            elif limiter:
+                limiter.pause(delay)
+            log.warning(f"{label}API {getattr(e, 'status_code', type(e).__name__)} — "
+                        f"retry {attempt + 1}/{max_attempts - 1} in {delay:.1f}s")
+            if on_event:
+                on_event("retry", delay)
+            time.sleep(delay)
+    raise RuntimeError("unreachable")
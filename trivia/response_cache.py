@@ -0,0 +1,147 @@
+"""
+trivia/response_cache.py — On-disk cache of API responses, keyed by the full request.
+
+Every response SharedClient (trivia/client.py) receives is stored in a
+SQLite file under a hash of model + prompt + parameters, and an identical
+request later is answered from it: no API call, no rate-limit budget, no
+latency. A cached response carries zero usage, since it cost nothing, and a
+cached stream is replayed in chunks so parser changes can be iterated
+against recorded responses.
+
+Entries older than MAX_AGE days are dropped, and once the file holds more
+than MAX_BYTES of responses the least recently used go first. With
+refresh=True nothing is read but new responses are still stored (the
+scripts' --refresh); --no-cache skips the cache entirely.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from trivia.corpus import BASE_DIR
+
+RESPONSE_CACHE_FILE = BASE_DIR / "content" / "trivia-responses.sqlite"
+
+MAX_BYTES   = 512 * 1024 * 1024
+MAX_AGE     = 30  # days
+EVICT_EVERY = 200  # stores between eviction passes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key     TEXT PRIMARY KEY,
+    model   TEXT NOT NULL,
+    created REAL NOT NULL,
+    used    REAL NOT NULL,
+    size    INTEGER NOT NULL,
+    body    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+
+def message_body(message) -> str:
+    """The parts of a Message that callers read, as JSON."""
+    usage = message.usage
+    return json.dumps({
+        "text": "".join(getattr(block, "text", "") for block in message.content),
+        "stop_reason": getattr(message, "stop_reason", None),
+        "usage": {field: getattr(usage, field, 0) or 0 for field in
+                  ("input_tokens", "output_tokens", "cache_creation_input_tokens",
+                   "cache_read_input_tokens")},
+    })
+
+
+def cached_message(body: str) -> SimpleNamespace:
+    """Rebuild a Message-shaped object from a stored body, with zero usage."""
+    data = json.loads(body)
+    return SimpleNamespace(
+        type="message",
+        stop_reason=data["stop_reason"],
+        content=[SimpleNamespace(type="text", text=data["text"])],
+        usage=SimpleNamespace(input_tokens=0, output_tokens=0,
+                              cache_creation_input_tokens=0, cache_read_input_tokens=0),
+        recorded_usage=data["usage"],
+    )
+
+
+class ResponseCache:
+    def __init__(self, path: Path = RESPONSE_CACHE_FILE, refresh: bool = False,
+                 max_bytes: int = MAX_BYTES, max_age_days: float = MAX_AGE):
+        self.path = path
+        self.refresh = refresh
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = self.misses = self.stored = self.evicted = 0
+        self._since_evict = 0
+        self._lock = threading.Lock()
+        # One connection shared by the worker threads and the client's loop
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.evict()
+
+    def get(self, key: str) -> SimpleNamespace | None:
+        """The cached response for `key` as a Message-like object, counting the hit or miss."""
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT body, created FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or row[1] < now - self.max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        return cached_message(row[0])
+
+    def put(self, key: str, model: str, message) -> None:
+        body = message_body(message)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, created, used, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, model, now, now, len(body), body))
+            self.stored += 1
+            self._since_evict += 1
+            due = self._since_evict >= EVICT_EVERY
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones beyond max_bytes."""
+        with self._lock:
+            self._since_evict = 0
+            removed = self._db.execute("DELETE FROM responses WHERE created < ?",
+                                       (time.time() - self.max_age,)).rowcount
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess, cutoff = total - self.max_bytes, None
+                for used, size in self._db.execute("SELECT used, size FROM responses ORDER BY used"):
+                    excess -= size
+                    if excess <= 0:
+                        cutoff = used
+                        break
+                if cutoff is not None:
+                    removed += self._db.execute("DELETE FROM responses WHERE used <= ?",
+                                                (cutoff,)).rowcount
+            self.evicted += removed
+        return removed
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f" ({self.hits / lookups:.0%} hit rate)" if lookups else ""
+        return (f"Response cache: {self.hits} hits, {self.misses} misses{rate}, "
+                f"{self.stored} stored, {self.evicted} evicted — {self.path.name}")
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,384 @@
+"""
+trivia/sampler.py — Draw game rounds from the corpus without repeating a
+question within a player's session.
+
+A Sampler wraps a loaded corpus (trivia/serve.py's Corpus: questions indexed
+by (category, difficulty) slot) and draws rounds from it:
+
+    sampler = Sampler.load(seed=7)
+    rnd = sampler.draw(10, session="alice", categories=["animals", "art"],
+                       mix={"easy": 40, "medium": 40, "hard": 20},
+                       weights={"animals": 2})
+    rnd.questions   # Question records; rnd.to_json() for the file format
+
+A round's difficulty counts follow `mix` exactly (largest remainder, as in
+trivia/plan.py), and within a difficulty each question is drawn by first
+picking a category by `weights` (unlisted categories weigh 1; without
+weights, categories weigh by size) and then a question uniformly. Every
+pick is a bisect and a randrange, rejected if the session has seen it, so a
+round costs O(n) however large the corpus; only a nearly exhausted
+selection falls back to scanning its pools for what is left, and then only
+as far as it needs to. A category weighted 0 is never drawn from.
+
+Each session keeps the questions it was served as a sorted array of
+question indices while it has seen few, and as a bitmap over the corpus
+once the bitmap is the smaller. Sessions are kept least recently used
+first and dropped beyond MAX_SESSIONS or MAX_SESSION_BYTES, so memory stays
+bounded however many sessions pass through. When the corpus is reloaded,
+rebase() carries sessions over to the new question indices by ID.
+
+With a seed, each session's rounds come from a generator seeded with the
+seed, the session and its round number, so the same history replays the
+same rounds regardless of how requests from other sessions interleave.
+"""
+
+import math
+import random
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from pathlib import Path
+
+from trivia.corpus import QUESTIONS_DIR
+from trivia.plan import apportion
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+MAX_SESSIONS      = 1_000_000
+MAX_SESSION_BYTES = 256 * 1024 * 1024
+SESSION_OVERHEAD  = 160   # bytes per session besides its indices or bitmap (approximate)
+MAX_REMAPS        = 8     # reloads a session may lag behind before it is forgotten
+MAX_SELECTIONS    = 1024  # distinct filters whose weight tables are kept
+
+
+class Seen:
+    """Question indices served to one session: a sorted array, or a bitmap once smaller."""
+
+    __slots__ = ("indices", "bits", "generation", "rounds")
+
+    def __init__(self, generation: int = 0):
+        self.indices = array("I")
+        self.bits: bytearray | None = None
+        self.generation = generation
+        self.rounds = 0
+
+    def __contains__(self, index: int) -> bool:
+        if self.bits is not None:
+            byte = index >> 3
+            return byte < len(self.bits) and bool(self.bits[byte] >> (index & 7) & 1)
+        pos = bisect_left(self.indices, index)
+        return pos < len(self.indices) and self.indices[pos] == index
+
+    def __iter__(self):
+        if self.bits is None:
+            yield from self.indices
+            return
+        for byte, value in enumerate(self.bits):
+            if value:
+                for bit in range(8):
+                    if value >> bit & 1:
+                        yield byte << 3 | bit
+
+    def add(self, index: int, size: int) -> None:
+        """Mark `index` seen; `size` is the corpus size, for sizing the bitmap."""
+        if self.bits is None:
+            pos = bisect_left(self.indices, index)
+            if pos < len(self.indices) and self.indices[pos] == index:
+                return
+            self.indices.insert(pos, index)
+            # 4 bytes per index against size/8 for the bitmap
+            if len(self.indices) * 32 < size:
+                return
+            self.bits = bytearray((size + 7) >> 3)
+            for i in self.indices:
+                self.bits[i >> 3] |= 1 << (i & 7)
+            self.indices = array("I")
+            return
+        byte = index >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (index & 7)
+
+    @property
+    def nbytes(self) -> int:
+        data = len(self.bits) if self.bits is not None else self.indices.itemsize * len(self.indices)
+        return SESSION_OVERHEAD + data
+
+    def remapped(self, table: array, size: int, generation: int) -> "Seen":
+        """A copy with every index translated through `table` (-1 drops it)."""
+        seen = Seen(generation)
+        seen.rounds = self.rounds
+        for index in self:
+            if index < len(table) and table[index] >= 0:
+                seen.add(table[index], size)
+        return seen
+
+
+class Round:
+    """The questions drawn for one round, as indices into the corpus they came from."""
+
+    __slots__ = ("corpus", "indices", "exhausted")
+
+    def __init__(self, corpus, indices: list[int], requested: int):
+        self.corpus = corpus
+        self.indices = indices
+        self.exhausted = len(indices) < requested
+
+    @property
+    def questions(self) -> list:
+        return [self.corpus.questions[i] for i in self.indices]
+
+    def to_json(self) -> list[dict]:
+        return [self.corpus.to_json(i) for i in self.indices]
+
+
+def draw_weighted(pools: list[array], cumulative: list[float], n: int, exclude,
+                  chosen: set[int], rng: random.Random) -> list[int]:
+    """
+    Up to `n` distinct indices, each from a pool picked by its cumulative
+    weight, skipping `exclude` and `chosen` (which it extends). Gives up after
+    a bounded number of rejections rather than scanning the pools.
+    """
+    total = cumulative[-1] if cumulative else 0.0
+    picked: list[int] = []
+    attempts = 0
+    while len(picked) < n and total > 0 and attempts < 4 * n + 16:
+        attempts += 1
+        p = min(bisect_right(cumulative, rng.random() * total), len(pools) - 1)
+        pool = pools[p]
+        index = pool[rng.randrange(len(pool))]
+        if index in exclude or index in chosen:
+            continue
+        chosen.add(index)
+        picked.append(index)
+    return picked
+
+
+def fill(pools: list[array], cumulative: list[float], n: int, exclude,
+         chosen: set[int], rng: random.Random) -> list[int]:
+    """
+    Up to `n` indices from `pools` that draw_weighted() could not find by
+    chance: pools are visited in a weighted random order, each from a random
+    offset, and the scan stops once it holds a few times `n` candidates.
+    """
+    weights = [hi - lo for lo, hi in zip([0.0] + cumulative, cumulative)]
+    # Weighted shuffle without replacement (Efraimidis–Spirakis keys)
+    order = sorted(range(len(pools)), key=lambda p: -rng.random() ** (1 / weights[p]))
+    candidates: list[int] = []
+    for p in order:
+        pool = pools[p]
+        start = rng.randrange(len(pool))
+        for k in range(len(pool)):
+            index = pool[(start + k) % len(pool)]
+            if index not in exclude and index not in chosen:
+                candidates.append(index)
+        if len(candidates) >= 4 * n:
+            break
+    picked = rng.sample(candidates, min(n, len(candidates)))
+    chosen.update(picked)
+    return picked
+
+
+class Selection:
+    """
+    The (category, difficulty) pools a filter selects, with cumulative
+    weights over all of them and per difficulty; built once per filter.
+    """
+
+    __slots__ = ("slots", "overall", "by_level")
+
+    def __init__(self, corpus, categories: list[int] | None, levels: list[int] | None,
+                 weights: dict[int, float] | None):
+        cats = categories if categories is not None else range(len(corpus.categories))
+        lvls = levels if levels is not None else range(len(DIFFICULTIES))
+        self.slots = [(c, d, corpus.by_slot[(c, d)]) for c in cats for d in lvls
+                      if (c, d) in corpus.by_slot]
+        self.overall = self.table(self.slots, weights)
+        self.by_level = {d: self.table([s for s in self.slots if s[1] == d], weights)
+                         for d in sorted({d for _, d, _ in self.slots})}
+
+    @staticmethod
+    def table(slots: list[tuple[int, int, array]],
+              weights: dict[int, float] | None) -> tuple[list[array], list[float]]:
+        """
+        Pools and cumulative weights: a category's weight split across its
+        pools by size. Pools of a category weighted 0 are left out.
+        """
+        sizes: dict[int, int] = {}
+        for cat, _, pool in slots:
+            sizes[cat] = sizes.get(cat, 0) + len(pool)
+        pools, cumulative, total = [], [], 0.0
+        for cat, _, pool in slots:
+            weight = len(pool) if weights is None else weights.get(cat, 1.0) * len(pool) / sizes[cat]
+            if weight > 0:
+                total += weight
+                pools.append(pool)
+                cumulative.append(total)
+        return pools, cumulative
+
+
+def pick(selection: Selection, n: int, mix: dict[str, float] | None, exclude,
+         rng: random.Random) -> list[int]:
+    """`n` distinct question indices for one round (fewer if the selection runs out)."""
+    if mix is None:
+        groups = [(selection.overall, n)]
+    else:
+        counts = apportion(n, {d: mix.get(DIFFICULTIES[d], 0) for d in selection.by_level})
+        groups = [(selection.by_level[d], count) for d, count in counts.items() if count]
+
+    picked: list[int] = []
+    chosen: set[int] = set()
+    for (pools, cumulative), count in groups:
+        picked += draw_weighted(pools, cumulative, count, exclude, chosen, rng)
+    if len(picked) < n:
+        # Nearly exhausted (or a short difficulty): fill from what is left of the weighted pools
+        picked += fill(*selection.overall, n - len(picked), exclude, chosen, rng)
+    return picked
+
+
+def check_weight(value, what: str) -> float:
+    """`value` as a float, or ValueError unless it is finite and not negative."""
+    weight = float(value)
+    if not math.isfinite(weight) or weight < 0:
+        raise ValueError(f"{what} must be a finite number ≥ 0, got {value!r}")
+    return weight
+
+
+class Sampler:
+    def __init__(self, corpus, seed: int | str | None = None, max_sessions: int = MAX_SESSIONS,
+                 max_bytes: int = MAX_SESSION_BYTES):
+        self.corpus = corpus
+        self.seed = seed
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._sessions: OrderedDict[str, Seen] = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._remaps: deque[tuple[int, array]] = deque(maxlen=MAX_REMAPS)
+        self._selections: OrderedDict[tuple, Selection] = OrderedDict()
+        self._rng = random.Random(seed)
+        self._draws = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, questions_dir: Path = QUESTIONS_DIR, include_raw: bool = False,
+             **kwargs) -> "Sampler":
+        """A sampler over the question files, loaded with trivia/serve.py's Corpus."""
+        from trivia.serve import Corpus
+        return cls(Corpus(questions_dir, include_raw), **kwargs)
+
+    @property
+    def sessions(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def session_bytes(self) -> int:
+        return self._bytes
+
+    def rebase(self, corpus) -> None:
+        """Switch to a reloaded corpus, carrying what sessions have seen over by question ID."""
+        table = array("i", (corpus.by_id.get(q.id, -1) for q in self.corpus.questions))
+        with self._lock:
+            self._remaps.append((self._generation, table))
+            self._generation += 1
+            self.corpus = corpus
+            self._selections.clear()
+
+    def draw(self, n: int, session: str | None = None, categories: list[str] | None = None,
+             difficulties: list[str] | None = None, mix: dict[str, float] | None = None,
+             weights: dict[str, float] | None = None) -> Round:
+        """
+        A round of up to `n` questions no `session` has been served before.
+        Categories (slugs or names) and difficulties narrow the selection;
+        unknown ones raise ValueError.
+        """
+        with self._lock:
+            corpus = self.corpus
+            cats = None if categories is None else [self._category(corpus, c) for c in categories]
+            levels = None
+            if difficulties is not None:
+                names = [d.strip().lower() for d in difficulties]
+                unknown = [d for d in names if d not in DIFFICULTIES]
+                if unknown:
+                    raise ValueError(f"unknown difficulty '{unknown[0]}'")
+                levels = [DIFFICULTIES.index(d) for d in names]
+            weighted = None
+            if weights is not None:
+                weighted = {self._category(corpus, c): check_weight(w, "weight")
+                            for c, w in weights.items()}
+                selected = cats if cats is not None else range(len(corpus.categories))
+                if not any(weighted.get(c, 1.0) for c in selected):
+                    raise ValueError("category weights must not all be zero")
+            if mix is not None:
+                mix = {d: check_weight(w, "difficulty share") for d, w in mix.items()}
+                if not any(mix.values()):
+                    raise ValueError("difficulty shares must not all be zero")
+
+            selection = self._selection(corpus, cats, levels, weighted)
+            seen = self._session(session) if session else None
+            picked = pick(selection, n, mix, seen or (), self._round_rng(session, seen))
+            if seen is not None:
+                for index in picked:
+                    seen.add(index, len(corpus.questions))
+                seen.rounds += 1
+                self._store(session, seen)
+        return Round(corpus, picked, n)
+
+    def forget(self, session: str) -> None:
+        with self._lock:
+            seen = self._sessions.pop(session, None)
+            if seen is not None:
+                self._bytes -= seen.nbytes
+
+    @staticmethod
+    def _category(corpus, key: str) -> int:
+        index = corpus.category_index(key)
+        if index is None:
+            raise ValueError(f"unknown category '{key.strip()}'")
+        return index
+
+    def _selection(self, corpus, categories: list[int] | None, levels: list[int] | None,
+                   weights: dict[int, float] | None) -> Selection:
+        key = (None if categories is None else tuple(categories),
+               None if levels is None else tuple(levels),
+               None if weights is None else tuple(sorted(weights.items())))
+        selection = self._selections.pop(key, None)
+        if selection is None:
+            selection = Selection(corpus, categories, levels, weights)
+        self._selections[key] = selection
+        if len(self._selections) > MAX_SELECTIONS:
+            self._selections.popitem(last=False)
+        return selection
+
+    def _round_rng(self, session: str | None, seen: Seen | None) -> random.Random:
+        if self.seed is None:
+            return self._rng
+        if seen is None:
+            self._draws += 1
+            return random.Random(f"{self.seed}:{self._draws}")
+        return random.Random(f"{self.seed}:{session}:{seen.rounds}")
+
+    def _session(self, session: str) -> Seen:
+        """The session's Seen, caught up with any reloads; taken out of the LRU until _store."""
+        seen = self._sessions.pop(session, None)
+        if seen is not None:
+            self._bytes -= seen.nbytes
+            if seen.generation != self._generation:
+                tables = [table for generation, table in self._remaps if generation >= seen.generation]
+                if len(tables) != self._generation - seen.generation:
+                    return Seen(self._generation)  # older than the reloads remembered
+                size = len(self.corpus.questions)
+                for table in tables:
+                    seen = seen.remapped(table, size, self._generation)
+        return seen if seen is not None else Seen(self._generation)
+
+    def _store(self, session: str, seen: Seen) -> None:
+        self._sessions[session] = seen
+        self._bytes += seen.nbytes
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions
+                                           or self._bytes > self.max_bytes):
+            _, oldest = self._sessions.popitem(last=False)
+            self._bytes -= oldest.nbytes
+            self.evicted += 1
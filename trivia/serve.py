@@ -0,0 +1,280 @@
+"""
+trivia/serve.py — Local HTTP API serving game rounds from content/questions.
+
+At startup the corpus is loaded into compact records (`__slots__`, answers as
+tuples, category and difficulty as small ints) with indexes by ID and by
+(category, difficulty), so drawing a round never touches the files or scans
+the corpus. A background thread polls the files and swaps in a freshly
+loaded corpus when any of them change.
+
+Endpoints (all GET, JSON):
+    /health
+    /categories                       slugs, names and per-difficulty counts
+    /questions/<id>                   one question
+    /round?n=10&categories=animals,art&difficulty=easy,medium&session=abc
+           &mix=40/40/20&weights=animals:2,art:1
+                                      n random questions, never repeating a
+                                      question already served to `session`,
+                                      drawn by trivia/sampler.py: `mix` fixes
+                                      the round's difficulty split, `weights`
+                                      favours categories
+
+Responses carry an ETag (If-None-Match → 304) and are gzipped when the
+client accepts it. Rounds are marked Cache-Control: no-store.
+
+Usage:
+    python3 -m trivia.serve                    # http://127.0.0.1:8080
+    python3 -m trivia.serve --port 9000 --include-raw
+    python3 -m trivia.serve --seed 1           # reproducible rounds, for tests
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from array import array
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from trivia.corpus import QUESTIONS_DIR, load_file, question_files
+from trivia.plan import parse_mix
+from trivia.sampler import Sampler
+
+DIFFICULTIES = ("easy", "medium", "hard")
+MAX_ROUND     = 100     # largest n a single request may ask for
+GZIP_MIN_SIZE = 1024
+POLL_INTERVAL = 2.0
+
+
+class Question:
+    __slots__ = ("id", "text", "answers", "correct", "absurd", "difficulty", "category")
+
+    def __init__(self, qid: str, text: str, answers: tuple[str, ...], correct: int,
+                 absurd: int, difficulty: int, category: int):
+        self.id = qid
+        self.text = text
+        self.answers = answers
+        self.correct = correct
+        self.absurd = absurd
+        self.difficulty = difficulty
+        self.category = category
+
+
+class Corpus:
+    """Immutable in-memory snapshot of the question files."""
+
+    def __init__(self, questions_dir: Path, include_raw: bool = False):
+        self.questions: list[Question] = []
+        self.categories: list[dict] = []   # {"slug", "name"}
+        self.by_id: dict[str, int] = {}
+        self.by_slot: dict[tuple[int, int], array] = {}
+        self._category_lookup: dict[str, int] = {}
+
+        for path in question_files(questions_dir, include_raw):
+            data = load_file(path)
+            cat = len(self.categories)
+            name = data.get("category", path.stem)
+            self.categories.append({"slug": path.stem, "name": name})
+            self._category_lookup[path.stem.lower()] = cat
+            self._category_lookup.setdefault(name.lower(), cat)
+            for q in data.get("questions", []):
+                answers = q["answers"]
+                level = DIFFICULTIES.index(q["difficulty"]) if q.get("difficulty") in DIFFICULTIES else 1
+                index = len(self.questions)
+                self.questions.append(Question(
+                    q["id"], q["question"], tuple(a["text"] for a in answers),
+                    next((i for i, a in enumerate(answers) if a.get("correct")), -1),
+                    next((i for i, a in enumerate(answers) if a.get("absurd")), -1),
+                    level, cat,
+                ))
+                self.by_id.setdefault(q["id"], index)
+                self.by_slot.setdefault((cat, level), array("I")).append(index)
+
+        # Rounds are stitched together from these, so a request never re-encodes
+        self.encoded: list[bytes] = [
+            json.dumps(self.to_json(i), ensure_ascii=False, separators=(",", ":")).encode()
+            for i in range(len(self.questions))
+        ]
+        self.version = hashlib.sha1(
+            "\0".join(f"{q.id}\1{q.text}\1{q.answers}" for q in self.questions).encode()
+        ).hexdigest()[:16]
+
+    def category_index(self, key: str) -> int | None:
+        return self._category_lookup.get(key.strip().lower())
+
+    def to_json(self, index: int) -> dict:
+        q = self.questions[index]
+        answers = []
+        for i, text in enumerate(q.answers):
+            answer = {"text": text, "correct": i == q.correct}
+            if i == q.absurd:
+                answer["absurd"] = True
+            answers.append(answer)
+        return {"id": q.id, "question": q.text, "answers": answers,
+                "difficulty": DIFFICULTIES[q.difficulty],
+                "category": self.categories[q.category]["name"]}
+
+
+class TriviaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, questions_dir: Path, include_raw: bool = False,
+                 poll: float = POLL_INTERVAL, seed: int | None = None):
+        super().__init__(address, Handler)
+        self.questions_dir = questions_dir
+        self.include_raw = include_raw
+        self.corpus = Corpus(questions_dir, include_raw)
+        self.sampler = Sampler(self.corpus, seed=seed)
+        self._stamp = self._files_stamp()
+        if poll > 0:
+            threading.Thread(target=self._watch, args=(poll,), daemon=True).start()
+
+    def _files_stamp(self) -> tuple:
+        files = question_files(self.questions_dir, self.include_raw)
+        return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in files)
+
+    def _watch(self, poll: float) -> None:
+        while True:
+            time.sleep(poll)
+            try:
+                stamp = self._files_stamp()
+                if stamp != self._stamp:
+                    corpus = Corpus(self.questions_dir, self.include_raw)
+                    self.sampler.rebase(corpus)
+                    self.corpus, self._stamp = corpus, stamp
+                    print(f"Reloaded {len(corpus.questions)} questions (version {corpus.version})")
+            except (OSError, ValueError, KeyError) as e:
+                # A file caught mid-write; try again on the next tick
+                print(f"Reload skipped: {e}")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True   # headers and body go out as separate writes
+    server: TriviaServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        corpus = self.server.corpus
+        path = url.path.rstrip("/")
+
+        if path == "/health":
+            self.send_json({"status": "ok", "questions": len(corpus.questions),
+                            "version": corpus.version})
+        elif path == "/categories":
+            counts = [[0] * len(DIFFICULTIES) for _ in corpus.categories]
+            for (cat, level), pool in corpus.by_slot.items():
+                counts[cat][level] = len(pool)
+            self.send_json({"version": corpus.version, "categories": [
+                {**c, "count": sum(counts[i]), "difficulty": dict(zip(DIFFICULTIES, counts[i]))}
+                for i, c in enumerate(corpus.categories)
+            ]})
+        elif path.startswith("/questions/"):
+            index = corpus.by_id.get(path.rsplit("/", 1)[1])
+            if index is None:
+                self.send_error_json(HTTPStatus.NOT_FOUND, "unknown question id")
+            else:
+                self.send_body(corpus.encoded[index])
+        elif path == "/round":
+            self.send_round(params)
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "unknown endpoint")
+
+    def send_round(self, params: dict) -> None:
+        try:
+            n = int(params.get("n", 10))
+        except ValueError:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, "n must be an integer")
+        if not 1 <= n <= MAX_ROUND:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, f"n must be 1–{MAX_ROUND}")
+
+        try:
+            mix = parse_mix(params["mix"]) if params.get("mix") else None
+            weights = None
+            if params.get("weights"):
+                weights = {}
+                for part in params["weights"].split(","):
+                    key, _, value = part.rpartition(":")
+                    if not key:
+                        raise ValueError("weights must be category:weight pairs")
+                    weights[key] = float(value)
+            rnd = self.server.sampler.draw(
+                n, params.get("session") or None,
+                categories=params["categories"].split(",") if params.get("categories") else None,
+                difficulties=params["difficulty"].split(",") if params.get("difficulty") else None,
+                mix=mix, weights=weights,
+            )
+        except ValueError as e:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+        # The round's own corpus: a reload may have swapped self.server.corpus meanwhile
+        corpus = rnd.corpus
+        body = b"".join([
+            b'{"version":"', corpus.version.encode(),
+            b'","exhausted":', b"true" if rnd.exhausted else b"false",
+            b',"questions":[', b",".join(corpus.encoded[i] for i in rnd.indices), b"]}",
+        ])
+        self.send_body(body, cache=False)
+
+    def send_json(self, payload: dict, status: int = HTTPStatus.OK, cache: bool = True) -> None:
+        self.send_body(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(),
+                       status, cache)
+
+    def send_body(self, body: bytes, status: int = HTTPStatus.OK, cache: bool = True) -> None:
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+        if cache and self.headers.get("If-None-Match") == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        encoding = None
+        if len(body) >= GZIP_MIN_SIZE and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body, encoding = gzip.compress(body, 5), "gzip"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache" if cache else "no-store")
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str) -> None:
+        self.send_json({"error": message}, status, cache=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve trivia rounds over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--questions-dir", type=Path, default=QUESTIONS_DIR)
+    parser.add_argument("--include-raw", action="store_true",
+                        help="Also serve generated _raw.json files")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL,
+                        help=f"Seconds between file change checks, 0 to disable (default: {POLL_INTERVAL})")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed the sampler so every session's rounds are reproducible")
+    args = parser.parse_args()
+
+    server = TriviaServer((args.host, args.port), args.questions_dir, args.include_raw, args.poll,
+                          args.seed)
+    print(f"Serving {len(server.corpus.questions)} questions in "
+          f"{len(server.corpus.categories)} categories on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+trivia/stats.py — Corpus-wide statistics over every question file.
+
+All questions are loaded once into parallel `array` columns (one entry per
+question, plus one per answer; a large corpus is read by a pool of workers,
+as in trivia/validate.py), and every figure is a reduction over them:
+bincounts, optionally grouped by category, from which counts, shares, means
+and percentiles follow. With numpy installed and a corpus of at least
+NUMPY_MIN_QUESTIONS, the bincounts run on the same buffers without a copy;
+below that, importing numpy would cost more than it saves.
+
+    difficulty        balance per category, against the generator's MIX,
+                      and files whose metadata.difficulty is out of date
+    question_words    distribution of question length in words
+    answer_words      distribution of answer length in words
+    correct_position  where the correct answer sits among the regular
+                      answers, in file order (the viewers shuffle on display)
+    answer_length     correct vs wrong answer length in characters: how often
+                      the correct answer is the longest or shortest — a tell
+                      players learn to exploit when it beats chance
+    absurd            share of questions with an absurd answer
+
+Usage:
+    python3 -m trivia stats                 # curated files
+    python3 -m trivia stats --include-raw   # plus generator output
+    python3 -m trivia stats --json          # for dashboards
+"""
+
+import argparse
+import json
+import os
+import time
+from array import array
+from pathlib import Path
+
+from trivia.corpus import MAX_WORDS, QUESTIONS_DIR, load_file, question_files
+from trivia.plan import MIX
+
+DIFFICULTIES = ("easy", "medium", "hard")
+OTHER = len(DIFFICULTIES)  # difficulty code for a missing or unknown value
+
+WORDS_CAP     = 60     # longer questions and answers share the last bucket
+MAX_POSITIONS = 5      # answer positions tracked; the last means "no correct answer"
+NONE          = MAX_POSITIONS
+
+NUMPY_MIN_QUESTIONS = 20_000
+POOL_MIN_BYTES      = 2_000_000  # below this, starting workers costs more than it saves
+MIX_TOLERANCE       = 15    # points a category's difficulty share may stray from MIX
+TELL_RATIO          = 1.6   # correct-is-longest share over chance that flags a category
+MIN_FLAG_QUESTIONS  = 10    # smaller categories are too noisy to flag
+
+
+# ── Columns ────────────────────────────────────────────────────────────────
+
+class Corpus:
+    """Every question as parallel arrays; categories are the files' stems."""
+
+    def __init__(self):
+        self.categories: list[str] = []
+        self.stale_metadata: list[str] = []
+        # One entry per question
+        self.category = array("H")
+        self.difficulty = array("B")      # index into DIFFICULTIES, OTHER if unknown
+        self.question_words = array("H")  # capped at WORDS_CAP
+        self.regular = array("B")         # answers that are not absurd
+        self.correct = array("B")         # position among the regular answers, NONE if none
+        self.absurd = array("B")          # 1 if the question has an absurd answer
+        self.correct_longest = array("B")   # 1 if strictly longer than every wrong answer
+        self.correct_shortest = array("B")  # 1 if strictly shorter than every wrong answer
+        self.correct_chars = array("I")
+        self.wrong_chars = array("I")     # mean over the wrong regular answers, rounded
+        # One entry per answer
+        self.answer_words = array("H")
+
+    def __len__(self) -> int:
+        return len(self.category)
+
+    @classmethod
+    def load(cls, files: list[Path], jobs: int | None = None) -> "Corpus":
+        """Columns for `files`, read by a pool of workers when the corpus is large."""
+        if jobs is None:
+            small = sum(p.stat().st_size for p in files) < POOL_MIN_BYTES
+            jobs = 1 if small else os.cpu_count() or 1
+        jobs = min(jobs, len(files))
+        if jobs <= 1:
+            corpus = cls()
+            for path in files:
+                corpus.add_file(path)
+            return corpus
+        # Imported only when needed: multiprocessing doubles the CLI's start-up time
+        from concurrent.futures import ProcessPoolExecutor
+        corpus = cls()
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for part in pool.map(load_columns, files, chunksize=max(1, len(files) // (jobs * 4))):
+                corpus.extend(part)
+        return corpus
+
+    def add_file(self, path: Path) -> None:
+        data = load_file(path)
+        levels = {d: i for i, d in enumerate(DIFFICULTIES)}
+        cat = len(self.categories)
+        self.categories.append(path.stem)
+        counts = [0] * (OTHER + 1)
+        for q in data.get("questions", []):
+            level = levels.get(q.get("difficulty"), OTHER)
+            counts[level] += 1
+            self.add(cat, level, q)
+        recorded = data.get("metadata", {}).get("difficulty", {})
+        if any(recorded.get(d, 0) != counts[i] for i, d in enumerate(DIFFICULTIES)):
+            self.stale_metadata.append(path.name)
+
+    def extend(self, other: "Corpus") -> None:
+        """Append another corpus's columns, renumbering its categories after ours."""
+        offset = len(self.categories)
+        self.categories += other.categories
+        self.stale_metadata += other.stale_metadata
+        self.category.extend(array("H", (c + offset for c in other.category)) if offset
+                             else other.category)
+        for column in ("difficulty", "question_words", "regular", "correct", "absurd",
+                       "correct_longest", "correct_shortest", "correct_chars",
+                       "wrong_chars", "answer_words"):
+            getattr(self, column).extend(getattr(other, column))
+
+    def add(self, cat: int, level: int, q: dict) -> None:
+        self.category.append(cat)
+        self.difficulty.append(level)
+        self.question_words.append(min(len(q.get("question", "").split()), WORDS_CAP))
+        correct, correct_len, wrong_lens, absurd, regular = NONE, 0, [], 0, 0
+        for a in q.get("answers", []):
+            text = a.get("text", "")
+            self.answer_words.append(min(len(text.split()), WORDS_CAP))
+            if a.get("absurd"):
+                absurd = 1
+                continue
+            if a.get("correct") and correct == NONE:
+                correct, correct_len = min(regular, NONE - 1), len(text)
+            else:
+                wrong_lens.append(len(text))
+            regular += 1
+        self.regular.append(min(regular, 255))
+        self.correct.append(correct)
+        self.absurd.append(absurd)
+        has_both = correct != NONE and wrong_lens
+        self.correct_longest.append(int(bool(has_both) and correct_len > max(wrong_lens)))
+        self.correct_shortest.append(int(bool(has_both) and correct_len < min(wrong_lens)))
+        self.correct_chars.append(correct_len)
+        self.wrong_chars.append(round(sum(wrong_lens) / len(wrong_lens)) if wrong_lens else 0)
+
+
+# ── Reductions ─────────────────────────────────────────────────────────────
+
+def load_columns(path: Path) -> Corpus:
+    """One file's columns (a pool worker's unit of work)."""
+    corpus = Corpus()
+    corpus.add_file(path)
+    return corpus
+
+
+def get_numpy(size: int):
+    """numpy, when installed and the corpus is big enough to be worth importing it for."""
+    if size < NUMPY_MIN_QUESTIONS:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def bincount(values: array, length: int, weights: array | None = None, np=None) -> list:
+    """Occurrences (or summed weights) of each value in 0..length-1."""
+    if np is not None:
+        v = np.frombuffer(values, dtype=values.typecode)
+        w = None if weights is None else np.frombuffer(weights, dtype=weights.typecode)
+        return np.bincount(v, weights=w, minlength=length).tolist()
+    counts = [0] * length
+    if weights is None:
+        for v in values:
+            counts[v] += 1
+    else:
+        for v, w in zip(values, weights):
+            counts[v] += w
+    return counts
+
+
+def grouped(groups: array, values: array, groups_len: int, values_len: int,
+            np=None) -> list[list[int]]:
+    """bincount of `values` per group: result[group][value]."""
+    if np is not None:
+        g = np.frombuffer(groups, dtype=groups.typecode).astype(np.int64)
+        v = np.frombuffer(values, dtype=values.typecode)
+        flat = np.bincount(g * values_len + v, minlength=groups_len * values_len)
+        return flat.reshape(groups_len, values_len).tolist()
+    counts = [[0] * values_len for _ in range(groups_len)]
+    for g, v in zip(groups, values):
+        counts[g][v] += 1
+    return counts
+
+
+def share(part: float, whole: float) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+def distribution(histogram: list[int]) -> dict:
+    """Summary of an integer-valued column from its bincount."""
+    total = sum(histogram)
+    if not total:
+        return {"count": 0}
+    marks = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+    result = {
+        "count": total,
+        "mean": round(sum(i * n for i, n in enumerate(histogram)) / total, 2),
+        "min": next(i for i, n in enumerate(histogram) if n),
+        "max": max(i for i, n in enumerate(histogram) if n),
+    }
+    seen = 0
+    for i, n in enumerate(histogram):
+        seen += n
+        for name, q in list(marks.items()):
+            if seen >= q * total:
+                result[name] = i
+                del marks[name]
+    result["histogram"] = {str(i) if i < WORDS_CAP else f"{WORDS_CAP}+": n
+                           for i, n in enumerate(histogram) if n}
+    return result
+
+
+# ── Report ─────────────────────────────────────────────────────────────────
+
+def compute(corpus: Corpus, max_words: int = MAX_WORDS, use_numpy: bool = True) -> dict:
+    np = get_numpy(len(corpus)) if use_numpy else None
+    n, cats = len(corpus), len(corpus.categories)
+    levels = len(DIFFICULTIES) + 1
+
+    difficulty = bincount(corpus.difficulty, levels, np=np)
+    by_cat_difficulty = grouped(corpus.category, corpus.difficulty, cats, levels, np)
+    by_cat_absurd = grouped(corpus.category, corpus.absurd, cats, 2, np)
+    by_cat_longest = grouped(corpus.category, corpus.correct_longest, cats, 2, np)
+    by_cat_words = bincount(corpus.category, cats, corpus.question_words, np)
+    by_cat_correct_chars = bincount(corpus.category, cats, corpus.correct_chars, np)
+    by_cat_wrong_chars = bincount(corpus.category, cats, corpus.wrong_chars, np)
+    question_words = bincount(corpus.question_words, WORDS_CAP + 1, np=np)
+    answer_words = bincount(corpus.answer_words, WORDS_CAP + 1, np=np)
+    positions = grouped(corpus.regular, corpus.correct, 256, MAX_POSITIONS + 1, np)
+    absurd = sum(corpus.absurd)
+    longest, shortest = sum(corpus.correct_longest), sum(corpus.correct_shortest)
+    correct_chars, wrong_chars = sum(corpus.correct_chars), sum(corpus.wrong_chars)
+
+    # Chance that the correct answer is the longest of k regular answers is 1/k
+    chance = sum(count / k for k, row in enumerate(positions) if k for count in [sum(row)])
+    mix_total = sum(MIX.values())
+    categories, flags = [], []
+    for c, name in enumerate(corpus.categories):
+        total = sum(by_cat_difficulty[c])
+        if not total:
+            continue
+        mix = {d: share(by_cat_difficulty[c][i], total) for i, d in enumerate(DIFFICULTIES)}
+        drift = max(abs(mix[d] * 100 - MIX[d] * 100 / mix_total) for d in DIFFICULTIES)
+        longest_share = share(by_cat_longest[c][1], total)
+        categories.append({
+            "category": name,
+            "questions": total,
+            "difficulty": dict(zip(DIFFICULTIES, by_cat_difficulty[c])),
+            "difficulty_share": mix,
+            "mix_drift": round(drift, 1),
+            "mean_question_words": round(by_cat_words[c] / total, 2),
+            "absurd_share": share(by_cat_absurd[c][1], total),
+            "correct_longest_share": longest_share,
+            "length_ratio": share(by_cat_correct_chars[c], by_cat_wrong_chars[c]),
+        })
+        if total < MIN_FLAG_QUESTIONS:
+            continue
+        if drift > MIX_TOLERANCE:
+            flags.append(f"{name}: difficulty mix {drift:.0f} points off {'/'.join(map(str, MIX.values()))}")
+        if chance and longest_share > TELL_RATIO * chance / n:
+            flags.append(f"{name}: correct answer is the longest in {longest_share:.0%} of questions")
+
+    over = sum(question_words[max_words + 1:])
+    return {
+        "questions": n,
+        "answers": len(corpus.answer_words),
+        "files": cats,
+        "backend": "numpy" if np is not None else "array",
+        "difficulty": {
+            "counts": {**dict(zip(DIFFICULTIES, difficulty)), "other": difficulty[OTHER]},
+            "target": {d: share(MIX[d], mix_total) for d in DIFFICULTIES},
+            "stale_metadata": corpus.stale_metadata,
+        },
+        "question_words": {**distribution(question_words), "over_limit": over,
+                           "over_limit_share": share(over, n)},
+        "answer_words": distribution(answer_words),
+        "correct_position": {
+            str(k): {str(p): row[p] for p in range(MAX_POSITIONS) if p < k and row[p]}
+                    | ({"none": row[NONE]} if row[NONE] else {})
+            for k, row in enumerate(positions) if sum(row)
+        },
+        "answer_length": {
+            "correct_mean_chars": round(correct_chars / n, 2) if n else 0.0,
+            "wrong_mean_chars": round(wrong_chars / n, 2) if n else 0.0,
+            "ratio": share(correct_chars, wrong_chars),
+            "correct_longest_share": share(longest, n),
+            "correct_shortest_share": share(shortest, n),
+            "chance_share": share(chance, n),
+        },
+        "absurd": {"questions": absurd, "share": share(absurd, n)},
+        "categories": categories,
+        "flags": flags,
+    }
+
+
+def format_report(stats: dict) -> str:
+    d, qw, al = stats["difficulty"], stats["question_words"], stats["answer_length"]
+    counts = d["counts"]
+    lines = [
+        f"{stats['questions']:,} questions, {stats['answers']:,} answers in {stats['files']} files "
+        f"({stats['backend']}, {stats['seconds']:.2f}s)",
+        "",
+        "difficulty      " + "  ".join(f"{k} {v:,} ({share(v, stats['questions']):.0%})"
+                                       for k, v in counts.items() if v or k != "other"),
+        f"question words  mean {qw.get('mean', 0)}  p50 {qw.get('p50', 0)}  p90 {qw.get('p90', 0)}  "
+        f"p99 {qw.get('p99', 0)}  max {qw.get('max', 0)}  — {qw['over_limit']:,} over the limit",
+        f"answer words    mean {stats['answer_words'].get('mean', 0)}  "
+        f"p90 {stats['answer_words'].get('p90', 0)}  max {stats['answer_words'].get('max', 0)}",
+        f"answer length   correct {al['correct_mean_chars']} vs wrong {al['wrong_mean_chars']} chars; "
+        f"correct is longest {al['correct_longest_share']:.0%}, shortest "
+        f"{al['correct_shortest_share']:.0%} (chance {al['chance_share']:.0%})",
+        f"absurd answers  {stats['absurd']['questions']:,} ({stats['absurd']['share']:.0%})",
+        "correct position (file order, by answer count): " + "; ".join(
+            f"{k}: " + " ".join(f"{p}={c}" for p, c in row.items())
+            for k, row in stats["correct_position"].items()),
+        "",
+        f"{'category':<28} {'questions':>9} {'easy':>5} {'med':>5} {'hard':>5} "
+        f"{'words':>6} {'absurd':>7} {'longest':>8}",
+    ]
+    for c in stats["categories"]:
+        s = c["difficulty_share"]
+        lines.append(f"{c['category']:<28} {c['questions']:>9} {s['easy']:>5.0%} {s['medium']:>5.0%} "
+                     f"{s['hard']:>5.0%} {c['mean_question_words']:>6.1f} {c['absurd_share']:>7.0%} "
+                     f"{c['correct_longest_share']:>8.0%}")
+    if d["stale_metadata"]:
+        lines += ["", "metadata.difficulty out of date: " + ", ".join(d["stale_metadata"])]
+    if stats["flags"]:
+        lines += ["", *(f"! {flag}" for flag in stats["flags"])]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize the question files")
+    parser.add_argument("--questions-dir", type=Path, default=QUESTIONS_DIR)
+    parser.add_argument("--include-raw", action="store_true",
+                        help="Also count generator output (*_raw.json)")
+    parser.add_argument("--max-words", type=int, default=MAX_WORDS, metavar="N",
+                        help=f"Question length limit to count against (default: {MAX_WORDS})")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="Worker processes (default: one per CPU for a large corpus; 1 runs inline)")
+    parser.add_argument("--no-numpy", action="store_true",
+                        help="Use the pure-Python reductions even when numpy is installed")
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    corpus = Corpus.load(question_files(args.questions_dir, args.include_raw), args.jobs)
+    stats = compute(corpus, args.max_words, use_numpy=not args.no_numpy)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    print(json.dumps(stats, indent=2) if args.json else format_report(stats))
+
+
+if __name__ == "__main__":
+    main()
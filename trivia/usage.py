@@ -0,0 +1,34 @@
+"""
+trivia/usage.py — Running totals of API token usage, including prompt-cache reads/writes.
+"""
+
+import threading
+
+
+class UsageTotals:
+    """Thread-safe accumulator over the `usage` block of API responses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+
+    def add(self, usage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.input_tokens or 0
+            self.output_tokens += usage.output_tokens or 0
+            self.cache_read_tokens += getattr(usage, "cache_read_input_tokens", 0) or 0
+            self.cache_write_tokens += getattr(usage, "cache_creation_input_tokens", 0) or 0
+
+    def summary(self) -> str:
+        prompt_total = self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+        hit_rate = self.cache_read_tokens / prompt_total if prompt_total else 0.0
+        return (
+            f"{self.calls} calls — input {self.input_tokens}, output {self.output_tokens}, "
+            f"cache write {self.cache_write_tokens}, cache read {self.cache_read_tokens} "
+            f"({hit_rate:.0%} of prompt tokens served from cache)"
+        )
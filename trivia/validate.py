@@ -0,0 +1,445 @@
+"""
+trivia/validate.py — Check every question file against schema.json and the content rules.
+
+The schema is compiled once per process into plain Python checks (no
+generic jsonschema walk), then each file is checked on a process pool:
+
+    shape         everything schema.json says: required fields, types,
+                  enums, lengths, ID pattern, 4–5 answers, no unknown keys
+    answers       exactly one correct answer, at most one absurd one (never
+                  the correct one), no repeated answer text
+    IDs           unique within the file and across all files, one prefix
+                  per file, no prefix shared by two categories
+    metadata      totalQuestions and the difficulty counts agree with the
+                  questions; every question carries the file's category
+    length        questions over MAX_WORDS words (QUESTION_RULES.md) — a
+                  warning, since the rule is a target
+
+A manifest (trivia-validate-manifest.json next to the questions directory,
+see trivia/manifest.py) records every file that passed cleanly, so later runs
+re-check only files that changed or had issues; the cross-file ID rules use
+the recorded IDs of the rest. A change to schema.json or --max-words starts
+over.
+
+--fix normalizes before checking: trims whitespace, fills in a missing
+question category and recomputes metadata, rewriting only files that
+change. Exit status is 1 when there are errors (or warnings, with
+--strict), so it works as a pre-commit hook or CI step:
+
+    python3 -m trivia.validate || exit 1
+
+Usage:
+    python3 -m trivia.validate                 # curated files
+    python3 -m trivia.validate --include-raw   # plus generator output
+    python3 -m trivia.validate --since 2d      # only files edited in the last two days
+    python3 -m trivia.validate --full          # ignore the manifest and check every file
+    python3 -m trivia.validate --fix --strict --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable
+from functools import cache
+from pathlib import Path
+
+from trivia.corpus import MAX_WORDS, QUESTIONS_DIR, question_files
+from trivia.journal import atomic_write_text
+from trivia.manifest import Manifest, parse_since
+
+SCHEMA_FILE = QUESTIONS_DIR / "schema.json"
+MANIFEST_NAME = "trivia-validate-manifest.json"  # written next to the questions directory
+DIFFICULTIES = ("easy", "medium", "hard")
+POOL_MIN_BYTES = 2_000_000  # below this, starting workers costs more than it saves
+
+# (level, file, question id or "", message)
+Issue = tuple[str, str, str, str]
+Check = Callable[[object, list[str]], None]
+
+# ── Schema compiler ────────────────────────────────────────────────────────
+# The schema is turned into the source of one straight-line function per
+# checked object and exec'd, so checking a question is a handful of
+# isinstance/len/dict lookups with no per-keyword calls. Location strings are
+# only formatted on the error path. Nothing read from schema.json is pasted
+# into the source: keys, limits and enum values are passed in as constants
+# and referenced by name. Covers the keywords schema.json uses; anything else
+# is ignored.
+
+_TYPES = {"string": "str", "integer": "int", "number": "(int, float)", "boolean": "bool",
+          "array": "list", "object": "dict"}
+
+
+class _Emitter:
+    def __init__(self, root: dict):
+        self.root = root
+        self.lines: list[str] = []
+        self.consts: dict[str, object] = {}
+        self.n = 0
+
+    def name(self, prefix: str) -> str:
+        self.n += 1
+        return f"{prefix}{self.n}"
+
+    def const(self, value: object) -> str:
+        name = self.name("C")
+        self.consts[name] = value
+        return name
+
+    def error(self, ind: int, where: str, message: str) -> None:
+        # `where` and `message` are f-string bodies built from generated names
+        # only; an empty location reads "file"
+        self.lines.append(" " * ind + f'errors.append(f"{where or "file"}: {message}")')
+
+    def at(self, where: str, key: str) -> str:
+        """The location of `key` under `where`, with the key passed as a constant."""
+        key = f"{{{self.const(key)}}}"
+        return f"{where}.{key}" if where else key
+
+    def emit(self, schema: dict, var: str, where: str, ind: int) -> None:
+        if "$ref" in schema:
+            schema = self.root["definitions"][schema["$ref"].removeprefix("#/definitions/")]
+        pad = " " * ind
+        type_name = schema.get("type")
+        if type_name:
+            # bool is an int subclass, but true is not a count
+            test = f"not isinstance({var}, {_TYPES[type_name]})"
+            if type_name in ("integer", "number"):
+                test += f" or isinstance({var}, bool)"
+            self.lines.append(f"{pad}if {test}:")
+            self.error(ind + 4, where, f"expected {type_name}, got {{type({var}).__name__}}")
+            self.lines.append(f"{pad}else:")
+            ind += 4
+            pad = " " * ind
+        start = len(self.lines)
+
+        if "enum" in schema:
+            allowed = self.const(frozenset(schema["enum"]))
+            listed = self.const(", ".join(map(str, schema["enum"])))
+            self.lines.append(f"{pad}if {var} not in {allowed}:")
+            self.error(ind + 4, where, f"{{{var}!r}} not one of {{{listed}}}")
+        if "minLength" in schema:
+            limit = self.const(schema["minLength"])
+            self.lines.append(f"{pad}if len({var}.strip()) < {limit}:")
+            self.error(ind + 4, where, f"shorter than {{{limit}}} characters")
+        if "pattern" in schema:
+            pattern = self.const(re.compile(schema["pattern"]))
+            self.lines.append(f"{pad}if not {pattern}.search({var}):")
+            self.error(ind + 4, where, f"{{{var}!r}} does not match {{{pattern}.pattern}}")
+        if "minimum" in schema:
+            minimum = self.const(schema["minimum"])
+            self.lines.append(f"{pad}if {var} < {minimum}:")
+            self.error(ind + 4, where, f"below {{{minimum}}}")
+        if "minItems" in schema or "maxItems" in schema:
+            lo, hi = schema.get("minItems", 0), schema.get("maxItems")
+            expected = self.const(f"{lo}–{hi if hi is not None else ''}")
+            lo, hi = self.const(lo), hi if hi is None else self.const(hi)
+            test = f"not {lo} <= len({var}) <= {hi}" if hi is not None else f"len({var}) < {lo}"
+            self.lines.append(f"{pad}if {test}:")
+            self.error(ind + 4, where, f"{{len({var})}} items, expected {{{expected}}}")
+        if "items" in schema:
+            i, item = self.name("i"), self.name("x")
+            self.lines.append(f"{pad}for {i}, {item} in enumerate({var}):")
+            self.emit(schema["items"], item, f"{where}[{{{i}}}]", ind + 4)
+        for key in schema.get("required", ()):
+            self.lines.append(f"{pad}if {self.const(key)} not in {var}:")
+            self.error(ind + 4, self.at(where, key), "missing")
+        properties = schema.get("properties", {})
+        for key, sub in properties.items():
+            item = self.name("p")
+            self.lines.append(f"{pad}{item} = {var}.get({self.const(key)}, MISSING)")
+            self.lines.append(f"{pad}if {item} is not MISSING:")
+            before = len(self.lines)
+            self.emit(sub, item, self.at(where, key), ind + 4)
+            if len(self.lines) == before:
+                del self.lines[-2:]
+        if schema.get("additionalProperties") is False:
+            known, key = self.const(frozenset(properties)), self.name("k")
+            self.lines.append(f"{pad}for {key} in {var}:")
+            self.lines.append(f"{pad}    if {key} not in {known}:")
+            self.error(ind + 8, f"{where}.{{{key}}}" if where else f"{{{key}}}", "unknown field")
+
+        if len(self.lines) == start and type_name:
+            self.lines.append(f"{pad}pass")
+
+
+def compile_schema(schema: dict, root: dict | None = None) -> Check:
+    """Turn a schema into `check(value, errors)`, which appends one message per problem."""
+    emitter = _Emitter(root or schema)
+    emitter.emit(schema, "value", "", 4)
+    source = "def check(value, errors):\n" + "\n".join(emitter.lines or ["    pass"])
+    namespace = dict(emitter.consts, MISSING=object())
+    exec(compile(source, "<schema>", "exec"), namespace)
+    return namespace["check"]
+
+
+@cache
+def file_checks(schema_file: Path = SCHEMA_FILE) -> tuple[Check, Check]:
+    """
+    (check of a file without its questions, check of one question) for
+    `schema_file`, compiled on first use so importing this module never
+    reads a schema.
+    """
+    with open(schema_file, encoding="utf-8") as f:
+        schema = json.load(f)
+    question = compile_schema(schema["definitions"]["question"], schema)
+    shell = dict(schema, properties=dict(schema["properties"], questions={"type": "array"}))
+    return compile_schema(shell), question
+
+# ── Per-file checks (run in worker processes) ──────────────────────────────
+
+def id_prefix(qid: str) -> str:
+    return qid.rpartition("_")[0]
+
+
+def normalize(data: dict) -> bool:
+    """Trim text, fill in question categories and recount metadata in place; True if anything changed."""
+    before = json.dumps(data, sort_keys=True)
+    questions = data.get("questions", [])
+    for q in questions:
+        if isinstance(q.get("question"), str):
+            q["question"] = " ".join(q["question"].split())
+        for a in q.get("answers", []):
+            if isinstance(a.get("text"), str):
+                a["text"] = a["text"].strip()
+        if "category" not in q and "category" in data:
+            q["category"] = data["category"]
+    counts = Counter(q.get("difficulty") for q in questions)
+    metadata = data.setdefault("metadata", {})
+    metadata["totalQuestions"] = len(questions)
+    metadata["difficulty"] = {d: counts[d] for d in DIFFICULTIES}
+    return json.dumps(data, sort_keys=True) != before
+
+
+def question_issues(q: dict, category: str | None, max_words: int) -> list[tuple[str, str]]:
+    """(level, message) for the content rules schema.json cannot express."""
+    issues = []
+    answers = q.get("answers")
+    if isinstance(answers, list):
+        correct = absurd = 0
+        texts = set()
+        for a in answers:
+            if not isinstance(a, dict):
+                continue
+            correct += a.get("correct") is True
+            if a.get("absurd"):
+                absurd += 1
+                if a.get("correct"):
+                    issues.append(("error", "the correct answer is marked absurd"))
+            texts.add(str(a.get("text", "")).strip().casefold())
+        if correct != 1:
+            issues.append(("error", f"{correct} correct answers, expected exactly 1"))
+        if absurd > 1:
+            issues.append(("error", f"{absurd} absurd answers, expected at most 1"))
+        if len(texts) != len(answers):
+            issues.append(("error", "repeated answer text"))
+    if category is not None and q.get("category", category) != category:
+        issues.append(("error", f"category {q['category']!r}, file is {category!r}"))
+    text = q.get("question")
+    if isinstance(text, str):
+        words = len(text.split())
+        if words > max_words:
+            issues.append(("warning", f"{words} words, target is under {max_words}"))
+    return issues
+
+
+def check_file(path: Path, fix: bool = False, max_words: int = MAX_WORDS,
+               schema_file: Path = SCHEMA_FILE) -> tuple[list[Issue], list[str], int]:
+    """Check one file; return (issues, question IDs in order, question count)."""
+    name = path.name
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return [("error", name, "", f"unreadable: {e}")], [], 0
+
+    if fix and isinstance(data, dict) and normalize(data):
+        atomic_write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
+        issues: list[Issue] = [("fixed", name, "", "normalized")]
+    else:
+        issues = []
+
+    file_check, question_check = file_checks(schema_file)
+    errors: list[str] = []
+    file_check(data, errors)
+    issues.extend(("error", name, "", e) for e in errors)
+    if not isinstance(data, dict) or not isinstance(data.get("questions"), list):
+        return issues, [], 0
+
+    questions = data["questions"]
+    category = data.get("category")
+    ids, seen, prefixes = [], set(), Counter()
+    for i, q in enumerate(questions):
+        qid = q.get("id") if isinstance(q, dict) else None
+        label = qid if isinstance(qid, str) else f"questions[{i}]"
+        errors = []
+        question_check(q, errors)
+        issues.extend(("error", name, label, e) for e in errors)
+        if not isinstance(q, dict):
+            continue
+        issues.extend((level, name, label, m) for level, m in question_issues(q, category, max_words))
+        if isinstance(qid, str):
+            if qid in seen:
+                issues.append(("error", name, qid, "duplicate ID in file"))
+            seen.add(qid)
+            ids.append(qid)
+            prefixes[id_prefix(qid)] += 1
+
+    if len(prefixes) > 1:
+        main_prefix = prefixes.most_common(1)[0][0]
+        for qid in ids:
+            if id_prefix(qid) != main_prefix:
+                issues.append(("error", name, qid, f"ID prefix differs from the file's '{main_prefix}_'"))
+
+    metadata = data.get("metadata")
+    if isinstance(metadata, dict):
+        if metadata.get("totalQuestions") != len(questions):
+            issues.append(("error", name, "", f"metadata.totalQuestions is "
+                           f"{metadata.get('totalQuestions')}, file has {len(questions)}"))
+        counts = Counter(q.get("difficulty") for q in questions if isinstance(q, dict))
+        declared = metadata.get("difficulty")
+        if isinstance(declared, dict):
+            for d in DIFFICULTIES:
+                if declared.get(d, 0) != counts[d]:
+                    issues.append(("error", name, "", f"metadata.difficulty.{d} is "
+                                   f"{declared.get(d, 0)}, file has {counts[d]}"))
+    return issues, ids, len(questions)
+
+# ── Whole corpus ───────────────────────────────────────────────────────────
+
+def _check_file_args(args: tuple) -> tuple[list[Issue], list[str], int]:
+    return check_file(*args)
+
+
+def category_of(path: Path) -> str:
+    return path.name.removesuffix(".json").removesuffix("_raw")
+
+
+def validate(files: list[Path], fix: bool = False, max_words: int = MAX_WORDS,
+             jobs: int | None = None, schema_file: Path = SCHEMA_FILE,
+             manifest: Manifest | None = None, since: float | None = None
+             ) -> tuple[list[Issue], int, int]:
+    """
+    Check `files` and the cross-file rules; return (issues, question count,
+    files checked). With a manifest, only files it reports as changed (since
+    `since`, if given) are checked, and those that pass cleanly are recorded.
+    """
+    todo = [p for p in files if manifest.changed(p, since)] if manifest else files
+    if jobs is None:
+        small = sum(p.stat().st_size for p in todo) < POOL_MIN_BYTES
+        jobs = 1 if small else os.cpu_count() or 1
+    jobs = min(jobs, len(todo))
+    work = [(path, fix, max_words, schema_file) for path in todo]
+    if jobs > 1:
+        # Imported only when needed: multiprocessing doubles the CLI's start-up time
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            checked = list(pool.map(_check_file_args, work, chunksize=max(1, len(work) // (jobs * 4))))
+    else:
+        checked = [check_file(*w) for w in work]
+
+    by_path = dict(zip(todo, checked))
+    results = []
+    for path in files:
+        if path in by_path:
+            result = by_path[path]
+            if manifest and all(level == "fixed" for level, *_ in result[0]):
+                manifest.record(path)
+        else:
+            # Unchanged since it last passed: its recorded IDs stand in for it
+            ids = manifest.ids(path.name)
+            result = [], ids, len(ids)
+        results.append(result)
+
+    issues: list[Issue] = []
+    owner: dict[str, str] = {}
+    prefix_owner: dict[str, str] = {}
+    total = 0
+    for path, (file_issues, ids, count) in zip(files, results):
+        issues.extend(file_issues)
+        total += count
+        for qid in ids:
+            first = owner.setdefault(qid, path.name)
+            if first != path.name:
+                issues.append(("error", path.name, qid, f"ID also used in {first}"))
+        if ids:
+            # X.json and X_raw.json are the same category
+            prefix = Counter(map(id_prefix, ids)).most_common(1)[0][0]
+            first = prefix_owner.setdefault(prefix, path.name)
+            if category_of(Path(first)) != category_of(path):
+                issues.append(("error", path.name, "", f"ID prefix '{prefix}_' also used by {first}"))
+    return issues, total, len(todo)
+
+
+def format_issue(issue: Issue) -> str:
+    level, name, qid, message = issue
+    where = f"{name}: {qid}" if qid else name
+    return f"{level:7} {where}: {message}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the question files")
+    parser.add_argument("--questions-dir", type=Path, default=QUESTIONS_DIR)
+    parser.add_argument("--include-raw", action="store_true",
+                        help="Also check _raw.json generator output")
+    parser.add_argument("--fix", action="store_true",
+                        help="Normalize whitespace and metadata in place before checking")
+    parser.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    parser.add_argument("--max-words", type=int, default=MAX_WORDS, metavar="N",
+                        help=f"Question length that draws a warning (default: {MAX_WORDS})")
+    parser.add_argument("--jobs", type=int, default=None, metavar="N",
+                        help="Worker processes (default: one per CPU for a large corpus; 1 runs inline)")
+    parser.add_argument("--since", metavar="WHEN",
+                        help="Only files modified since WHEN: 30m, 12h, 3d, or a date like 2026-10-01")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the manifest and check every file")
+    parser.add_argument("--json", action="store_true", help="Print issues as JSON")
+    args = parser.parse_args()
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError as e:
+        parser.error(f"--since: {e}")
+
+    schema_file = args.questions_dir / "schema.json"
+    if not schema_file.is_file():
+        parser.error(f"--questions-dir: no schema.json in {args.questions_dir}")
+
+    started = time.perf_counter()
+    files = question_files(args.questions_dir, args.include_raw)
+    # Results only carry over while the rules they were checked against stand
+    key = hashlib.sha256(schema_file.read_bytes() + f"\n{args.max_words}".encode()).hexdigest()
+    manifest = Manifest(args.questions_dir.parent / MANIFEST_NAME, key)
+    if args.full:
+        manifest.reset()
+    manifest.forget_missing(files)
+    issues, total, checked = validate(files, args.fix, args.max_words, args.jobs, schema_file,
+                                      manifest, since)
+    manifest.save()
+    elapsed = time.perf_counter() - started
+    levels = Counter(level for level, *_ in issues)
+
+    if args.json:
+        print(json.dumps({
+            "files": len(files),
+            "checked": checked,
+            "questions": total,
+            "seconds": round(elapsed, 3),
+            "counts": dict(levels),
+            "issues": [dict(zip(("level", "file", "id", "message"), i)) for i in issues],
+        }, indent=2))
+    else:
+        for issue in issues:
+            print(format_issue(issue))
+        print(f"{len(files)} files ({checked} checked), {total} questions: "
+              f"{levels['error']} errors, {levels['warning']} warnings ({elapsed:.2f}s)")
+
+    failed = levels["error"] or (args.strict and levels["warning"])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()